@@ -0,0 +1,46 @@
+"""Add users list indexes
+
+Revision ID: 1f5c7e9a3b24
+Revises: 6e3a91b7c5d0
+Create Date: 2026-10-18 16:27:09.148305
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "1f5c7e9a3b24"
+down_revision: Union[str, None] = "6e3a91b7c5d0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_users_email_pattern",
+        "users",
+        ["email"],
+        unique=False,
+        postgresql_ops={"email": "varchar_pattern_ops"},
+    )
+    op.create_index(
+        "ix_users_role_id",
+        "users",
+        ["role", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_users_is_active_id",
+        "users",
+        ["is_active", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_is_active_id", table_name="users")
+    op.drop_index("ix_users_role_id", table_name="users")
+    op.drop_index("ix_users_email_pattern", table_name="users")
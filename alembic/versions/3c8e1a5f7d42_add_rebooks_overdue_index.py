@@ -0,0 +1,33 @@
+"""Add rebooks overdue index
+
+Revision ID: 3c8e1a5f7d42
+Revises: 8b2d4f6a1c93
+Create Date: 2026-10-18 20:11:58.634120
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3c8e1a5f7d42"
+down_revision: Union[str, None] = "8b2d4f6a1c93"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_rebooks_overdue",
+        "rebooks",
+        ["due_date", "id"],
+        unique=False,
+        postgresql_where=sa.text("returned_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_rebooks_overdue", table_name="rebooks")
@@ -0,0 +1,43 @@
+"""Add trigram indexes
+
+Revision ID: 4c1e8a2f9d3b
+Revises: b7cd8afa776e
+Create Date: 2026-10-18 10:12:41.508214
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4c1e8a2f9d3b"
+down_revision: Union[str, None] = "b7cd8afa776e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_books_genre_trgm",
+        "books",
+        ["genre"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"genre": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_authors_name_trgm",
+        "authors",
+        ["name"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_authors_name_trgm", table_name="authors")
+    op.drop_index("ix_books_genre_trgm", table_name="books")
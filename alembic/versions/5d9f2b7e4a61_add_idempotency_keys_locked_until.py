@@ -0,0 +1,30 @@
+"""Add idempotency keys locked until
+
+Revision ID: 5d9f2b7e4a61
+Revises: 3c8e1a5f7d42
+Create Date: 2026-10-18 21:27:14.513806
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5d9f2b7e4a61"
+down_revision: Union[str, None] = "3c8e1a5f7d42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "idempotency_keys",
+        sa.Column("locked_until", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("idempotency_keys", "locked_until")
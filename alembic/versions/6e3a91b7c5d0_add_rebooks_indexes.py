@@ -0,0 +1,40 @@
+"""Add rebooks indexes
+
+Revision ID: 6e3a91b7c5d0
+Revises: d2b6f0c84a17
+Create Date: 2026-10-18 14:02:51.377419
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "6e3a91b7c5d0"
+down_revision: Union[str, None] = "d2b6f0c84a17"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_rebooks_active_user_book",
+        "rebooks",
+        ["user_id", "book_id", "id"],
+        unique=False,
+        postgresql_where=sa.text("returned_at IS NULL"),
+    )
+    op.create_index(
+        "ix_rebooks_user_id_id",
+        "rebooks",
+        ["user_id", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_rebooks_user_id_id", table_name="rebooks")
+    op.drop_index("ix_rebooks_active_user_book", table_name="rebooks")
@@ -0,0 +1,49 @@
+"""Add books search vector
+
+Revision ID: 9a7d3e5b1c2f
+Revises: 4c1e8a2f9d3b
+Create Date: 2026-10-18 11:03:27.194550
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9a7d3e5b1c2f"
+down_revision: Union[str, None] = "4c1e8a2f9d3b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "books",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('russian', coalesce(title, '')), 'A') "
+                "|| setweight(to_tsvector('russian', "
+                "coalesce(description, '')), 'B')",
+                persisted=True,
+            ),
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        "ix_books_search_vector",
+        "books",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_books_search_vector", table_name="books")
+    op.drop_column("books", "search_vector")
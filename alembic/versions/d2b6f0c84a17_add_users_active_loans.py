@@ -0,0 +1,47 @@
+"""Add users active loans
+
+Revision ID: d2b6f0c84a17
+Revises: 9a7d3e5b1c2f
+Create Date: 2026-10-18 12:41:09.836127
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d2b6f0c84a17"
+down_revision: Union[str, None] = "9a7d3e5b1c2f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column(
+            "active_loans",
+            sa.Integer(),
+            server_default="0",
+            nullable=False,
+        ),
+    )
+    op.execute(
+        """
+        UPDATE users SET active_loans = loans.count
+        FROM (
+            SELECT user_id, count(id) AS count
+            FROM rebooks
+            WHERE returned_at IS NULL
+            GROUP BY user_id
+        ) AS loans
+        WHERE users.id = loans.user_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("users", "active_loans")
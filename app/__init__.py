@@ -1,8 +1,9 @@
 from .authors import Author
 from .books import Book
 from .config import settings
-from .database import Base, get_async_session
+from .database import Base, get_async_session, get_session_factory
 from .exceptions import integrity_error_handler, validation_exception_handler
+from .idempotency import IdempotencyKey
 from .rebooks import Rebook
 from .users import User
 
@@ -10,10 +11,12 @@ __all__ = [
     "Author",
     "Base",
     "Book",
+    "IdempotencyKey",
     "Rebook",
     "User",
     "settings",
     "get_async_session",
+    "get_session_factory",
     "integrity_error_handler",
     "validation_exception_handler",
 ]
@@ -4,6 +4,7 @@ from sqlalchemy import String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.types import Date, Text
 
+from ..search import trigram_index
 from ..users import BaseModel
 
 
@@ -11,6 +12,7 @@ class Author(BaseModel):
     """Модель автора."""
 
     __tablename__ = "authors"
+    __table_args__ = (trigram_index("ix_authors_name_trgm", "name"),)
 
     name: Mapped[str] = mapped_column(
         String(60), unique=True, nullable=False, doc="Имя автора"
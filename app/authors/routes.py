@@ -1,14 +1,20 @@
-from fastapi import APIRouter, Depends, Query, status
+from fastapi import APIRouter, Depends, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..database import get_async_session
+from ..etag import etag_matches, fields_etag, is_conditional, not_modified
+from ..fields import fields_query
+from ..pagination import set_next_cursor
+from ..serialization import json_list_response, json_response
 from ..users import UserRole, get_current_user, require_role
 from .schemas import AuthorCreate, AuthorRead, AuthorUpdate
 from .services import (
     author_create,
     delete_author,
     get_all_authors,
-    get_author_by_id,
+    get_author_detail,
+    get_author_etag,
+    get_author_fields,
     update_author,
 )
 
@@ -42,7 +48,11 @@ async def create_author(
     description="""
     Получение списка всех авторов.
     - Можно задать `limit` (количество авторов) и `offset` (начало выборки).
+    - Для постраничного обхода без `offset` передайте `cursor` из заголовка
+    `X-Next-Cursor` предыдущего ответа.
     - Можно фильтровать по имени автора.
+    - `fields` ограничивает ответ перечисленными полями (`id` всегда
+    включен).
     """,
     responses={
         200: {"description": "Список авторов успешно получен."},
@@ -50,33 +60,69 @@ async def create_author(
     },
 )
 async def get_authors(
+    response: Response,
     db: AsyncSession = Depends(get_async_session),
     limit: int = Query(10, ge=1, le=100, description="Количество записей."),
     offset: int = Query(0, ge=0, description="Смещение от начала выборки."),
+    cursor: str | None = Query(
+        None, description="Курсор следующей страницы (`X-Next-Cursor`)."
+    ),
     name: str | None = Query(
         None, min_length=3, max_length=50, description="Фильтр по имени."
     ),
+    fields: list[str] | None = Depends(fields_query(AuthorRead)),
     current_user=Depends(get_current_user),
 ):
-    return await get_all_authors(db, limit=limit, offset=offset, name=name)
+    authors = await get_all_authors(
+        db,
+        limit=limit,
+        offset=offset,
+        name=name,
+        cursor=cursor,
+        fields=fields,
+    )
+    set_next_cursor(response, authors, limit)
+    return json_list_response(authors, AuthorRead, response, fields)
 
 
 @authors_router.get(
     "/{author_id}/",
     response_model=AuthorRead,
     summary="Получение данных автора по ID",
-    description="Получение информации об авторе по ID.",
+    description="""
+    Получение информации об авторе по ID.
+    - `fields` ограничивает ответ перечисленными полями (`id` всегда
+    включен).
+    - Ответ содержит заголовок `ETag`; при совпадении `If-None-Match`
+    возвращается `304 Not Modified` без тела.
+    """,
     responses={
         200: {"description": "Данные автора успешно получены."},
+        304: {"description": "Данные автора не изменились."},
         404: {"description": "Автор с указанным ID не найден."},
     },
 )
 async def get_author(
     author_id: int,
+    request: Request,
+    response: Response,
+    fields: list[str] | None = Depends(fields_query(AuthorRead)),
     db: AsyncSession = Depends(get_async_session),
     current_user=Depends(get_current_user),
 ):
-    return await get_author_by_id(author_id, db)
+    if is_conditional(request) or fields is not None:
+        etag = fields_etag(await get_author_etag(author_id, db), fields)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+    if fields is not None:
+        response.headers["ETag"] = etag
+        author = await get_author_fields(author_id, fields, db)
+        return json_response(author, response)
+
+    author, etag = await get_author_detail(author_id, db)
+    response.headers["ETag"] = etag
+    return author
 
 
 @authors_router.put(
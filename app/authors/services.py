@@ -3,20 +3,43 @@
 
 - Создание, обновление и удаление авторов.
 - Получение списка авторов или данных конкретного автора.
+- Кэширование списка авторов и данных об авторах.
+- Выборка только запрошенных полей авторов.
 """
 
-from typing import Optional
+from typing import Optional, Sequence
 
-from sqlalchemy import asc
+from pydantic import TypeAdapter
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
+from ..cache import catalog_cache
+from ..etag import make_etag
+from ..fields import field_columns, rows, rows_adapter
+from ..pagination import paginate
+from ..search import contains
 from .exceptions import AuthorExistsException, AuthorNotFoundException
 from .models import Author
-from .schemas import AuthorCreate, AuthorUpdate
+from .schemas import AuthorCreate, AuthorRead, AuthorUpdate
 from .utils import update_instance
 
+author_list_adapter = TypeAdapter(list[AuthorRead])
+author_detail_adapter = TypeAdapter(tuple[AuthorRead, str])
+
+
+async def invalidate_author_cache(author_id: int | None = None) -> None:
+    """
+    Сбрасывает кэш списков авторов и, если указан ID, данные автора.
+    Имена авторов входят в ответы о книгах, поэтому при изменении
+    автора сбрасывается и кэш книг.
+    """
+
+    tags = ["authors:list"]
+    if author_id is not None:
+        tags += [f"author:{author_id}", "books:list", "books:detail"]
+    await catalog_cache.invalidate(*tags)
+
 
 async def author_create(author_data: AuthorCreate, db: AsyncSession) -> Author:
     """
@@ -34,6 +57,7 @@ async def author_create(author_data: AuthorCreate, db: AsyncSession) -> Author:
         raise AuthorExistsException()
 
     await db.refresh(new_author)
+    await invalidate_author_cache()
     return new_author
 
 
@@ -53,24 +77,111 @@ async def get_author_by_id(author_id: int, db: AsyncSession) -> Author:
     return author
 
 
+async def get_author_detail(
+    author_id: int, db: AsyncSession
+) -> tuple[AuthorRead, str]:
+    """
+    Получение данных автора по ID через кэш.
+    Возвращает информацию об авторе и ее ETag.
+    Выбрасывает исключение, если автор с указанным ID не найден.
+    """
+
+    async def load() -> tuple[Author, str]:
+        author = await get_author_by_id(author_id, db)
+        return author, author_etag(author)
+
+    return await catalog_cache.get_or_load(
+        catalog_cache.make_key("authors:detail", id=author_id),
+        ("authors:detail", f"author:{author_id}"),
+        load,
+        author_detail_adapter,
+    )
+
+
+async def get_author_fields(
+    author_id: int, fields: Sequence[str], db: AsyncSession
+) -> dict:
+    """
+    Получение выбранных полей автора по ID.
+    Выбрасывает исключение, если автор с указанным ID не найден.
+    """
+
+    result = await db.execute(
+        select(*field_columns(Author, fields)).filter(Author.id == author_id)
+    )
+    authors = rows(result)
+
+    if not authors:
+        raise AuthorNotFoundException()
+
+    return authors[0]
+
+
+def author_etag(author: Author) -> str:
+    """ETag автора по времени изменения записи."""
+
+    return make_etag("author", author.id, author.updated_at)
+
+
+async def get_author_etag(author_id: int, db: AsyncSession) -> str:
+    """
+    Получение ETag автора без загрузки его данных.
+    Выбрасывает исключение, если автор с указанным ID не найден.
+    """
+
+    updated_at = await db.scalar(
+        select(Author.updated_at).filter(Author.id == author_id)
+    )
+
+    if not updated_at:
+        raise AuthorNotFoundException()
+
+    return make_etag("author", author_id, updated_at)
+
+
 async def get_all_authors(
     db: AsyncSession,
     limit: int = 10,
     offset: int = 0,
     name: Optional[str] = None,
-) -> list[Author]:
+    cursor: Optional[str] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> list[AuthorRead] | list[dict]:
     """
     Получение списка всех авторов с пагинацией и фильтрацией по имени.
+    При наличии курсора выборка продолжается после него, `offset`
+    игнорируется. Если заданы `fields`, читаются только соответствующие
+    колонки. Результат кэшируется по параметрам запроса.
     Возвращает список авторов.
     """
 
-    query = select(Author).order_by(asc(Author.id))
-    if name:
-        query = query.filter(Author.name.ilike(f"%{name}%"))
-
-    query = query.limit(limit).offset(offset)
-    result = await db.execute(query)
-    return result.scalars().all()
+    async def load() -> list[Author] | list[dict]:
+        if fields is None:
+            query = select(Author)
+        else:
+            query = select(*field_columns(Author, fields))
+        if name:
+            query = query.filter(contains(Author.name, name))
+
+        query = paginate(query, [Author.id], limit, offset, cursor)
+        result = await db.execute(query)
+        if fields is not None:
+            return rows(result)
+        return result.scalars().all()
+
+    return await catalog_cache.get_or_load(
+        catalog_cache.make_key(
+            "authors:list",
+            limit=limit,
+            offset=offset,
+            name=name,
+            cursor=cursor,
+            fields=fields,
+        ),
+        ("authors:list",),
+        load,
+        author_list_adapter if fields is None else rows_adapter,
+    )
 
 
 async def update_author(
@@ -88,6 +199,7 @@ async def update_author(
     db.add(author)
     await db.commit()
     await db.refresh(author)
+    await invalidate_author_cache(author_id)
     return author
 
 
@@ -100,3 +212,4 @@ async def delete_author(author_id: int, db: AsyncSession) -> None:
     author = await get_author_by_id(author_id, db)
     await db.delete(author)
     await db.commit()
+    await invalidate_author_cache(author_id)
@@ -1,5 +1,10 @@
 from .models import Book
 from .routes import books_router
-from .services import get_book_by_id
+from .services import get_book_by_id, invalidate_book_cache
 
-__all__ = ["Book", "books_router", "get_book_by_id"]
+__all__ = [
+    "Book",
+    "books_router",
+    "get_book_by_id",
+    "invalidate_book_cache",
+]
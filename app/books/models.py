@@ -1,8 +1,20 @@
 from datetime import date
 
-from sqlalchemy import Column, Date, ForeignKey, Integer, String, Table, Text
+from sqlalchemy import (
+    Column,
+    Computed,
+    Date,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Table,
+    Text,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from ..search import trigram_index
 from ..users import BaseModel
 
 book_author = Table(
@@ -17,6 +29,12 @@ class Book(BaseModel):
     """Модель книги."""
 
     __tablename__ = "books"
+    __table_args__ = (
+        trigram_index("ix_books_genre_trgm", "genre"),
+        Index(
+            "ix_books_search_vector", "search_vector", postgresql_using="gin"
+        ),
+    )
 
     title: Mapped[str] = mapped_column(
         String(100), nullable=False, doc="Название книги"
@@ -36,6 +54,17 @@ class Book(BaseModel):
         nullable=False,
         doc="Количество доступных экземпляров книги",
     )
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('russian', coalesce(description, '')), "
+            "'B')",
+            persisted=True,
+        ),
+        deferred=True,
+        doc="Поисковый вектор по названию и описанию книги",
+    )
 
     authors = relationship(
         "Author",
@@ -1,14 +1,37 @@
-from fastapi import APIRouter, Depends, Query, status
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database import get_async_session
+from ..config import settings
+from ..database import get_async_session, get_session_factory
+from ..etag import etag_matches, fields_etag, is_conditional, not_modified
+from ..fields import fields_query
+from ..idempotency import Idempotency, get_idempotency
+from ..pagination import set_next_cursor
+from ..serialization import json_list_response, json_response
+from ..streaming import (
+    DataFormat,
+    detect_format,
+    export_response,
+    parse_records,
+)
 from ..users import UserRole, get_current_user, require_role
-from .schemas import BookCreate, BookResponse
+from .schemas import (
+    BookCreate,
+    BookImportResult,
+    BookResponse,
+    BookSearchResponse,
+)
 from .services import (
     create_book,
     delete_book,
+    export_books,
     get_all_books,
-    get_book_by_id,
+    get_book_detail,
+    get_book_etag,
+    get_book_fields,
+    import_books,
+    search_books,
     update_book,
 )
 
@@ -20,19 +43,67 @@ books_router = APIRouter(prefix="/books", tags=["Books"])
     response_model=BookResponse,
     status_code=status.HTTP_201_CREATED,
     summary="Добавление новой книги",
-    description="Добавляет новую книгу (только для администратора).",
+    description="""
+    Добавляет новую книгу (только для администратора).
+    - При повторе запроса с тем же заголовком `Idempotency-Key`
+    возвращается сохраненный ответ, книга повторно не создается.
+    """,
     responses={
         201: {"description": "Книга успешно добавлена."},
         400: {"description": "Некорректные данные для добавления книги."},
         403: {"description": "Недостаточно прав для выполнения операции."},
+        409: {"description": "Запрос с этим ключом еще выполняется."},
+        422: {"description": "Ключ использован для другого запроса."},
     },
 )
 async def add_book(
     book: BookCreate,
     db: AsyncSession = Depends(get_async_session),
     current_user=Depends(require_role(UserRole.ADMIN)),
+    idempotency: Idempotency = Depends(get_idempotency),
+):
+    return await idempotency.run(
+        db, current_user.id, lambda: create_book(book, db)
+    )
+
+
+@books_router.post(
+    "/bulk/",
+    response_model=BookImportResult,
+    summary="Массовая загрузка книг",
+    description="""
+    Загружает книги из потока NDJSON или CSV (только для администратора).
+    - Формат определяется по `Content-Type` (`text/csv` или
+    `application/x-ndjson`) либо задается параметром `format`.
+    - Каждая строка NDJSON - объект с полями схемы создания книги.
+    - CSV начинается со строки заголовков, `author_ids` перечисляются
+    через `;`.
+    - Книги добавляются пачками по `chunk_size`, ответ содержит отчет
+    об ошибках по номерам строк.
+    """,
+    responses={
+        200: {"description": "Загрузка завершена, отчет сформирован."},
+        403: {"description": "Недостаточно прав для выполнения операции."},
+    },
+)
+async def bulk_import(
+    request: Request,
+    data_format: DataFormat | None = Query(
+        None, alias="format", description="Формат данных (`ndjson` или `csv`)."
+    ),
+    chunk_size: int = Query(
+        settings.BULK_IMPORT_CHUNK_SIZE,
+        ge=1,
+        le=10000,
+        description="Количество книг в одной пачке.",
+    ),
+    db: AsyncSession = Depends(get_async_session),
+    current_user=Depends(require_role(UserRole.ADMIN)),
 ):
-    return await create_book(book, db)
+    if data_format is None:
+        data_format = detect_format(request.headers.get("content-type"))
+    records = parse_records(request.stream(), data_format)
+    return await import_books(db, records, chunk_size)
 
 
 @books_router.get(
@@ -42,7 +113,11 @@ async def add_book(
     description="""
     Получение списка всех книг.
     - Можно задать `limit` (количество книг) и `offset` (начало выборки).
+    - Для постраничного обхода без `offset` передайте `cursor` из заголовка
+    `X-Next-Cursor` предыдущего ответа.
     - Можно фильтровать книги по жанру.
+    - `fields` ограничивает ответ перечисленными полями (`id` всегда
+    включен); авторы загружаются, только если запрошено поле `authors`.
     """,
     responses={
         200: {"description": "Список книг успешно получен."},
@@ -50,33 +125,131 @@ async def add_book(
     },
 )
 async def get_books(
+    response: Response,
     limit: int = Query(10, ge=1, le=100, description="Количество записей."),
     offset: int = Query(0, ge=0, description="Смещение от начала выборки."),
+    cursor: str | None = Query(
+        None, description="Курсор следующей страницы (`X-Next-Cursor`)."
+    ),
     genre: str | None = Query(
-        None, max_length=50, description="Фильтр по жанру."
+        None, min_length=3, max_length=50, description="Фильтр по жанру."
     ),
+    fields: list[str] | None = Depends(fields_query(BookResponse)),
     db: AsyncSession = Depends(get_async_session),
     current_user=Depends(get_current_user),
 ):
-    return await get_all_books(db=db, limit=limit, offset=offset, genre=genre)
+    books = await get_all_books(
+        db=db,
+        limit=limit,
+        offset=offset,
+        genre=genre,
+        cursor=cursor,
+        fields=fields,
+    )
+    set_next_cursor(response, books, limit)
+    return json_list_response(books, BookResponse, response, fields)
+
+
+@books_router.get(
+    "/search/",
+    response_model=list[BookSearchResponse],
+    summary="Полнотекстовый поиск книг",
+    description="""
+    Поиск книг по названию и описанию.
+    - Поддерживается синтаксис веб-поиска: фразы в кавычках, `or`,
+    исключение слов через `-`.
+    - Результаты отсортированы по релевантности и содержат фрагмент
+    с подсветкой совпадений.
+    - Можно задать `limit` (количество книг) и `offset` (начало выборки).
+    """,
+    responses={
+        200: {"description": "Результаты поиска успешно получены."},
+        400: {"description": "Некорректные параметры запроса."},
+    },
+)
+async def search(
+    q: str = Query(
+        ..., min_length=2, max_length=200, description="Поисковый запрос."
+    ),
+    limit: int = Query(10, ge=1, le=100, description="Количество записей."),
+    offset: int = Query(0, ge=0, description="Смещение от начала выборки."),
+    db: AsyncSession = Depends(get_async_session),
+    current_user=Depends(get_current_user),
+):
+    books = await search_books(db=db, q=q, limit=limit, offset=offset)
+    return json_list_response(books, BookSearchResponse)
+
+
+@books_router.get(
+    "/export/",
+    response_class=StreamingResponse,
+    summary="Выгрузка каталога книг",
+    description="""
+    Потоковая выгрузка всех книг в NDJSON или CSV (только для
+    администратора). Ответ начинает передаваться сразу, расход памяти
+    не зависит от размера каталога.
+    """,
+    responses={
+        200: {"description": "Выгрузка каталога книг."},
+        403: {"description": "Недостаточно прав для выполнения операции."},
+    },
+)
+async def export(
+    data_format: DataFormat = Query(
+        DataFormat.NDJSON,
+        alias="format",
+        description="Формат данных (`ndjson` или `csv`).",
+    ),
+    session_factory=Depends(get_session_factory),
+    current_user=Depends(require_role(UserRole.ADMIN)),
+):
+    return export_response(
+        export_books(session_factory, settings.EXPORT_BATCH_SIZE),
+        data_format,
+        BookResponse,
+        "books",
+        settings.EXPORT_BATCH_SIZE,
+    )
 
 
 @books_router.get(
     "/{book_id}/",
     response_model=BookResponse,
     summary="Получение книги по ID",
-    description="Получение данных о книге по ее ID",
+    description="""
+    Получение данных о книге по ее ID.
+    - `fields` ограничивает ответ перечисленными полями (`id` всегда
+    включен).
+    - Ответ содержит заголовок `ETag`; при совпадении `If-None-Match`
+    возвращается `304 Not Modified` без тела.
+    """,
     responses={
         200: {"description": "Информация о книге успешно получена."},
+        304: {"description": "Книга не изменилась."},
         404: {"description": "Книга с указанным ID не найдена."},
     },
 )
 async def get_book(
     book_id: int,
+    request: Request,
+    response: Response,
+    fields: list[str] | None = Depends(fields_query(BookResponse)),
     db: AsyncSession = Depends(get_async_session),
     current_user=Depends(get_current_user),
 ):
-    return await get_book_by_id(book_id, db)
+    if is_conditional(request) or fields is not None:
+        etag = fields_etag(await get_book_etag(book_id, db), fields)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+    if fields is not None:
+        response.headers["ETag"] = etag
+        book = await get_book_fields(book_id, fields, db)
+        return json_response(book, response)
+
+    book, etag = await get_book_detail(book_id, db)
+    response.headers["ETag"] = etag
+    return book
 
 
 @books_router.put(
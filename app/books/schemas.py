@@ -3,6 +3,7 @@ Pydantic-схемы для работы с книгами:
 
 - Валидация данных книг (создание, обновление).
 - Формирование ответов API с информацией о книгах.
+- Отчет о массовой загрузке книг.
 """
 
 from datetime import date
@@ -81,4 +82,66 @@ class BookResponse(BookBase):
     def convert_authors(cls, value):  # noqa
         """Конвертирует объекты авторов в их имена."""
 
-        return [author.name for author in value]
+        return [
+            author if isinstance(author, str) else author.name
+            for author in value
+        ]
+
+
+class BookSearchResponse(BookResponse):
+    """Схема для результата полнотекстового поиска книг."""
+
+    rank: float = Field(
+        0.0,
+        title="Релевантность",
+        description="Релевантность книги поисковому запросу.",
+        json_schema_extra={"example": 0.1},
+    )
+    snippet: Optional[str] = Field(
+        None,
+        title="Фрагмент",
+        description=(
+            "Фрагмент названия и описания в виде HTML: текст экранирован, "
+            "совпадения выделены тегами `<b>`."
+        ),
+        json_schema_extra={"example": "<b>Война</b> и мир. Роман..."},
+    )
+
+
+class BookImportError(BaseModel):
+    """Схема для ошибки в строке массовой загрузки книг."""
+
+    line: int = Field(
+        ...,
+        title="Номер строки",
+        description="Номер строки во входных данных, начиная с 1.",
+        json_schema_extra={"example": 3},
+    )
+    errors: List[str] = Field(
+        ...,
+        title="Ошибки",
+        description="Список ошибок разбора и валидации строки.",
+        json_schema_extra={"example": ["Authors not found: 42"]},
+    )
+
+
+class BookImportResult(BaseModel):
+    """Схема для отчета о массовой загрузке книг."""
+
+    created: int = Field(
+        0,
+        title="Добавлено",
+        description="Количество добавленных книг.",
+        json_schema_extra={"example": 998},
+    )
+    failed: int = Field(
+        0,
+        title="Отклонено",
+        description="Количество строк, не прошедших проверку.",
+        json_schema_extra={"example": 2},
+    )
+    errors: List[BookImportError] = Field(
+        default_factory=list,
+        title="Ошибки",
+        description="Ошибки по строкам (список может быть усечен).",
+    )
@@ -3,16 +3,53 @@
 
 - Создание, обновление и удаление книг.
 - Получение списка книг или данных о конкретной книге.
+- Полнотекстовый поиск книг.
+- Массовая загрузка книг из потока записей.
+- Потоковая выгрузка каталога книг.
+- Кэширование списка книг и данных о книгах.
+- Выборка только запрошенных полей книг.
 """
 
-from sqlalchemy import asc
-from sqlalchemy.ext.asyncio import AsyncSession
+from collections import defaultdict
+from typing import Any, AsyncIterator, Iterable, Sequence
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import func, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.future import select
 
 from ..authors import Author
+from ..cache import catalog_cache
+from ..config import settings
+from ..database import after_commit, commit
+from ..etag import make_etag
+from ..fields import field_columns, rows, rows_adapter
+from ..pagination import paginate
+from ..search import contains, search_query, search_rank, search_snippet
+from ..streaming import Record
 from .exceptions import BookNotFoundException
-from .models import Book
-from .schemas import BookCreate
+from .models import Book, book_author
+from .schemas import (
+    BookCreate,
+    BookImportError,
+    BookImportResult,
+    BookResponse,
+    BookSearchResponse,
+)
+
+book_list_adapter = TypeAdapter(list[BookResponse])
+book_detail_adapter = TypeAdapter(tuple[BookResponse, str])
+
+
+async def invalidate_book_cache(*book_ids: int) -> None:
+    """
+    Сбрасывает кэш списков книг и данные книг с указанными ID
+    одним сообщением об инвалидации.
+    """
+
+    tags = ["books:list", *(f"book:{book_id}" for book_id in book_ids)]
+    await catalog_cache.invalidate(*tags)
 
 
 async def create_book(book_data: BookCreate, db: AsyncSession) -> Book:
@@ -39,11 +76,76 @@ async def create_book(book_data: BookCreate, db: AsyncSession) -> Book:
     )
 
     db.add(new_book)
-    await db.commit()
+    await commit(db)
     await db.refresh(new_book)
+    await after_commit(db, invalidate_book_cache)
     return new_book
 
 
+async def get_book_detail(
+    book_id: int, db: AsyncSession
+) -> tuple[BookResponse, str]:
+    """
+    Получение данных о книге по ID через кэш.
+    Возвращает данные о книге и ее ETag.
+    Выбрасывает исключение, если книга не найдена.
+    """
+
+    async def load() -> tuple[Book, str]:
+        book = await get_book_by_id(book_id, db)
+        return book, book_etag(book)
+
+    return await catalog_cache.get_or_load(
+        catalog_cache.make_key("books:detail", id=book_id),
+        ("books:detail", f"book:{book_id}"),
+        load,
+        book_detail_adapter,
+    )
+
+
+async def _attach_authors(db: AsyncSession, books: list[dict]) -> None:
+    """Добавляет имена авторов к выборке книг одним запросом."""
+
+    result = await db.execute(
+        select(book_author.c.book_id, Author.name)
+        .join(Author, Author.id == book_author.c.author_id)
+        .filter(book_author.c.book_id.in_([book["id"] for book in books]))
+    )
+    names = defaultdict(list)
+    for book_id, name in result:
+        names[book_id].append(name)
+
+    for book in books:
+        book["authors"] = names[book["id"]]
+
+
+async def _select_books(
+    db: AsyncSession, query, fields: Sequence[str]
+) -> list[dict]:
+    books = rows(await db.execute(query))
+    if "authors" in fields and books:
+        await _attach_authors(db, books)
+    return books
+
+
+async def get_book_fields(
+    book_id: int, fields: Sequence[str], db: AsyncSession
+) -> dict:
+    """
+    Получение выбранных полей книги по ID. Авторы загружаются,
+    только если запрошено поле `authors`.
+    Выбрасывает исключение, если книга не найдена.
+    """
+
+    query = select(*field_columns(Book, fields)).filter(Book.id == book_id)
+    books = await _select_books(db, query, fields)
+
+    if not books:
+        raise BookNotFoundException()
+
+    return books[0]
+
+
 async def get_book_by_id(book_id: int, db: AsyncSession) -> Book:
     """
     Получение книги по ID.
@@ -59,24 +161,159 @@ async def get_book_by_id(book_id: int, db: AsyncSession) -> Book:
     return book
 
 
+def _book_version_etag(
+    book_id: int,
+    updated_at: Any,
+    authors_updated_at: Any,
+    author_ids: Iterable[int | None],
+) -> str:
+    author_ids = sorted(
+        author_id for author_id in author_ids if author_id is not None
+    )
+    return make_etag(
+        "book",
+        book_id,
+        updated_at,
+        authors_updated_at,
+        ",".join(map(str, author_ids)),
+    )
+
+
+def book_etag(book: Book) -> str:
+    """
+    ETag книги. Учитывает время изменения книги и ее авторов, а также
+    состав авторов: смена связей с авторами не меняет время изменения
+    книги, но меняет ответ.
+    """
+
+    authors_updated_at = max(
+        (author.updated_at for author in book.authors), default=None
+    )
+    return _book_version_etag(
+        book.id,
+        book.updated_at,
+        authors_updated_at,
+        (author.id for author in book.authors),
+    )
+
+
+async def get_book_etag(book_id: int, db: AsyncSession) -> str:
+    """
+    Получение ETag книги без загрузки ее данных: читаются только
+    времена изменения книги и ее авторов и ID авторов.
+    Выбрасывает исключение, если книга не найдена.
+    """
+
+    result = await db.execute(
+        select(
+            Book.updated_at,
+            func.max(Author.updated_at),
+            func.array_agg(book_author.c.author_id),
+        )
+        .outerjoin(book_author, book_author.c.book_id == Book.id)
+        .outerjoin(Author, Author.id == book_author.c.author_id)
+        .filter(Book.id == book_id)
+        .group_by(Book.id)
+    )
+    version = result.one_or_none()
+
+    if not version:
+        raise BookNotFoundException()
+
+    return _book_version_etag(book_id, *version)
+
+
 async def get_all_books(
     db: AsyncSession,
     limit: int = 10,
     offset: int = 0,
     genre: str | None = None,
-) -> list[Book]:
+    cursor: str | None = None,
+    fields: Sequence[str] | None = None,
+) -> list[BookResponse] | list[dict]:
     """
     Получение списка всех книг с пагинацией и фильтрацией по жанру.
+    При наличии курсора выборка продолжается после него, `offset`
+    игнорируется. Если заданы `fields`, читаются только соответствующие
+    колонки, а авторы - только при запросе поля `authors`.
+    Результат кэшируется по параметрам запроса.
     Возвращает список книг.
     """
 
-    query = select(Book).order_by(asc(Book.id))
-    if genre:
-        query = query.filter(Book.genre.ilike(f"%{genre}%"))
+    async def load() -> list[Book] | list[dict]:
+        if fields is None:
+            query = select(Book)
+        else:
+            query = select(*field_columns(Book, fields))
+        if genre:
+            query = query.filter(contains(Book.genre, genre))
 
-    query = query.limit(limit).offset(offset)
+        query = paginate(query, [Book.id], limit, offset, cursor)
+        if fields is not None:
+            return await _select_books(db, query, fields)
+
+        result = await db.execute(query)
+        return result.scalars().all()
+
+    return await catalog_cache.get_or_load(
+        catalog_cache.make_key(
+            "books:list",
+            limit=limit,
+            offset=offset,
+            genre=genre,
+            cursor=cursor,
+            fields=fields,
+        ),
+        ("books:list",),
+        load,
+        book_list_adapter if fields is None else rows_adapter,
+    )
+
+
+async def search_books(
+    db: AsyncSession,
+    q: str,
+    limit: int = 10,
+    offset: int = 0,
+) -> list[BookSearchResponse]:
+    """
+    Полнотекстовый поиск книг по названию и описанию.
+    Возвращает книги в порядке убывания релевантности с подсвеченными
+    фрагментами. Фрагменты строятся только для книг текущей страницы.
+    """
+
+    tsquery = search_query(q)
+    ranked = (
+        select(
+            Book.id.label("id"),
+            search_rank(Book.search_vector, tsquery).label("rank"),
+        )
+        .filter(Book.search_vector.bool_op("@@")(tsquery))
+        .order_by(
+            search_rank(Book.search_vector, tsquery).desc(), Book.id.asc()
+        )
+        .limit(limit)
+        .offset(offset)
+        .subquery()
+    )
+    snippet = search_snippet(
+        func.concat_ws(" ", Book.title, Book.description), tsquery
+    )
+    query = (
+        select(Book, ranked.c.rank, snippet.label("snippet"))
+        .join(ranked, ranked.c.id == Book.id)
+        .order_by(ranked.c.rank.desc(), Book.id.asc())
+    )
     result = await db.execute(query)
-    return result.scalars().all()
+
+    books = []
+    for book, rank, snippet in result.all():
+        book_response = BookSearchResponse.model_validate(book)
+        book_response.rank = rank
+        book_response.snippet = snippet
+        books.append(book_response)
+
+    return books
 
 
 async def update_book(
@@ -104,6 +341,7 @@ async def update_book(
     db.add(book)
     await db.commit()
     await db.refresh(book)
+    await invalidate_book_cache(book_id)
     return book
 
 
@@ -116,3 +354,159 @@ async def delete_book(book_id: int, db: AsyncSession) -> None:
     book = await get_book_by_id(book_id, db)
     await db.delete(book)
     await db.commit()
+    await invalidate_book_cache(book_id)
+
+
+def _add_import_error(
+    result: BookImportResult, line: int, errors: list[str]
+) -> None:
+    result.failed += 1
+    if len(result.errors) < settings.BULK_IMPORT_MAX_ERRORS:
+        result.errors.append(BookImportError(line=line, errors=errors))
+
+
+def _prepare_import_record(record: dict[str, Any]) -> dict[str, Any]:
+    """Приводит строковые значения из CSV к виду, ожидаемому схемой."""
+
+    author_ids = record.get("author_ids")
+    if isinstance(author_ids, str):
+        record["author_ids"] = [
+            value.strip() for value in author_ids.split(";") if value.strip()
+        ]
+    if record.get("description") == "":
+        record["description"] = None
+    return record
+
+
+async def _insert_books(
+    db: AsyncSession, books: list[tuple[int, BookCreate]]
+) -> None:
+    """Многострочные вставки книг и их связей с авторами."""
+
+    book_ids = (
+        await db.scalars(
+            insert(Book).returning(Book.id, sort_by_parameter_order=True),
+            [book.model_dump(exclude={"author_ids"}) for _, book in books],
+        )
+    ).all()
+    links = [
+        {"book_id": book_id, "author_id": author_id}
+        for book_id, (_, book) in zip(book_ids, books)
+        for author_id in dict.fromkeys(book.author_ids)
+    ]
+    if links:
+        await db.execute(insert(book_author), links)
+
+
+async def _insert_books_chunk(
+    db: AsyncSession,
+    chunk: list[tuple[int, BookCreate]],
+    result: BookImportResult,
+) -> None:
+    """
+    Добавляет пачку книг: один запрос для проверки авторов,
+    многострочные вставки книг и связей с авторами, одна фиксация.
+    Если пачка нарушает ограничения базы данных, она добавляется заново
+    по одной книге в точках сохранения, и ошибка записывается только
+    для строк, которые их нарушают.
+    """
+
+    author_ids = {
+        author_id for _, book in chunk for author_id in book.author_ids
+    }
+    existing = set(
+        await db.scalars(select(Author.id).filter(Author.id.in_(author_ids)))
+    )
+
+    valid = []
+    for line, book in chunk:
+        missing = sorted(set(book.author_ids) - existing)
+        if missing:
+            _add_import_error(
+                result,
+                line,
+                [f"Authors not found: {', '.join(map(str, missing))}"],
+            )
+        else:
+            valid.append((line, book))
+
+    if not valid:
+        return
+
+    try:
+        await _insert_books(db, valid)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+    else:
+        result.created += len(valid)
+        return
+
+    for line, book in valid:
+        try:
+            async with db.begin_nested():
+                await _insert_books(db, [(line, book)])
+        except IntegrityError:
+            _add_import_error(result, line, ["Database integrity error."])
+        else:
+            result.created += 1
+    await db.commit()
+
+
+async def import_books(
+    db: AsyncSession,
+    records: AsyncIterator[Record],
+    chunk_size: int = settings.BULK_IMPORT_CHUNK_SIZE,
+) -> BookImportResult:
+    """
+    Массовая загрузка книг из потока записей.
+    Записи проверяются по схеме создания книги и добавляются пачками
+    по `chunk_size`, каждая пачка фиксируется отдельно.
+    Возвращает отчет с количеством добавленных книг и ошибками по строкам.
+    """
+
+    result = BookImportResult()
+    chunk: list[tuple[int, BookCreate]] = []
+
+    async for line, record, error in records:
+        if error:
+            _add_import_error(result, line, [error])
+            continue
+
+        try:
+            book = BookCreate.model_validate(_prepare_import_record(record))
+        except ValidationError as e:
+            _add_import_error(result, line, [err["msg"] for err in e.errors()])
+            continue
+
+        chunk.append((line, book))
+        if len(chunk) >= chunk_size:
+            await _insert_books_chunk(db, chunk, result)
+            chunk = []
+
+    if chunk:
+        await _insert_books_chunk(db, chunk, result)
+
+    if result.created:
+        await invalidate_book_cache()
+    return result
+
+
+async def export_books(
+    session_factory: async_sessionmaker[AsyncSession],
+    batch_size: int = settings.EXPORT_BATCH_SIZE,
+) -> AsyncIterator[BookResponse]:
+    """
+    Потоковая выгрузка всех книг в порядке ID.
+    Книги читаются через серверный курсор пачками по `batch_size`,
+    поэтому расход памяти не зависит от размера каталога.
+    """
+
+    async with session_factory() as db:
+        result = await db.stream(
+            select(Book)
+            .order_by(Book.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for book in result.scalars():
+            yield BookResponse.model_validate(book)
@@ -0,0 +1,272 @@
+"""
+Кэширование данных:
+
+- `TTLCache`: LRU-кэш ограниченного размера с временем жизни записей.
+- `MemoryBackend`, `RedisBackend`, `NullBackend`: хранилища кэша
+  сериализованных ответов с инвалидацией по тегам.
+- `ResponseCache`: сквозной (read-through) кэш результатов сервисов
+  со счетчиками попаданий и промахов. Инвалидация рассылается другим
+  процессам через шину инвалидации.
+- `catalog_cache`: кэш каталога (книги и авторы).
+"""
+
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from typing import Any, Awaitable, Callable, Hashable, Sequence, TypeVar
+
+from pydantic import TypeAdapter
+
+from .config import settings
+from .invalidation import invalidation_bus
+
+T = TypeVar("T")
+
+
+class TTLCache:
+    """
+    LRU-кэш ограниченного размера с временем жизни записей.
+    При переполнении вытесняются давно не использованные записи,
+    устаревшие записи удаляются при обращении к ним.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return default
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class CacheBackend(ABC):
+    """
+    Хранилище сериализованных значений с инвалидацией по тегам.
+    Общее (`shared`) хранилище доступно всем процессам приложения
+    и не требует рассылки инвалидации.
+    """
+
+    shared = False
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None: ...
+
+    @abstractmethod
+    async def set(
+        self, key: str, value: bytes, ttl: float, tags: Sequence[str]
+    ) -> None: ...
+
+    @abstractmethod
+    async def invalidate(self, *tags: str) -> None: ...
+
+    @abstractmethod
+    async def clear(self) -> None: ...
+
+
+class NullBackend(CacheBackend):
+    """Отключенный кэш: значения не сохраняются."""
+
+    async def get(self, key: str) -> bytes | None:
+        return None
+
+    async def set(
+        self, key: str, value: bytes, ttl: float, tags: Sequence[str]
+    ) -> None:
+        pass
+
+    async def invalidate(self, *tags: str) -> None:
+        pass
+
+    async def clear(self) -> None:
+        pass
+
+
+class MemoryBackend(CacheBackend):
+    """Кэш в памяти процесса (LRU с временем жизни записей)."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._tags: defaultdict[str, set[str]] = defaultdict(set)
+
+    async def get(self, key: str) -> bytes | None:
+        return self._cache.get(key)
+
+    async def set(
+        self, key: str, value: bytes, ttl: float, tags: Sequence[str]
+    ) -> None:
+        self._cache.set(key, value, ttl)
+        for tag in tags:
+            keys = self._tags[tag]
+            keys.add(key)
+            if len(keys) > self._cache.maxsize:
+                keys.intersection_update(
+                    [cached for cached in keys if cached in self._cache]
+                )
+
+    async def invalidate(self, *tags: str) -> None:
+        for tag in tags:
+            for key in self._tags.pop(tag, ()):
+                self._cache.delete(key)
+
+    async def clear(self) -> None:
+        self._cache.clear()
+        self._tags.clear()
+
+
+class RedisBackend(CacheBackend):
+    """
+    Кэш в Redis (или совместимом по протоколу хранилище).
+    Ключи каждого тега хранятся в множестве `<prefix>tag:<тег>`.
+    """
+
+    shared = True
+
+    def __init__(self, client: Any, prefix: str = "library:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisBackend":
+        from redis.asyncio import Redis
+
+        return cls(Redis.from_url(url))
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}tag:{tag}"
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.client.get(self.prefix + key)
+
+    async def set(
+        self, key: str, value: bytes, ttl: float, tags: Sequence[str]
+    ) -> None:
+        ttl_ms = max(int(ttl * 1000), 1)
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(self.prefix + key, value, px=ttl_ms)
+            for tag in tags:
+                pipe.sadd(self._tag_key(tag), self.prefix + key)
+                pipe.pexpire(self._tag_key(tag), ttl_ms)
+            await pipe.execute()
+
+    async def invalidate(self, *tags: str) -> None:
+        for tag in tags:
+            keys = await self.client.smembers(self._tag_key(tag))
+            await self.client.delete(self._tag_key(tag), *keys)
+
+    async def clear(self) -> None:
+        keys = [key async for key in self.client.scan_iter(self.prefix + "*")]
+        if keys:
+            await self.client.delete(*keys)
+
+
+class ResponseCache:
+    """
+    Сквозной кэш результатов сервисов.
+    Значения хранятся в виде JSON, сериализуемого схемами ответа.
+    """
+
+    def __init__(self, name: str, backend: CacheBackend, ttl: float):
+        self.name = name
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(namespace: str, **params: Any) -> str:
+        return f"{namespace}:{json.dumps(params, sort_keys=True)}"
+
+    async def get_or_load(
+        self,
+        key: str,
+        tags: Sequence[str],
+        loader: Callable[[], Awaitable[Any]],
+        adapter: TypeAdapter[T],
+    ) -> T:
+        """
+        Возвращает значение из кэша, при промахе вызывает `loader`,
+        приводит результат к схеме ответа и сохраняет его.
+        """
+
+        data = await self.backend.get(key)
+        if data is not None:
+            self.hits += 1
+            return adapter.validate_json(data)
+
+        self.misses += 1
+        value = adapter.validate_python(await loader(), from_attributes=True)
+        await self.backend.set(key, adapter.dump_json(value), self.ttl, tags)
+        return value
+
+    async def invalidate(self, *tags: str) -> None:
+        """Сбрасывает теги и рассылает инвалидацию другим процессам."""
+
+        self.invalidations += 1
+        await self.backend.invalidate(*tags)
+        if not self.backend.shared:
+            await invalidation_bus.publish(self.name, tags)
+
+    async def evict(self, tags: list[str] | None) -> None:
+        """Обработчик шины: сбрасывает теги или весь кэш (None)."""
+
+        if tags is None:
+            await self.backend.clear()
+        else:
+            await self.backend.invalidate(*tags)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+def create_backend() -> CacheBackend:
+    """Создает хранилище кэша согласно настройкам."""
+
+    if settings.CACHE_BACKEND == "redis":
+        return RedisBackend.from_url(settings.CACHE_REDIS_URL)
+    if settings.CACHE_BACKEND == "memory":
+        return MemoryBackend(
+            maxsize=settings.CACHE_MAX_ENTRIES, ttl=settings.CACHE_TTL
+        )
+    return NullBackend()
+
+
+catalog_cache = ResponseCache(
+    "catalog", create_backend(), ttl=settings.CACHE_TTL
+)
+invalidation_bus.register(catalog_cache.name, catalog_cache.evict)
@@ -1,7 +1,10 @@
 import os
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+PasswordHashExecutor = Literal["thread", "process"]
+
 
 class Settings(BaseSettings):
     """
@@ -19,9 +22,48 @@ class Settings(BaseSettings):
     DB_PASS: str
     DB_NAME: str
 
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 10.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    SLOW_QUERY_THRESHOLD_MS: float = 200.0
+    DB_TIMING_HEADERS: bool = False
+
     HOST: str
     PORT: int
 
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL: float = 60.0
+
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_EXECUTOR: PasswordHashExecutor = "thread"
+    PASSWORD_HASH_ROUNDS: int = 12
+
+    BULK_IMPORT_CHUNK_SIZE: int = 1000
+    BULK_IMPORT_MAX_ERRORS: int = 1000
+    EXPORT_BATCH_SIZE: int = 1000
+
+    FAST_JSON_RESPONSES: bool = True
+
+    CACHE_BACKEND: str = "memory"
+    CACHE_TTL: float = 30.0
+    CACHE_MAX_ENTRIES: int = 10000
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+
+    INVALIDATION_BUS: str = "memory"
+    INVALIDATION_CHANNEL: str = "library_invalidation"
+
+    IDEMPOTENCY_TTL: int = 86400
+    IDEMPOTENCY_LOCK_TIMEOUT: int = 60
+    IDEMPOTENCY_SWEEP_INTERVAL: float = 3600.0
+    IDEMPOTENCY_SWEEP_BATCH: int = 1000
+
+    OVERDUE_SCAN_INTERVAL: float = 3600.0
+    OVERDUE_SCAN_BATCH_SIZE: int = 1000
+
     MODE: str = "DEV"
 
     @property
@@ -31,6 +73,13 @@ class Settings(BaseSettings):
             f"{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
         )
 
+    @property
+    def database_dsn(self):
+        return (
+            f"postgresql://{self.DB_USER}:"
+            f"{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+        )
+
     model_config = SettingsConfigDict(
         env_file=".test.env" if os.getenv("MODE") == "TEST" else ".env"
     )
@@ -2,13 +2,26 @@
 Модуль для настройки асинхронной базы данных.
 
 - `engine`: Асинхронный движок SQLAlchemy для работы с PostgreSQL.
+  Размер пула, таймауты и логирование SQL задаются через `Settings`.
+  `DB_ECHO` предназначен для локальной отладки; время запросов
+  и медленные запросы отслеживаются модулем `instrumentation`.
 - `async_session`: Фабрика сессий для работы с базой данных.
 - `Base`: Базовый класс для всех моделей ORM.
+- `log_pool_status`: Запись состояния пула соединений в лог.
+- `get_session_factory`: Фабрика сессий для потоковых ответов, которые
+  читают данные уже после выхода из зависимостей запроса.
+- `commit` и `after_commit`: фиксация транзакции и действия после нее.
+  Внутри `defer_commit` фиксацию выполняет вызывающий код, например
+  идемпотентный запрос, который сохраняет ответ в той же транзакции.
+- Перед созданием схемы в PostgreSQL подключается расширение `pg_trgm`,
+  необходимое для триграммных индексов.
 """
 
 import logging
-from typing import Any, AsyncGenerator
+from contextlib import contextmanager
+from typing import Any, AsyncGenerator, Awaitable, Callable, Iterator
 
+from sqlalchemy import DDL, event
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     async_sessionmaker,
@@ -20,8 +33,22 @@ from .config import settings
 
 logger = logging.getLogger("database")
 
+DEFERRED_COMMIT = "deferred_commit"
+
 try:
-    engine = create_async_engine(settings.async_database_url, echo=True)
+    engine = create_async_engine(
+        settings.async_database_url,
+        echo=settings.DB_ECHO,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        },
+    )
 except Exception as e:
     raise RuntimeError(f"Error initializing database engine: {e}")
 
@@ -37,5 +64,84 @@ async def get_async_session() -> AsyncGenerator[Any, Any]:
     logger.info("Database session closed")
 
 
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    return async_session
+
+
+async def commit(db: AsyncSession) -> None:
+    """
+    Фиксирует транзакцию сессии. Если фиксация отложена (`defer_commit`),
+    изменения только отправляются в базу.
+    """
+
+    if DEFERRED_COMMIT in db.info:
+        await db.flush()
+    else:
+        await db.commit()
+
+
+async def after_commit(
+    db: AsyncSession, action: Callable[..., Awaitable[Any]], *args: Any
+) -> None:
+    """
+    Выполняет действие после фиксации транзакции: сразу или, если
+    фиксация отложена, когда ее выполнит вызывающий код.
+    """
+
+    deferred = db.info.get(DEFERRED_COMMIT)
+    if deferred is None:
+        await action(*args)
+    else:
+        deferred.append((action, args))
+
+
+@contextmanager
+def defer_commit(
+    db: AsyncSession,
+) -> Iterator[list[tuple[Callable[..., Awaitable[Any]], tuple]]]:
+    """
+    Откладывает фиксацию транзакции сессии на время блока.
+    Возвращает список действий, которые нужно выполнить после фиксации.
+    При вложенном использовании по выходе из блока восстанавливается
+    отложенная фиксация внешнего блока.
+    """
+
+    actions: list[tuple[Callable[..., Awaitable[Any]], tuple]] = []
+    previous = db.info.get(DEFERRED_COMMIT)
+    db.info[DEFERRED_COMMIT] = actions
+    try:
+        yield actions
+    finally:
+        if previous is None:
+            del db.info[DEFERRED_COMMIT]
+        else:
+            db.info[DEFERRED_COMMIT] = previous
+
+
+def log_pool_status() -> None:
+    """Записывает в лог настройки и текущее состояние пула соединений."""
+
+    logger.info(
+        "Connection pool: size=%s, max_overflow=%s, timeout=%ss, "
+        "recycle=%ss, pre_ping=%s, statement_cache_size=%s; %s",
+        settings.DB_POOL_SIZE,
+        settings.DB_MAX_OVERFLOW,
+        settings.DB_POOL_TIMEOUT,
+        settings.DB_POOL_RECYCLE,
+        settings.DB_POOL_PRE_PING,
+        settings.DB_STATEMENT_CACHE_SIZE,
+        engine.pool.status(),
+    )
+
+
 class Base(DeclarativeBase):
     pass
+
+
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(
+        dialect="postgresql"
+    ),
+)
@@ -0,0 +1,59 @@
+"""
+Условные GET-запросы:
+
+- Построение сильного ETag по идентификатору и времени изменения ресурса.
+- ETag представления ресурса с выборочными полями.
+- Проверка заголовка `If-None-Match` и ответ `304 Not Modified`.
+"""
+
+import hashlib
+from typing import Any, Sequence
+
+from fastapi import Request, Response, status
+
+
+def make_etag(*parts: Any) -> str:
+    """Строит сильный ETag из частей версии ресурса."""
+
+    digest = hashlib.sha1(
+        ":".join(str(part) for part in parts).encode()
+    ).hexdigest()
+    return f'"{digest}"'
+
+
+def fields_etag(etag: str, fields: Sequence[str] | None) -> str:
+    """
+    ETag представления с выборочными полями: отличается от ETag полного
+    представления, так как тело ответа другое.
+    """
+
+    if fields is None:
+        return etag
+    return make_etag(etag, *fields)
+
+
+def is_conditional(request: Request) -> bool:
+    """Проверяет, передан ли заголовок `If-None-Match`."""
+
+    return "if-none-match" in request.headers
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Проверяет, совпадает ли ETag с одним из тегов `If-None-Match`."""
+
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in tags
+
+
+def not_modified(etag: str) -> Response:
+    """Ответ `304 Not Modified` без тела."""
+
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+    )
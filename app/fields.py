@@ -0,0 +1,81 @@
+"""
+Выборочные поля ответа (sparse fieldsets):
+
+- Разбор параметра `fields` со списком полей через запятую.
+- Проекция запроса на колонки модели, соответствующие полям, чтобы
+  не читать из базы данных неиспользуемые колонки и связи.
+- Поле `id` возвращается всегда: по нему строится курсор пагинации.
+"""
+
+from typing import Any, Callable, Sequence
+
+from fastapi import Query, status
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import Result, inspect
+from sqlalchemy.orm import InstrumentedAttribute
+
+from .users.exceptions import CustomException
+
+REQUIRED_FIELDS = ("id",)
+
+rows_adapter = TypeAdapter(list[dict[str, Any]])
+
+
+class InvalidFieldsException(CustomException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    detail = "Unknown fields requested"
+
+
+def parse_fields(
+    value: str | None, allowed: Sequence[str]
+) -> list[str] | None:
+    """
+    Разбирает список полей. Возвращает поля в порядке схемы ответа
+    или None, если параметр не передан.
+    Выбрасывает исключение, если запрошено неизвестное поле.
+    """
+
+    if value is None:
+        return None
+
+    requested = {name.strip() for name in value.split(",") if name.strip()}
+    if requested - set(allowed):
+        raise InvalidFieldsException()
+
+    requested.update(REQUIRED_FIELDS)
+    return [name for name in allowed if name in requested]
+
+
+def fields_query(
+    schema: type[BaseModel],
+) -> Callable[[str | None], list[str] | None]:
+    """Зависимость FastAPI для параметра `fields` по схеме ответа."""
+
+    allowed = list(schema.model_fields)
+
+    def dependency(
+        fields: str | None = Query(
+            None,
+            description=(
+                "Поля ответа через запятую: " + ", ".join(allowed) + "."
+            ),
+        ),
+    ) -> list[str] | None:
+        return parse_fields(fields, allowed)
+
+    return dependency
+
+
+def field_columns(
+    model: type, fields: Sequence[str]
+) -> list[InstrumentedAttribute]:
+    """Колонки модели для запрошенных полей (связи пропускаются)."""
+
+    columns = inspect(model).columns.keys()
+    return [getattr(model, name) for name in fields if name in columns]
+
+
+def rows(result: Result) -> list[dict[str, Any]]:
+    """Строки результата проекции в виде словарей."""
+
+    return [dict(row._mapping) for row in result]
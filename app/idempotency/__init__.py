@@ -0,0 +1,15 @@
+from .models import IdempotencyKey
+from .services import (
+    Idempotency,
+    get_idempotency,
+    idempotency_sweeper,
+    sweep_idempotency_keys,
+)
+
+__all__ = [
+    "Idempotency",
+    "IdempotencyKey",
+    "get_idempotency",
+    "idempotency_sweeper",
+    "sweep_idempotency_keys",
+]
@@ -0,0 +1,13 @@
+from fastapi import status
+
+from ..users import CustomException
+
+
+class IdempotencyKeyReusedException(CustomException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    detail = "Idempotency key was used for a different request"
+
+
+class IdempotencyKeyInProgressException(CustomException):
+    status_code = status.HTTP_409_CONFLICT
+    detail = "Request with this idempotency key is in progress"
@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from sqlalchemy import Integer, LargeBinary, SmallInteger, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..database import Base
+
+
+class IdempotencyKey(Base):
+    """
+    Модель ключа идемпотентности. Хранит отпечаток запроса и сохраненный
+    ответ; пока ответа нет, запрос с этим ключом считается выполняемым
+    до истечения `locked_until`.
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    user_id: Mapped[int] = mapped_column(
+        Integer, primary_key=True, doc="ID пользователя, отправившего запрос"
+    )
+    key: Mapped[str] = mapped_column(
+        String(255), primary_key=True, doc="Ключ из заголовка запроса"
+    )
+    fingerprint: Mapped[str] = mapped_column(
+        String(64), nullable=False, doc="SHA-256 метода, пути и тела запроса"
+    )
+    status_code: Mapped[int] = mapped_column(
+        SmallInteger, nullable=True, doc="Код сохраненного ответа"
+    )
+    response: Mapped[bytes] = mapped_column(
+        LargeBinary, nullable=True, doc="Тело сохраненного ответа"
+    )
+    locked_until: Mapped[datetime] = mapped_column(
+        nullable=True,
+        doc="Время, после которого незавершенный запрос можно повторить",
+    )
+    expires_at: Mapped[datetime] = mapped_column(
+        nullable=False, index=True, doc="Время, после которого ключ удаляется"
+    )
@@ -0,0 +1,304 @@
+"""
+Идемпотентность изменяющих запросов:
+
+- Клиент передает заголовок `Idempotency-Key`. Первый запрос с ключом
+  резервирует его, выполняет обработчик и сохраняет ответ; повторные
+  запросы с тем же ключом получают сохраненный ответ без повторного
+  выполнения обработчика.
+- Изменения обработчика и сохраненный ответ фиксируются в одной
+  транзакции: обработчик только отправляет изменения в базу, а действия
+  после фиксации (сброс кэша) откладываются до нее.
+- Резерв ключа действует `IDEMPOTENCY_LOCK_TIMEOUT` секунд. Ключ
+  с истекшим резервом без ответа (например, после падения процесса)
+  резервируется заново; прежний запрос уже не сможет сохранить ответ,
+  и его изменения откатываются.
+- Ключ действует в пределах пользователя и привязан к отпечатку запроса
+  (метод, путь и тело). Повтор ключа с другим запросом отклоняется.
+- Если обработчик или сохранение ответа завершились ошибкой до фиксации,
+  изменения откатываются, резерв снимается, и запрос с тем же ключом
+  можно повторить. Если не удалась сама фиксация, ключ остается
+  зарезервированным до истечения резерва.
+- Ключи хранятся `IDEMPOTENCY_TTL` секунд; просроченные ключи удаляются
+  фоновой задачей и командой `manage.py sweep-idempotency-keys`.
+"""
+
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Awaitable, Callable
+
+from fastapi import Header, Request
+from pydantic import TypeAdapter
+from sqlalchemy import and_, delete, func, or_, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.future import select
+
+from ..config import settings
+from ..database import after_commit, async_session, commit, defer_commit
+from ..serialization import JSONBytesResponse, any_adapter
+from .exceptions import (
+    IdempotencyKeyInProgressException,
+    IdempotencyKeyReusedException,
+)
+from .models import IdempotencyKey
+
+logger = logging.getLogger("library_api.idempotency")
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+@lru_cache
+def response_adapter(response_model: Any) -> TypeAdapter:
+    """Адаптер схемы ответа маршрута (создается один раз на схему)."""
+
+    return TypeAdapter(response_model)
+
+
+class Idempotency:
+    """Ключ идемпотентности запроса и сведения о его ответе."""
+
+    def __init__(
+        self,
+        key: str | None,
+        fingerprint: str,
+        response_model: Any,
+        status_code: int,
+    ):
+        self.key = key
+        self.fingerprint = fingerprint
+        self.response_model = response_model
+        self.status_code = status_code
+        self.locked_until: datetime | None = None
+
+    def _dump(self, result: Any) -> bytes:
+        if self.response_model is None:
+            return any_adapter.dump_json(result)
+        adapter = response_adapter(self.response_model)
+        return adapter.dump_json(
+            adapter.validate_python(result, from_attributes=True)
+        )
+
+    def _filter(self, user_id: int):
+        """Условие на ключ, зарезервированный этим запросом."""
+
+        return (
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == self.key,
+            IdempotencyKey.locked_until == self.locked_until,
+        )
+
+    async def _reserve(
+        self, db: AsyncSession, user_id: int
+    ) -> IdempotencyKey | None:
+        """
+        Резервирует ключ. Просроченный ключ и ключ с истекшим резервом
+        без ответа резервируются заново.
+        Возвращает None, если ключ зарезервирован этим запросом,
+        иначе - существующую запись.
+        """
+
+        expires_at = func.now() + timedelta(seconds=settings.IDEMPOTENCY_TTL)
+        locked_until = func.now() + timedelta(
+            seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT
+        )
+        statement = insert(IdempotencyKey).values(
+            user_id=user_id,
+            key=self.key,
+            fingerprint=self.fingerprint,
+            locked_until=locked_until,
+            expires_at=expires_at,
+        )
+        self.locked_until = await db.scalar(
+            statement.on_conflict_do_update(
+                index_elements=[IdempotencyKey.user_id, IdempotencyKey.key],
+                set_={
+                    "fingerprint": statement.excluded.fingerprint,
+                    "status_code": None,
+                    "response": None,
+                    "locked_until": statement.excluded.locked_until,
+                    "expires_at": statement.excluded.expires_at,
+                },
+                where=or_(
+                    IdempotencyKey.expires_at < func.now(),
+                    and_(
+                        IdempotencyKey.status_code.is_(None),
+                        IdempotencyKey.locked_until < func.now(),
+                    ),
+                ),
+            ).returning(IdempotencyKey.locked_until)
+        )
+
+        existing = None
+        if self.locked_until is None:
+            existing = await db.scalar(
+                select(IdempotencyKey).filter(
+                    IdempotencyKey.user_id == user_id,
+                    IdempotencyKey.key == self.key,
+                )
+            )
+        await db.commit()
+
+        if self.locked_until is not None:
+            return None
+        if existing is None or existing.status_code is None:
+            raise IdempotencyKeyInProgressException()
+        if existing.fingerprint != self.fingerprint:
+            raise IdempotencyKeyReusedException()
+        return existing
+
+    async def run(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        handler: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """
+        Выполняет обработчик не более одного раза для ключа.
+        Изменения обработчика фиксируются вместе с сохраненным ответом.
+        Без ключа обработчик выполняется как обычно.
+        Возвращает ответ обработчика или сохраненный ответ.
+        """
+
+        if self.key is None:
+            return await handler()
+
+        existing = await self._reserve(db, user_id)
+        if existing is not None:
+            return JSONBytesResponse(
+                existing.response,
+                status_code=existing.status_code,
+                headers={REPLAYED_HEADER: "true"},
+            )
+
+        with defer_commit(db) as actions:
+            try:
+                content = self._dump(await handler())
+                saved = await db.execute(
+                    update(IdempotencyKey)
+                    .filter(*self._filter(user_id))
+                    .values(
+                        status_code=self.status_code,
+                        response=content,
+                        locked_until=None,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                if not saved.rowcount:
+                    # Резерв истек, и ключ занят повторным запросом.
+                    raise IdempotencyKeyInProgressException()
+            except Exception:
+                await db.rollback()
+                await db.execute(
+                    delete(IdempotencyKey)
+                    .filter(*self._filter(user_id))
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+                raise
+
+        await commit(db)
+        for action, args in actions:
+            await after_commit(db, action, *args)
+        return JSONBytesResponse(content, status_code=self.status_code)
+
+
+async def get_idempotency(
+    request: Request,
+    key: str | None = Header(
+        None,
+        alias=IDEMPOTENCY_HEADER,
+        min_length=1,
+        max_length=255,
+        description="Ключ для безопасного повтора запроса.",
+    ),
+) -> Idempotency:
+    """
+    Зависимость маршрута: ключ идемпотентности и отпечаток запроса.
+    Схема и код ответа берутся из описания маршрута.
+    """
+
+    route = request.scope.get("route")
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.url.path}\n".encode())
+    digest.update(await request.body())
+    return Idempotency(
+        key,
+        digest.hexdigest(),
+        getattr(route, "response_model", None),
+        getattr(route, "status_code", None) or 200,
+    )
+
+
+async def sweep_idempotency_keys(
+    db: AsyncSession, batch_size: int = settings.IDEMPOTENCY_SWEEP_BATCH
+) -> int:
+    """
+    Удаляет просроченные ключи пачками по `batch_size`, чтобы не
+    удерживать блокировки долго.
+    Возвращает количество удаленных ключей.
+    """
+
+    deleted = 0
+    while True:
+        expired = (
+            select(IdempotencyKey.user_id, IdempotencyKey.key)
+            .filter(IdempotencyKey.expires_at < func.now())
+            .limit(batch_size)
+        )
+        result = await db.execute(
+            delete(IdempotencyKey)
+            .filter(
+                tuple_(IdempotencyKey.user_id, IdempotencyKey.key).in_(expired)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
+
+
+class IdempotencySweeper:
+    """Фоновая задача, периодически удаляющая просроченные ключи."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        interval: float,
+    ):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    async def sweep(self) -> int:
+        async with self.session_factory() as db:
+            deleted = await sweep_idempotency_keys(db)
+        if deleted:
+            logger.info("Expired idempotency keys removed: %s", deleted)
+        return deleted
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Idempotency key sweep failed")
+
+    async def start(self) -> None:
+        if self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+
+idempotency_sweeper = IdempotencySweeper(
+    async_session, settings.IDEMPOTENCY_SWEEP_INTERVAL
+)
@@ -0,0 +1,109 @@
+"""
+Инструментирование SQL-запросов:
+
+- Подсчет запросов и суммарного времени работы с базой данных
+  в контексте текущего HTTP-запроса (события `before_cursor_execute`
+  и `after_cursor_execute`).
+- Журнал медленных запросов: запросы дольше `SLOW_QUERY_THRESHOLD_MS`
+  записываются в лог вместе с формой параметров (типы, без значений).
+- Заголовки `Server-Timing` и `X-DB-Queries` со стоимостью запроса
+  к базе данных (включаются настройкой `DB_TIMING_HEADERS`).
+"""
+
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import settings
+
+logger = logging.getLogger("library_api.sql")
+
+QUERY_START_KEY = "query_start_time"
+SERVER_TIMING_HEADER = "Server-Timing"
+DB_QUERIES_HEADER = "X-DB-Queries"
+
+
+@dataclass
+class QueryStats:
+    """Число SQL-запросов и суммарное время их выполнения."""
+
+    queries: int = 0
+    seconds: float = 0.0
+
+    def headers(self) -> list[tuple[bytes, bytes]]:
+        """Заголовки ответа со стоимостью запроса к базе данных."""
+
+        timing = (
+            f'db;dur={self.seconds * 1000:.1f};desc="{self.queries} queries"'
+        )
+        return [
+            (SERVER_TIMING_HEADER.lower().encode(), timing.encode()),
+            (DB_QUERIES_HEADER.lower().encode(), str(self.queries).encode()),
+        ]
+
+
+query_stats: ContextVar[QueryStats | None] = ContextVar(
+    "query_stats", default=None
+)
+
+
+def parameters_shape(parameters: Any, executemany: bool = False) -> str:
+    """
+    Форма параметров запроса: имена и типы без значений,
+    чтобы в лог не попадали персональные данные.
+    """
+
+    if executemany and isinstance(parameters, (list, tuple)):
+        if not parameters:
+            return "[]"
+        first = parameters_shape(parameters[0])
+        return f"{len(parameters)} x {first}"
+
+    if isinstance(parameters, dict):
+        items = (f"{k}: {type(v).__name__}" for k, v in parameters.items())
+        return "{" + ", ".join(items) + "}"
+
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(v).__name__ for v in parameters) + ")"
+
+    return type(parameters).__name__
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def before_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+):
+    conn.info.setdefault(QUERY_START_KEY, []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def after_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+):
+    elapsed = time.perf_counter() - conn.info[QUERY_START_KEY].pop()
+
+    stats = query_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += elapsed
+
+    if elapsed * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+        logger.warning(
+            "Slow query (%.1f ms): %s; parameters: %s",
+            elapsed * 1000,
+            " ".join(statement.split()),
+            parameters_shape(parameters, executemany),
+        )
+
+
+@event.listens_for(Engine, "handle_error")
+def handle_error(context):
+    if context.connection is not None:
+        starts = context.connection.info.get(QUERY_START_KEY)
+        if starts:
+            starts.pop()
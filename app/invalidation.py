@@ -0,0 +1,185 @@
+"""
+Шина инвалидации кэшей между процессами:
+
+- Сервисы после фиксации транзакции публикуют ключи, которые нужно
+  сбросить, в именованный кэш (`catalog`, `users`).
+- Публикующий процесс сбрасывает ключи у себя сам, остальные процессы
+  получают сообщение через шину и сбрасывают их у себя.
+- `PostgresBus` доставляет сообщения через `LISTEN/NOTIFY`;
+  `MemoryBus` работает в пределах процесса и используется в тестах.
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Sequence
+
+import asyncpg
+from sqlalchemy import func, select
+
+from .config import settings
+from .database import engine
+
+logger = logging.getLogger("library_api.invalidation")
+
+Handler = Callable[[list[str] | None], Awaitable[None]]
+
+
+class InvalidationBus(ABC):
+    """
+    Базовая шина инвалидации.
+    Обработчик кэша получает список ключей (тегов) или None,
+    если кэш нужно очистить полностью.
+    """
+
+    def __init__(self):
+        self.origin = uuid.uuid4().hex
+        self.handlers: dict[str, list[Handler]] = {}
+        self.published = 0
+        self.received = 0
+
+    def register(self, name: str, handler: Handler) -> None:
+        """Подписывает локальный кэш на сообщения шины."""
+
+        self.handlers.setdefault(name, []).append(handler)
+
+    async def dispatch(self, name: str, keys: list[str] | None) -> None:
+        for handler in self.handlers.get(name, ()):
+            await handler(keys)
+
+    async def publish(self, name: str, keys: Sequence[str]) -> None:
+        """Рассылает ключи для сброса другим процессам."""
+
+        message = json.dumps(
+            {"origin": self.origin, "cache": name, "keys": list(keys)},
+            ensure_ascii=False,
+        )
+        try:
+            await self.send(message)
+        except Exception:
+            logger.exception("Failed to publish invalidation for %s", name)
+        else:
+            self.published += 1
+
+    async def receive(self, message: str) -> None:
+        """Обрабатывает сообщение другого процесса."""
+
+        data = json.loads(message)
+        if data["origin"] == self.origin:
+            return
+
+        self.received += 1
+        await self.dispatch(data["cache"], data["keys"])
+
+    async def flush(self) -> None:
+        """Полностью очищает все локальные кэши."""
+
+        for name in self.handlers:
+            await self.dispatch(name, None)
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {"published": self.published, "received": self.received}
+
+    @abstractmethod
+    async def send(self, message: str) -> None: ...
+
+
+class MemoryBus(InvalidationBus):
+    """
+    Шина в пределах процесса. Шины с общим списком `peers`
+    обмениваются сообщениями, как отдельные процессы.
+    """
+
+    def __init__(self, peers: list["MemoryBus"] | None = None):
+        super().__init__()
+        self.peers = peers if peers is not None else []
+        self.peers.append(self)
+
+    async def send(self, message: str) -> None:
+        for peer in self.peers:
+            if peer is not self:
+                await peer.receive(message)
+
+
+class PostgresBus(InvalidationBus):
+    """
+    Шина на основе `LISTEN/NOTIFY` PostgreSQL.
+    Уведомления публикуются через пул соединений приложения, а слушает
+    их отдельное соединение asyncpg. При потере соединения шина
+    переподключается и очищает локальные кэши, так как сообщения,
+    отправленные за время разрыва, потеряны.
+    """
+
+    def __init__(self, dsn: str, channel: str, reconnect_delay: float = 1.0):
+        super().__init__()
+        self.dsn = dsn
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self._connection: asyncpg.Connection | None = None
+        self._reconnect_task: asyncio.Task | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self._stopped = False
+
+    async def send(self, message: str) -> None:
+        async with engine.begin() as conn:
+            await conn.execute(select(func.pg_notify(self.channel, message)))
+
+    def _on_notification(self, connection, pid, channel, payload) -> None:
+        task = asyncio.create_task(self.receive(payload))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _on_termination(self, connection) -> None:
+        if not self._stopped:
+            logger.warning("Invalidation listener connection lost")
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _listen(self) -> None:
+        self._connection = await asyncpg.connect(self.dsn)
+        self._connection.add_termination_listener(self._on_termination)
+        await self._connection.add_listener(
+            self.channel, self._on_notification
+        )
+
+    async def _reconnect(self) -> None:
+        while not self._stopped:
+            await asyncio.sleep(self.reconnect_delay)
+            try:
+                await self._listen()
+            except (OSError, asyncpg.PostgresError):
+                logger.warning("Invalidation listener reconnect failed")
+                continue
+            await self.flush()
+            return
+
+    async def start(self) -> None:
+        self._stopped = False
+        await self._listen()
+
+    async def stop(self) -> None:
+        self._stopped = True
+        if self._reconnect_task:
+            self._reconnect_task.cancel()
+        if self._connection and not self._connection.is_closed():
+            await self._connection.close()
+
+
+def create_bus() -> InvalidationBus:
+    """Создает шину инвалидации согласно настройкам."""
+
+    if settings.INVALIDATION_BUS == "postgres":
+        return PostgresBus(
+            settings.database_dsn, settings.INVALIDATION_CHANNEL
+        )
+    return MemoryBus()
+
+
+invalidation_bus = create_bus()
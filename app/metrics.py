@@ -0,0 +1,399 @@
+"""
+Метрики приложения в текстовом формате Prometheus:
+
+- `Counter`, `Gauge`, `Histogram`: метрики с метками, хранящиеся
+  в памяти процесса. Внешний сборщик не требуется.
+- `MetricsMiddleware`: время обработки запросов по шаблону маршрута
+  и статусу, число запросов в обработке, число SQL-запросов и время
+  работы с базой данных на запрос (см. `instrumentation`).
+  При `DB_TIMING_HEADERS` стоимость запроса к базе данных передается
+  в заголовках ответа. Число SQL-запросов сверяется с бюджетом маршрута
+  (см. `query_budget`).
+- Состояние пула соединений, пула хеширования паролей, кэша каталога,
+  шины инвалидации и сводка последнего обхода просроченных выдач
+  снимаются в момент запроса `/metrics`.
+"""
+
+import time
+from typing import Callable, Iterable, Sequence
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .cache import catalog_cache
+from .config import settings
+from .database import engine
+from .instrumentation import QueryStats, query_stats
+from .invalidation import invalidation_bus
+from .query_budget import check_query_budget
+from .rebooks import overdue_scanner
+from .users import password_hasher
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """Базовая метрика с набором меток."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.values: dict[tuple[str, ...], float] = {}
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def header(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+    def samples(self) -> Iterable[str]:
+        for key, value in sorted(self.values.items()):
+            labels = _format_labels(self.label_names, key)
+            yield f"{self.name}{labels} {_format_value(value)}"
+
+    def render(self) -> list[str]:
+        return self.header() + list(self.samples())
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def set(self, value: float, **labels: str) -> None:
+        """Переносит значение счетчика, который ведется в другом модуле."""
+
+        self.values[self._key(labels)] = value
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        self.values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class Summary(Metric):
+    """Сумма и число наблюдений, которые ведутся в другом модуле."""
+
+    kind = "summary"
+
+    def __init__(self, name: str, documentation: str, labels=()):
+        super().__init__(name, documentation, labels)
+        self.counts: dict[tuple[str, ...], int] = {}
+
+    def set(self, count: int, total: float, **labels: str) -> None:
+        key = self._key(labels)
+        self.counts[key] = count
+        self.values[key] = total
+
+    def samples(self) -> Iterable[str]:
+        for key, total in sorted(self.values.items()):
+            labels = _format_labels(self.label_names, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {self.counts[key]}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels=(),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self.counts: dict[tuple[str, ...], list[int]] = {}
+        self.sums: dict[tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        counts = self.counts.setdefault(key, [0] * len(self.buckets))
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+        self.sums[key] = self.sums.get(key, 0.0) + value
+
+    def samples(self) -> Iterable[str]:
+        names = self.label_names + ("le",)
+        for key, counts in sorted(self.counts.items()):
+            for bound, count in zip(self.buckets, counts):
+                labels = _format_labels(names, key + (_format_value(bound),))
+                yield f"{self.name}_bucket{labels} {count}"
+            labels = _format_labels(self.label_names, key)
+            yield f"{self.name}_sum{labels} {_format_value(self.sums[key])}"
+            yield f"{self.name}_count{labels} {counts[-1]}"
+
+
+class Registry:
+    """
+    Набор метрик процесса. Коллекторы вызываются при каждом запросе
+    `/metrics` и обновляют метрики, снимаемые по состоянию.
+    """
+
+    def __init__(self):
+        self.metrics: list[Metric] = []
+        self.collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def collector(self, func: Callable[[], None]) -> Callable[[], None]:
+        self.collectors.append(func)
+        return func
+
+    def render(self) -> str:
+        for collect in self.collectors:
+            collect()
+
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+request_duration = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Время обработки HTTP-запроса.",
+        labels=("method", "route", "status"),
+    )
+)
+requests_in_flight = registry.register(
+    Gauge("http_requests_in_flight", "HTTP-запросы в обработке.")
+)
+request_queries = registry.register(
+    Histogram(
+        "http_request_db_queries",
+        "Число SQL-запросов на один HTTP-запрос.",
+        labels=("method", "route"),
+        buckets=QUERY_BUCKETS,
+    )
+)
+request_db_time = registry.register(
+    Histogram(
+        "http_request_db_seconds",
+        "Суммарное время SQL-запросов на один HTTP-запрос.",
+        labels=("method", "route"),
+    )
+)
+pool_connections = registry.register(
+    Gauge(
+        "db_pool_connections",
+        "Соединения пула по состоянию (checked_out, checked_in, overflow).",
+        labels=("state",),
+    )
+)
+pool_size = registry.register(Gauge("db_pool_size", "Размер пула соединений."))
+password_hash_wait = registry.register(
+    Summary(
+        "password_hash_wait_seconds",
+        "Ожидание свободного потока хеширования паролей.",
+    )
+)
+password_hash_in_flight = registry.register(
+    Gauge(
+        "password_hash_in_flight",
+        "Операции хеширования паролей в обработке и в очереди.",
+    )
+)
+password_hash_queue = registry.register(
+    Gauge(
+        "password_hash_queue_depth",
+        "Операции хеширования паролей, ожидающие свободного потока.",
+    )
+)
+cache_requests = registry.register(
+    Counter(
+        "cache_requests_total",
+        "Обращения к кэшу каталога по результату.",
+        labels=("result",),
+    )
+)
+invalidation_messages = registry.register(
+    Counter(
+        "cache_invalidation_messages_total",
+        "Сообщения шины инвалидации по направлению.",
+        labels=("direction",),
+    )
+)
+
+overdue_loans = registry.register(
+    Gauge(
+        "overdue_loans",
+        "Просроченные выдачи по сроку просрочки (последний обход).",
+        labels=("age",),
+    )
+)
+overdue_scan_duration = registry.register(
+    Gauge(
+        "overdue_scan_duration_seconds",
+        "Длительность последнего обхода просроченных выдач.",
+    )
+)
+overdue_scan_runs = registry.register(
+    Counter("overdue_scan_runs_total", "Обходы просроченных выдач.")
+)
+
+
+@registry.collector
+def collect_pool() -> None:
+    pool = engine.pool
+    pool_size.set(pool.size())
+    pool_connections.set(pool.checkedout(), state="checked_out")
+    pool_connections.set(pool.checkedin(), state="checked_in")
+    pool_connections.set(max(pool.overflow(), 0), state="overflow")
+
+
+@registry.collector
+def collect_password_hasher() -> None:
+    stats = password_hasher.stats()
+    password_hash_wait.set(stats["completed"], stats["wait_seconds_total"])
+    password_hash_in_flight.set(stats["in_flight"])
+    password_hash_queue.set(stats["queue_depth"])
+
+
+@registry.collector
+def collect_cache() -> None:
+    stats = catalog_cache.stats()
+    cache_requests.set(stats["hits"], result="hit")
+    cache_requests.set(stats["misses"], result="miss")
+    bus = invalidation_bus.stats()
+    invalidation_messages.set(bus["published"], direction="published")
+    invalidation_messages.set(bus["received"], direction="received")
+
+
+@registry.collector
+def collect_overdue() -> None:
+    stats = overdue_scanner.last_stats
+    overdue_scan_runs.set(overdue_scanner.runs)
+    if stats is None:
+        return
+    overdue_loans.values.clear()
+    for age, count in stats.by_age.items():
+        overdue_loans.set(count, age=age)
+    overdue_scan_duration.set(stats.duration_seconds)
+
+
+def route_template(scope: Scope) -> str:
+    """Шаблон маршрута запроса, например `/books/{book_id}/`."""
+
+    route = scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
+class MetricsMiddleware:
+    """ASGI-мидлварь, собирающая метрики HTTP-запросов."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        stats = QueryStats()
+        token = query_stats.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if settings.DB_TIMING_HEADERS:
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        *stats.headers(),
+                    ]
+            await send(message)
+
+        requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            requests_in_flight.dec()
+            query_stats.reset(token)
+
+            route = route_template(scope)
+            request_duration.observe(
+                duration,
+                method=scope["method"],
+                route=route,
+                status=str(status),
+            )
+            request_queries.observe(
+                stats.queries, method=scope["method"], route=route
+            )
+            request_db_time.observe(
+                stats.seconds, method=scope["method"], route=route
+            )
+            check_query_budget(scope["method"], route, stats.queries)
+
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,127 @@
+"""
+Курсорная (keyset) пагинация списков:
+
+- Кодирование значений ключа сортировки в непрозрачный курсор и обратно.
+- Построение запроса «после курсора» вместо `OFFSET`, чтобы стоимость
+  страницы не зависела от ее глубины.
+- Передача курсора следующей страницы в заголовке `X-Next-Cursor`.
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Sequence
+
+from fastapi import Response, status
+from sqlalchemy import Select, asc, tuple_
+from sqlalchemy.orm import InstrumentedAttribute
+
+from .users.exceptions import CustomException
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursorException(CustomException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    detail = "Invalid pagination cursor"
+
+
+def _dump_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _load_value(value: Any, column: InstrumentedAttribute) -> Any:
+    python_type = column.type.python_type
+    if python_type in (datetime, date):
+        return python_type.fromisoformat(value)
+    if not isinstance(value, python_type):
+        raise TypeError(f"Unexpected cursor value for {column.key}")
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Кодирует значения ключа сортировки в непрозрачную строку."""
+
+    payload = json.dumps(
+        [_dump_value(value) for value in values], separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(
+    cursor: str, columns: Sequence[InstrumentedAttribute]
+) -> list[Any]:
+    """
+    Декодирует курсор в значения ключа сортировки.
+    Выбрасывает исключение, если курсор поврежден или не соответствует ключу.
+    """
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("Cursor does not match the sort key")
+        return [
+            _load_value(value, column)
+            for value, column in zip(values, columns)
+        ]
+    except (ValueError, TypeError):
+        raise InvalidCursorException()
+
+
+def paginate(
+    query: Select,
+    columns: Sequence[InstrumentedAttribute],
+    limit: int,
+    offset: int = 0,
+    cursor: str | None = None,
+) -> Select:
+    """
+    Добавляет к запросу сортировку по ключу и ограничение выборки.
+    При наличии курсора выборка начинается строго после него (keyset),
+    иначе используется `offset`.
+    """
+
+    query = query.order_by(*[asc(column) for column in columns])
+
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        if len(columns) == 1:
+            query = query.filter(columns[0] > values[0])
+        else:
+            query = query.filter(tuple_(*columns) > tuple_(*values))
+    elif offset:
+        query = query.offset(offset)
+
+    return query.limit(limit)
+
+
+def next_cursor(
+    items: Sequence[Any], limit: int, keys: Sequence[str] = ("id",)
+) -> str | None:
+    """
+    Возвращает курсор следующей страницы или None, если страница последняя.
+    """
+
+    if len(items) < limit:
+        return None
+
+    last = items[-1]
+    if isinstance(last, dict):
+        return encode_cursor([last[key] for key in keys])
+    return encode_cursor([getattr(last, key) for key in keys])
+
+
+def set_next_cursor(
+    response: Response,
+    items: Sequence[Any],
+    limit: int,
+    keys: Sequence[str] = ("id",),
+) -> None:
+    """Передает курсор следующей страницы в заголовке ответа."""
+
+    cursor = next_cursor(items, limit, keys)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
@@ -0,0 +1,91 @@
+"""
+Бюджеты SQL-запросов для маршрутов API:
+
+- `QUERY_BUDGETS`: допустимое число SQL-запросов на один HTTP-запрос
+  для каждого маршрута (метод и шаблон пути). Бюджет - наибольшее
+  число запросов, измеренное командой `manage.py query-budget
+  --print-budgets` на синтетическом наборе данных и тестами. Для
+  маршрутов с `Idempotency-Key` к результату команды добавлены два
+  запроса к таблице ключей.
+- Бюджет `None` означает, что число запросов маршрута зависит от
+  входных данных и не ограничивается.
+- Превышение бюджета записывается в лог и в `violations`; тесты
+  завершаются ошибкой, если за время теста был превышен бюджет.
+"""
+
+import logging
+from collections import deque
+from dataclasses import dataclass
+
+logger = logging.getLogger("library_api.sql")
+
+QUERY_BUDGETS: dict[tuple[str, str], int | None] = {
+    ("POST", "/users/register/"): 4,
+    ("POST", "/users/login/"): 1,
+    ("GET", "/users/"): 2,
+    ("GET", "/users/export/"): 1,
+    ("GET", "/users/me/"): 4,
+    ("PUT", "/users/me/"): 4,
+    ("GET", "/users/{user_id}/"): 4,
+    ("PUT", "/users/{user_id}/role/"): 3,
+    ("POST", "/authors/"): 2,
+    ("GET", "/authors/"): 2,
+    ("GET", "/authors/{author_id}/"): 2,
+    ("PUT", "/authors/{author_id}/"): 3,
+    ("DELETE", "/authors/{author_id}/"): 3,
+    ("POST", "/books/"): 7,
+    # Массовая загрузка делает несколько запросов на каждую пачку
+    # записей, а пачку с ошибкой ограничений повторяет по одной записи.
+    ("POST", "/books/bulk/"): None,
+    ("GET", "/books/"): 3,
+    ("GET", "/books/search/"): 3,
+    ("GET", "/books/export/"): 2,
+    ("GET", "/books/{book_id}/"): 3,
+    ("PUT", "/books/{book_id}/"): 7,
+    ("DELETE", "/books/{book_id}/"): 5,
+    ("POST", "/rebooks/"): 6,
+    ("POST", "/rebooks/return/"): 6,
+    ("POST", "/rebooks/batch/"): 8,
+    ("POST", "/rebooks/return/batch/"): 8,
+    ("GET", "/rebooks/"): 2,
+    ("GET", "/rebooks/export/"): 1,
+    ("GET", "/rebooks/overdue/"): 2,
+    ("GET", "/rebooks/{rebook_id}/"): 2,
+    ("GET", "/users/me/rebooks/"): 2,
+    ("GET", "/users/{user_id}/rebooks/"): 2,
+}
+
+
+@dataclass
+class BudgetViolation:
+    method: str
+    route: str
+    queries: int
+    budget: int
+
+    def __str__(self) -> str:
+        return (
+            f"{self.method} {self.route}: {self.queries} queries "
+            f"(budget {self.budget})"
+        )
+
+
+violations: deque[BudgetViolation] = deque(maxlen=1000)
+
+
+def check_query_budget(
+    method: str, route: str, queries: int
+) -> BudgetViolation | None:
+    """
+    Сравнивает число SQL-запросов с бюджетом маршрута.
+    Возвращает описание превышения или None.
+    """
+
+    budget = QUERY_BUDGETS.get((method, route))
+    if budget is None or queries <= budget:
+        return None
+
+    violation = BudgetViolation(method, route, queries, budget)
+    violations.append(violation)
+    logger.warning("Query budget exceeded: %s", violation)
+    return violation
@@ -1,5 +1,13 @@
 from .models import Rebook
-from .routes import rebooks_router
+from .routes import rebooks_router, user_rebooks_router
 from .schemas import RebookResponse
+from .services import overdue_scanner, scan_overdue_loans
 
-__all__ = ["Rebook", "RebookResponse", "rebooks_router"]
+__all__ = [
+    "Rebook",
+    "RebookResponse",
+    "overdue_scanner",
+    "rebooks_router",
+    "scan_overdue_loans",
+    "user_rebooks_router",
+]
@@ -1,6 +1,6 @@
 from datetime import datetime, timedelta
 
-from sqlalchemy import ForeignKey, func
+from sqlalchemy import ForeignKey, Index, and_, func, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from ..books import Book
@@ -11,6 +11,22 @@ class Rebook(BaseModel):
     """Модель выдачи книг."""
 
     __tablename__ = "rebooks"
+    __table_args__ = (
+        Index(
+            "ix_rebooks_active_user_book",
+            "user_id",
+            "book_id",
+            "id",
+            postgresql_where=text("returned_at IS NULL"),
+        ),
+        Index("ix_rebooks_user_id_id", "user_id", "id"),
+        Index(
+            "ix_rebooks_overdue",
+            "due_date",
+            "id",
+            postgresql_where=text("returned_at IS NULL"),
+        ),
+    )
 
     user_id: Mapped[int] = mapped_column(
         ForeignKey("users.id"),
@@ -55,6 +71,13 @@ User.rebooks = relationship(
     cascade="all, delete-orphan",
     doc="Список выдач, связанных с пользователем",
 )
+User.active_rebooks = relationship(
+    "Rebook",
+    primaryjoin=and_(User.id == Rebook.user_id, Rebook.returned_at.is_(None)),
+    order_by=Rebook.id,
+    viewonly=True,
+    doc="Невозвращенные выдачи пользователя",
+)
 Book.rebooks = relationship(
     "Rebook",
     back_populates="book",
@@ -1,17 +1,37 @@
-from fastapi import APIRouter, Depends, Query, status
+from fastapi import APIRouter, Depends, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database import get_async_session
+from ..config import settings
+from ..database import get_async_session, get_session_factory
+from ..fields import fields_query
+from ..idempotency import Idempotency, get_idempotency
+from ..pagination import set_next_cursor
+from ..serialization import json_list_response, json_response
+from ..streaming import DataFormat, export_response
 from ..users import UserRole, get_current_user, require_role
-from .schemas import RebookBase, RebookResponse
+from .schemas import (
+    RebookBase,
+    RebookBatch,
+    RebookBatchResult,
+    RebookResponse,
+)
 from .services import (
+    OVERDUE_CURSOR_KEYS,
     borrow_book,
+    borrow_books,
+    export_rebooks,
     get_all_rebooks,
+    get_overdue_rebooks,
     get_rebook_by_id,
+    get_rebook_fields,
+    get_user_rebooks,
     return_book,
+    return_books,
 )
 
 rebooks_router = APIRouter(prefix="/rebooks", tags=["Rebooks"])
+user_rebooks_router = APIRouter(prefix="/users", tags=["Users"])
 
 
 @rebooks_router.post(
@@ -19,38 +39,127 @@ rebooks_router = APIRouter(prefix="/rebooks", tags=["Rebooks"])
     response_model=RebookResponse,
     status_code=status.HTTP_201_CREATED,
     summary="Выдача книги",
-    description="Пользователь может забронировать книгу.",
+    description="""
+    Пользователь может забронировать книгу.
+    - При повторе запроса с тем же заголовком `Idempotency-Key`
+    возвращается сохраненный ответ без повторного выполнения.
+    """,
     responses={
         201: {"description": "Книга успешно выдана."},
         400: {"description": "Некорректные данные для выдачи."},
         404: {"description": "Книга не найдена или недоступна."},
         403: {"description": "Превышен лимит выдачи книг."},
+        409: {"description": "Запрос с этим ключом еще выполняется."},
+        422: {"description": "Ключ использован для другого запроса."},
     },
 )
 async def borrow(
     rebook_data: RebookBase,
     db: AsyncSession = Depends(get_async_session),
     current_user=Depends(get_current_user),
+    idempotency: Idempotency = Depends(get_idempotency),
 ):
-    return await borrow_book(db, current_user.id, rebook_data.book_id)
+    return await idempotency.run(
+        db,
+        current_user.id,
+        lambda: borrow_book(db, current_user.id, rebook_data.book_id),
+    )
 
 
 @rebooks_router.post(
     "/return/",
     response_model=RebookResponse,
     summary="Возврат книги",
-    description="Пользователь может вернуть книгу.",
+    description="""
+    Пользователь может вернуть книгу.
+    - При повторе запроса с тем же заголовком `Idempotency-Key`
+    возвращается сохраненный ответ без повторного выполнения.
+    """,
     responses={
         200: {"description": "Книга успешно возвращена."},
         404: {"description": "Выдача книги не найдена."},
+        409: {"description": "Запрос с этим ключом еще выполняется."},
+        422: {"description": "Ключ использован для другого запроса."},
     },
 )
 async def return_rebook(
     rebook_data: RebookBase,
     db: AsyncSession = Depends(get_async_session),
     current_user=Depends(get_current_user),
+    idempotency: Idempotency = Depends(get_idempotency),
+):
+    return await idempotency.run(
+        db,
+        current_user.id,
+        lambda: return_book(db, current_user.id, rebook_data.book_id),
+    )
+
+
+@rebooks_router.post(
+    "/batch/",
+    response_model=RebookBatchResult,
+    summary="Пакетная выдача книг",
+    description="""
+    Выдача нескольких книг (до 20) за один запрос и одну транзакцию.
+    - Книги обрабатываются в порядке запроса; повтор ID означает
+    несколько экземпляров одной книги.
+    - Как и при выдаче одной книги, сначала проверяется лимит
+    пользователя, затем наличие книги и свободных экземпляров.
+    - Для каждой книги возвращается код результата (`201`, `400`, `404`)
+    и запись о выдаче или описание ошибки.
+    - При повторе запроса с тем же заголовком `Idempotency-Key`
+    возвращается сохраненный ответ без повторного выполнения.
+    """,
+    responses={
+        200: {"description": "Результаты выдачи по каждой книге."},
+        401: {"description": "Необходима авторизация."},
+        409: {"description": "Запрос с этим ключом еще выполняется."},
+        422: {"description": "Ключ использован для другого запроса."},
+    },
+)
+async def borrow_batch(
+    batch: RebookBatch,
+    db: AsyncSession = Depends(get_async_session),
+    current_user=Depends(get_current_user),
+    idempotency: Idempotency = Depends(get_idempotency),
+):
+    return await idempotency.run(
+        db,
+        current_user.id,
+        lambda: borrow_books(db, current_user.id, batch.book_ids),
+    )
+
+
+@rebooks_router.post(
+    "/return/batch/",
+    response_model=RebookBatchResult,
+    summary="Пакетный возврат книг",
+    description="""
+    Возврат нескольких книг (до 20) за один запрос и одну транзакцию.
+    - Для каждой книги закрывается самая ранняя невозвращенная выдача.
+    - Для каждой книги возвращается код результата (`200`, `404`)
+    и запись о выдаче или описание ошибки.
+    - При повторе запроса с тем же заголовком `Idempotency-Key`
+    возвращается сохраненный ответ без повторного выполнения.
+    """,
+    responses={
+        200: {"description": "Результаты возврата по каждой книге."},
+        401: {"description": "Необходима авторизация."},
+        409: {"description": "Запрос с этим ключом еще выполняется."},
+        422: {"description": "Ключ использован для другого запроса."},
+    },
+)
+async def return_batch(
+    batch: RebookBatch,
+    db: AsyncSession = Depends(get_async_session),
+    current_user=Depends(get_current_user),
+    idempotency: Idempotency = Depends(get_idempotency),
 ):
-    return await return_book(db, current_user.id, rebook_data.book_id)
+    return await idempotency.run(
+        db,
+        current_user.id,
+        lambda: return_books(db, current_user.id, batch.book_ids),
+    )
 
 
 @rebooks_router.get(
@@ -61,7 +170,11 @@ async def return_rebook(
     Получение списка всех выданных книг (только для администратора).
     - Можно задать `limit` (количество выданных книг) и `offset`
     (начало выборки).
+    - Для постраничного обхода без `offset` передайте `cursor` из заголовка
+    `X-Next-Cursor` предыдущего ответа.
     - Можно фильтровать по `user_id`.
+    - `fields` ограничивает ответ перечисленными полями (`id` всегда
+    включен).
     """,
     responses={
         200: {"description": "Список выданных книг успешно получен."},
@@ -69,14 +182,89 @@ async def return_rebook(
     },
 )
 async def get_rebooks(
+    response: Response,
     limit: int = Query(10, ge=1, le=100, description="Количество записей."),
     offset: int = Query(0, ge=0, description="Смещение от начала выборки."),
+    cursor: str | None = Query(
+        None, description="Курсор следующей страницы (`X-Next-Cursor`)."
+    ),
     user_id: int | None = Query(None, description="Фильтр по пользователю."),
+    fields: list[str] | None = Depends(fields_query(RebookResponse)),
+    db: AsyncSession = Depends(get_async_session),
+    current_user=Depends(require_role(UserRole.ADMIN)),
+):
+    rebooks = await get_all_rebooks(
+        db=db,
+        limit=limit,
+        offset=offset,
+        user_id=user_id,
+        cursor=cursor,
+        fields=fields,
+    )
+    set_next_cursor(response, rebooks, limit)
+    return json_list_response(rebooks, RebookResponse, response, fields)
+
+
+@rebooks_router.get(
+    "/overdue/",
+    response_model=list[RebookResponse],
+    summary="Список просроченных выдач",
+    description="""
+    Получение невозвращенных выдач с истекшим сроком возврата (только для
+    администратора), начиная с самых давних.
+    - Можно задать `limit` (количество выдач).
+    - Для постраничного обхода передайте `cursor` из заголовка
+    `X-Next-Cursor` предыдущего ответа.
+    """,
+    responses={
+        200: {"description": "Список просроченных выдач успешно получен."},
+        400: {"description": "Некорректные параметры запроса."},
+        403: {"description": "Недостаточно прав для выполнения операции."},
+    },
+)
+async def get_overdue(
+    response: Response,
+    limit: int = Query(10, ge=1, le=100, description="Количество записей."),
+    cursor: str | None = Query(
+        None, description="Курсор следующей страницы (`X-Next-Cursor`)."
+    ),
     db: AsyncSession = Depends(get_async_session),
     current_user=Depends(require_role(UserRole.ADMIN)),
 ):
-    return await get_all_rebooks(
-        db=db, limit=limit, offset=offset, user_id=user_id
+    rebooks = await get_overdue_rebooks(db, limit=limit, cursor=cursor)
+    set_next_cursor(response, rebooks, limit, OVERDUE_CURSOR_KEYS)
+    return json_list_response(rebooks, RebookResponse, response)
+
+
+@rebooks_router.get(
+    "/export/",
+    response_class=StreamingResponse,
+    summary="Выгрузка истории выдач",
+    description="""
+    Потоковая выгрузка всех выдач книг в NDJSON или CSV (только для
+    администратора). Ответ начинает передаваться сразу, расход памяти
+    не зависит от размера истории.
+    """,
+    responses={
+        200: {"description": "Выгрузка истории выдач."},
+        403: {"description": "Недостаточно прав для выполнения операции."},
+    },
+)
+async def export(
+    data_format: DataFormat = Query(
+        DataFormat.NDJSON,
+        alias="format",
+        description="Формат данных (`ndjson` или `csv`).",
+    ),
+    session_factory=Depends(get_session_factory),
+    current_user=Depends(require_role(UserRole.ADMIN)),
+):
+    return export_response(
+        export_rebooks(session_factory, settings.EXPORT_BATCH_SIZE),
+        data_format,
+        RebookResponse,
+        "rebooks",
+        settings.EXPORT_BATCH_SIZE,
     )
 
 
@@ -86,6 +274,8 @@ async def get_rebooks(
     summary="Получение выдачи книги по ID",
     description="""
     Получение данных о выдаче книги по ID (только для администратора).
+    - `fields` ограничивает ответ перечисленными полями (`id` всегда
+    включен).
     """,
     responses={
         200: {"description": "Данные о выдаче успешно получены."},
@@ -95,7 +285,84 @@ async def get_rebooks(
 )
 async def get_rebook(
     rebook_id: int,
+    fields: list[str] | None = Depends(fields_query(RebookResponse)),
     db: AsyncSession = Depends(get_async_session),
     current_user=Depends(require_role(UserRole.ADMIN)),
 ):
+    if fields is not None:
+        rebook = await get_rebook_fields(rebook_id, fields, db)
+        return json_response(rebook)
     return await get_rebook_by_id(rebook_id, db)
+
+
+@user_rebooks_router.get(
+    "/me/rebooks/",
+    response_model=list[RebookResponse],
+    summary="История выдач текущего пользователя",
+    description="""
+    Получение истории выдач книг текущему пользователю.
+    - Можно задать `limit` (количество выдач).
+    - Для постраничного обхода передайте `cursor` из заголовка
+    `X-Next-Cursor` предыдущего ответа.
+    - `fields` ограничивает ответ перечисленными полями (`id` всегда
+    включен).
+    """,
+    responses={
+        200: {"description": "История выдач успешно получена."},
+        400: {"description": "Некорректные параметры запроса."},
+        401: {"description": "Необходима авторизация."},
+    },
+)
+async def get_my_rebooks(
+    response: Response,
+    limit: int = Query(10, ge=1, le=100, description="Количество записей."),
+    cursor: str | None = Query(
+        None, description="Курсор следующей страницы (`X-Next-Cursor`)."
+    ),
+    fields: list[str] | None = Depends(fields_query(RebookResponse)),
+    db: AsyncSession = Depends(get_async_session),
+    current_user=Depends(get_current_user),
+):
+    rebooks = await get_user_rebooks(
+        db, current_user.id, limit=limit, cursor=cursor, fields=fields
+    )
+    set_next_cursor(response, rebooks, limit)
+    return json_list_response(rebooks, RebookResponse, response, fields)
+
+
+@user_rebooks_router.get(
+    "/{user_id}/rebooks/",
+    response_model=list[RebookResponse],
+    summary="История выдач пользователя",
+    description="""
+    Получение истории выдач книг пользователю по ID (только для
+    администратора).
+    - Можно задать `limit` (количество выдач).
+    - Для постраничного обхода передайте `cursor` из заголовка
+    `X-Next-Cursor` предыдущего ответа.
+    - `fields` ограничивает ответ перечисленными полями (`id` всегда
+    включен).
+    """,
+    responses={
+        200: {"description": "История выдач успешно получена."},
+        400: {"description": "Некорректные параметры запроса."},
+        404: {"description": "Пользователь с указанным ID не найден."},
+        403: {"description": "Недостаточно прав для выполнения операции."},
+    },
+)
+async def get_rebooks_of_user(
+    user_id: int,
+    response: Response,
+    limit: int = Query(10, ge=1, le=100, description="Количество записей."),
+    cursor: str | None = Query(
+        None, description="Курсор следующей страницы (`X-Next-Cursor`)."
+    ),
+    fields: list[str] | None = Depends(fields_query(RebookResponse)),
+    db: AsyncSession = Depends(get_async_session),
+    current_user=Depends(require_role(UserRole.ADMIN)),
+):
+    rebooks = await get_user_rebooks(
+        db, user_id, limit=limit, cursor=cursor, fields=fields
+    )
+    set_next_cursor(response, rebooks, limit)
+    return json_list_response(rebooks, RebookResponse, response, fields)
@@ -1,15 +1,20 @@
 """
 Pydantic-схемы для работы с выдачей и возвратом книг (Rebook):
 
-- Валидация данных выдачи книг.
-- Формирование ответов API с информацией о выдаче.
+- Валидация данных выдачи книг, в том числе пакетной.
+- Формирование ответов API с информацией о выдаче и результатах
+  пакетной выдачи и возврата.
 """
 
 from datetime import datetime
-from typing import Optional
+from typing import Annotated, List, Optional
+
+from annotated_types import MaxLen, MinLen
 
 from pydantic import BaseModel, ConfigDict, Field
 
+MAX_BATCH_SIZE = 20
+
 
 class RebookBase(BaseModel):
     """Базовая схема для работы с выдачей книг."""
@@ -57,3 +62,70 @@ class RebookResponse(RebookBase):
     )
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class RebookBatch(BaseModel):
+    """Схема для пакетной выдачи или возврата книг."""
+
+    book_ids: Annotated[List[int], MinLen(1), MaxLen(MAX_BATCH_SIZE)] = Field(
+        ...,
+        title="ID книг",
+        description=(
+            "Список ID книг (до 20). Повтор ID означает несколько "
+            "экземпляров одной книги."
+        ),
+        json_schema_extra={"example": [1, 2, 3]},
+    )
+
+
+class RebookBatchItem(BaseModel):
+    """Схема для результата выдачи или возврата одной книги из пакета."""
+
+    book_id: int = Field(
+        ...,
+        title="ID книги",
+        description="ID книги из запроса.",
+        json_schema_extra={"example": 1},
+    )
+    status_code: int = Field(
+        ...,
+        title="Код результата",
+        description=(
+            "HTTP-код, который вернул бы одиночный запрос: 201 или 200 "
+            "при успехе, 400 или 404 при ошибке."
+        ),
+        json_schema_extra={"example": 201},
+    )
+    detail: Optional[str] = Field(
+        None,
+        title="Ошибка",
+        description="Описание ошибки, иначе `null`.",
+        json_schema_extra={"example": None},
+    )
+    rebook: Optional[RebookResponse] = Field(
+        None,
+        title="Выдача",
+        description="Запись о выдаче при успехе, иначе `null`.",
+    )
+
+
+class RebookBatchResult(BaseModel):
+    """Схема для отчета о пакетной выдаче или возврате книг."""
+
+    succeeded: int = Field(
+        0,
+        title="Успешно",
+        description="Количество выданных или возвращенных книг.",
+        json_schema_extra={"example": 7},
+    )
+    failed: int = Field(
+        0,
+        title="Отклонено",
+        description="Количество книг, которые не удалось обработать.",
+        json_schema_extra={"example": 1},
+    )
+    items: List[RebookBatchItem] = Field(
+        default_factory=list,
+        title="Результаты",
+        description="Результаты по книгам в порядке запроса.",
+    )
@@ -1,53 +1,242 @@
 """
 Вспомогательные функции для работы с выданными книгами пользователям:
 
-- Выдача и возврат книг.
-- Получение информации о выданных книгах.
+- Выдача и возврат книг, в том числе пакетные.
+- Получение информации о выданных книгах и истории выдач пользователя.
+- Пересчет счетчиков книг на руках у пользователей.
+- Потоковая выгрузка истории выдач.
+- Просроченные выдачи: постраничный список и фоновый обход пачками
+  со сводкой по каждому запуску.
 """
 
-from sqlalchemy import asc, func
-from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import logging
+import time
+from collections import Counter, defaultdict, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, Sequence
+
+from sqlalchemy import Select, Update, case, func, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.future import select
 
-from ..books import get_book_by_id
+from ..books import Book, get_book_by_id, invalidate_book_cache
+from ..books.exceptions import BookNotFoundException
+from ..config import settings
+from ..database import after_commit, async_session, commit
+from ..fields import field_columns, rows
+from ..pagination import next_cursor, paginate
+from ..users import CustomException, User
+from ..users.exceptions import UserNotFoundException
 from .exceptions import (
     AvailableException,
     LimitException,
     RebookNotFoundException,
 )
 from .models import Rebook
+from .schemas import RebookBatchItem, RebookBatchResult, RebookResponse
+
+logger = logging.getLogger("library_api.rebooks")
+
+MAX_ACTIVE_LOANS = 5
+OVERDUE_CURSOR_KEYS = ("due_date", "id")
+OVERDUE_AGE_BUCKETS = (7, 30, 90)
+# Ключ рекомендательной блокировки PostgreSQL для обхода просрочек.
+OVERDUE_SCAN_LOCK_ID = 0x4F564552
+
+
+def active_rebook_query(user_id: int, book_id: int) -> Select:
+    """
+    Запрос ID самой ранней невозвращенной выдачи книги пользователю.
+    Обслуживается частичным индексом `ix_rebooks_active_user_book`.
+    """
+
+    return (
+        select(Rebook.id)
+        .filter(
+            Rebook.user_id == user_id,
+            Rebook.book_id == book_id,
+            Rebook.returned_at.is_(None),
+        )
+        .order_by(Rebook.id)
+        .limit(1)
+    )
+
+
+def rebooks_list_query(
+    limit: int = 10,
+    offset: int = 0,
+    user_id: int | None = None,
+    cursor: str | None = None,
+    fields: Sequence[str] | None = None,
+) -> Select:
+    """
+    Запрос страницы выдач. Фильтр по пользователю с сортировкой по ID
+    обслуживается составным индексом `ix_rebooks_user_id_id`.
+    Если заданы `fields`, выбираются только соответствующие колонки.
+    """
+
+    if fields is None:
+        query = select(Rebook)
+    else:
+        query = select(*field_columns(Rebook, fields))
+    if user_id:
+        query = query.filter(Rebook.user_id == user_id)
+
+    return paginate(query, [Rebook.id], limit, offset, cursor)
 
 
 async def borrow_book(db: AsyncSession, user_id: int, book_id: int) -> Rebook:
     """
     Выдача книги пользователю.
+    Место в лимите пользователя и экземпляр книги резервируются условными
+    обновлениями, поэтому при одновременной выдаче последнего экземпляра
+    успешна только одна.
     Возвращает информацию о выданной книге.
     Выбрасывает исключение, если книга недоступна или
     если пользователь превысил лимит на выдачу.
     """
 
-    book = await get_book_by_id(book_id, db)
+    claimed_user_id = await db.scalar(
+        update(User)
+        .filter(User.id == user_id, User.active_loans < MAX_ACTIVE_LOANS)
+        .values(active_loans=User.active_loans + 1)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )
+
+    if claimed_user_id is None:
+        await db.rollback()
+        raise LimitException()
+
+    claimed_book_id = await db.scalar(
+        update(Book)
+        .filter(Book.id == book_id, Book.available_copies > 0)
+        .values(available_copies=Book.available_copies - 1)
+        .returning(Book.id)
+        .execution_options(synchronize_session=False)
+    )
 
-    if book.available_copies < 1:
+    if claimed_book_id is None:
+        await db.rollback()
+        await get_book_by_id(book_id, db)
         raise AvailableException()
 
-    user_rebooks_count = await db.scalar(
-        select(func.count(Rebook.id)).filter(
-            Rebook.user_id == user_id, Rebook.returned_at.is_(None)
+    rebook = await db.scalar(
+        insert(Rebook)
+        .values(user_id=user_id, book_id=book_id)
+        .returning(Rebook)
+    )
+    await commit(db)
+    await after_commit(db, invalidate_book_cache, book_id)
+    return rebook
+
+
+def lock_books_query(book_ids: Sequence[int]) -> Select:
+    """
+    Запрос доступных копий книг с блокировкой строк. Строки блокируются
+    в порядке ID, поэтому пакеты с пересекающимися книгами не приводят
+    к взаимной блокировке.
+    """
+
+    return (
+        select(Book.id, Book.available_copies)
+        .filter(Book.id.in_(book_ids))
+        .order_by(Book.id)
+        .with_for_update()
+    )
+
+
+def change_copies_query(changes: dict[int, int]) -> Update:
+    """
+    Изменяет число доступных копий нескольких книг одним запросом.
+    Строки предварительно блокируются в порядке ID.
+    """
+
+    locked = lock_books_query(list(changes)).cte("locked_books")
+    return (
+        update(Book)
+        .filter(Book.id == locked.c.id)
+        .values(
+            available_copies=Book.available_copies
+            + case(changes, value=Book.id)
         )
+        .execution_options(synchronize_session=False)
     )
 
-    if user_rebooks_count >= 5:
-        raise LimitException()
 
-    rebook = Rebook(user_id=user_id, book_id=book_id)
-    book.available_copies -= 1
+def _failed(book_id: int, exception: type[CustomException]) -> RebookBatchItem:
+    return RebookBatchItem(
+        book_id=book_id,
+        status_code=exception.status_code,
+        detail=exception.detail,
+    )
 
-    db.add(rebook)
-    db.add(book)
-    await db.commit()
-    await db.refresh(rebook)
-    return rebook
+
+def _batch_result(items: list[RebookBatchItem]) -> RebookBatchResult:
+    succeeded = sum(item.rebook is not None for item in items)
+    return RebookBatchResult(
+        succeeded=succeeded, failed=len(items) - succeeded, items=items
+    )
+
+
+async def borrow_books(
+    db: AsyncSession, user_id: int, book_ids: Sequence[int]
+) -> RebookBatchResult:
+    """
+    Пакетная выдача книг пользователю в одной транзакции.
+    Строка пользователя и строки всех книг блокируются двумя запросами
+    (книги - в порядке ID), лимит проверяется один раз, выдачи создаются
+    одним запросом. Книги обрабатываются в порядке запроса: после
+    исчерпания лимита или копий остальные получают ошибку. Как и при
+    одиночной выдаче, лимит проверяется раньше наличия книги.
+    Возвращает результат по каждой книге.
+    """
+
+    active_loans = await db.scalar(
+        select(User.active_loans).filter(User.id == user_id).with_for_update()
+    )
+    copies = dict((await db.execute(lock_books_query(set(book_ids)))).all())
+
+    capacity = MAX_ACTIVE_LOANS - active_loans
+    granted: Counter[int] = Counter()
+    items: list[RebookBatchItem] = []
+    for book_id in book_ids:
+        if granted.total() >= capacity:
+            items.append(_failed(book_id, LimitException))
+        elif book_id not in copies:
+            items.append(_failed(book_id, BookNotFoundException))
+        elif granted[book_id] >= copies[book_id]:
+            items.append(_failed(book_id, AvailableException))
+        else:
+            granted[book_id] += 1
+            items.append(RebookBatchItem(book_id=book_id, status_code=201))
+
+    if not granted:
+        await db.rollback()
+        return _batch_result(items)
+
+    await db.execute(
+        change_copies_query({book_id: -n for book_id, n in granted.items()})
+    )
+    await db.execute(
+        update(User)
+        .filter(User.id == user_id)
+        .values(active_loans=User.active_loans + granted.total())
+        .execution_options(synchronize_session=False)
+    )
+    successful = [item for item in items if item.status_code == 201]
+    rebooks = await db.scalars(
+        insert(Rebook).returning(Rebook, sort_by_parameter_order=True),
+        [{"user_id": user_id, "book_id": item.book_id} for item in successful],
+    )
+    for item, rebook in zip(successful, rebooks.all()):
+        item.rebook = RebookResponse.model_validate(rebook)
+
+    await commit(db)
+    await after_commit(db, invalidate_book_cache, *granted)
+    return _batch_result(items)
 
 
 async def get_rebook_by_id(rebook_id: int, db: AsyncSession) -> Rebook:
@@ -65,34 +254,128 @@ async def get_rebook_by_id(rebook_id: int, db: AsyncSession) -> Rebook:
     return rebook
 
 
+async def get_rebook_fields(
+    rebook_id: int, fields: Sequence[str], db: AsyncSession
+) -> dict:
+    """
+    Получение выбранных полей выдачи книги по ID.
+    Выбрасывает исключение, если выдача книги не найдена.
+    """
+
+    result = await db.execute(
+        select(*field_columns(Rebook, fields)).filter(Rebook.id == rebook_id)
+    )
+    rebooks = rows(result)
+
+    if not rebooks:
+        raise RebookNotFoundException()
+
+    return rebooks[0]
+
+
 async def return_book(db: AsyncSession, user_id: int, book_id: int) -> Rebook:
     """
     Возврат книги пользователем.
-    Обновляет статус выдачи и увеличивает количество доступных копий книги.
+    Обновляет статус выдачи, счетчик книг пользователя и количество
+    доступных копий книги в одной транзакции.
     Возвращает информацию о выданной книге.
     Выбрасывает исключение, если книга не была выдана пользователю.
     """
 
+    active_rebook_id = active_rebook_query(user_id, book_id).scalar_subquery()
     rebook = await db.scalar(
-        select(Rebook).filter(
+        update(Rebook)
+        .filter(Rebook.id == active_rebook_id, Rebook.returned_at.is_(None))
+        .values(returned_at=func.now())
+        .returning(Rebook)
+        .execution_options(synchronize_session=False)
+    )
+
+    if not rebook:
+        raise RebookNotFoundException()
+
+    await db.execute(
+        update(User)
+        .filter(User.id == user_id)
+        .values(active_loans=User.active_loans - 1)
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        update(Book)
+        .filter(Book.id == book_id)
+        .values(available_copies=Book.available_copies + 1)
+        .execution_options(synchronize_session=False)
+    )
+    await commit(db)
+    await after_commit(db, invalidate_book_cache, book_id)
+    return rebook
+
+
+async def return_books(
+    db: AsyncSession, user_id: int, book_ids: Sequence[int]
+) -> RebookBatchResult:
+    """
+    Пакетный возврат книг пользователем в одной транзакции.
+    Сначала блокируется строка пользователя, как при пакетной выдаче,
+    затем невозвращенные выдачи одним запросом в порядке ID; для каждой
+    книги закрывается самая ранняя из них. Счетчик
+    пользователя и копии всех книг обновляются по одному разу.
+    Возвращает результат по каждой книге.
+    """
+
+    await db.execute(
+        select(User.id).filter(User.id == user_id).with_for_update()
+    )
+    result = await db.execute(
+        select(Rebook.id, Rebook.book_id)
+        .filter(
             Rebook.user_id == user_id,
-            Rebook.book_id == book_id,
+            Rebook.book_id.in_(set(book_ids)),
             Rebook.returned_at.is_(None),
         )
+        .order_by(Rebook.id)
+        .with_for_update()
     )
+    active: defaultdict[int, deque[int]] = defaultdict(deque)
+    for rebook_id, book_id in result.all():
+        active[book_id].append(rebook_id)
 
-    if not rebook:
-        raise RebookNotFoundException()
+    chosen: dict[int, RebookBatchItem] = {}
+    items: list[RebookBatchItem] = []
+    for book_id in book_ids:
+        if not active[book_id]:
+            items.append(_failed(book_id, RebookNotFoundException))
+            continue
+        item = RebookBatchItem(book_id=book_id, status_code=200)
+        chosen[active[book_id].popleft()] = item
+        items.append(item)
 
-    rebook.returned_at = func.now()
-    book = await get_book_by_id(book_id, db)
-    book.available_copies += 1
+    if not chosen:
+        await db.rollback()
+        return _batch_result(items)
 
-    db.add(rebook)
-    db.add(book)
-    await db.commit()
-    await db.refresh(rebook)
-    return rebook
+    rebooks = await db.scalars(
+        update(Rebook)
+        .filter(Rebook.id.in_(chosen))
+        .values(returned_at=func.now())
+        .returning(Rebook)
+        .execution_options(synchronize_session=False)
+    )
+    returned: Counter[int] = Counter()
+    for rebook in rebooks.all():
+        chosen[rebook.id].rebook = RebookResponse.model_validate(rebook)
+        returned[rebook.book_id] += 1
+
+    await db.execute(
+        update(User)
+        .filter(User.id == user_id)
+        .values(active_loans=User.active_loans - returned.total())
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(change_copies_query(dict(returned)))
+    await commit(db)
+    await after_commit(db, invalidate_book_cache, *returned)
+    return _batch_result(items)
 
 
 async def get_all_rebooks(
@@ -100,16 +383,264 @@ async def get_all_rebooks(
     limit: int = 10,
     offset: int = 0,
     user_id: int | None = None,
-) -> list[Rebook]:
+    cursor: str | None = None,
+    fields: Sequence[str] | None = None,
+) -> list[Rebook] | list[dict]:
     """
     Получение списка всех выданных книг с возможностью фильтрации и пагинации.
+    При наличии курсора выборка продолжается после него, `offset`
+    игнорируется. Если заданы `fields`, возвращаются только они.
     Возвращает список выданных книг.
     """
 
-    query = select(Rebook).order_by(asc(Rebook.id))
-    if user_id:
-        query = query.filter(Rebook.user_id == user_id)
-
-    query = query.limit(limit).offset(offset)
+    query = rebooks_list_query(limit, offset, user_id, cursor, fields)
     result = await db.execute(query)
+    if fields is not None:
+        return rows(result)
+    return result.scalars().all()
+
+
+async def get_user_rebooks(
+    db: AsyncSession,
+    user_id: int,
+    limit: int = 10,
+    cursor: str | None = None,
+    fields: Sequence[str] | None = None,
+) -> list[Rebook] | list[dict]:
+    """
+    Получение истории выдач пользователя страницами по курсору.
+    Страница читается по индексу `ix_rebooks_user_id_id` и не зависит
+    от глубины обхода. Существование пользователя проверяется, только
+    если первая страница пуста.
+    Выбрасывает исключение, если пользователь не найден.
+    """
+
+    rebooks = await get_all_rebooks(
+        db, limit=limit, user_id=user_id, cursor=cursor, fields=fields
+    )
+    if not rebooks and cursor is None:
+        user = await db.scalar(select(User.id).filter(User.id == user_id))
+        if not user:
+            raise UserNotFoundException()
+    return rebooks
+
+
+async def reconcile_active_loans(db: AsyncSession) -> int:
+    """
+    Пересчитывает счетчики книг на руках по таблице выдач.
+    Обновляет только расходящиеся счетчики.
+    Возвращает количество исправленных пользователей.
+    """
+
+    active_count = (
+        select(func.count(Rebook.id))
+        .filter(Rebook.user_id == User.id, Rebook.returned_at.is_(None))
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        update(User)
+        .filter(User.active_loans != active_count)
+        .values(active_loans=active_count)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def export_rebooks(
+    session_factory: async_sessionmaker[AsyncSession],
+    batch_size: int = settings.EXPORT_BATCH_SIZE,
+) -> AsyncIterator[RebookResponse]:
+    """
+    Потоковая выгрузка всех выдач в порядке ID.
+    Записи читаются через серверный курсор пачками по `batch_size`.
+    """
+
+    async with session_factory() as db:
+        result = await db.stream(
+            select(Rebook)
+            .order_by(Rebook.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for rebook in result.scalars():
+            yield RebookResponse.model_validate(rebook)
+
+
+def overdue_rebooks_query(
+    limit: int = 10,
+    cursor: str | None = None,
+    as_of: datetime | None = None,
+    columns: Sequence = (),
+) -> Select:
+    """
+    Запрос страницы просроченных выдач в порядке срока возврата.
+    Обслуживается частичным индексом `ix_rebooks_overdue`; курсор
+    содержит срок возврата и ID последней выдачи страницы.
+    По умолчанию просрочка определяется на текущий момент.
+    """
+
+    query = select(*columns) if columns else select(Rebook)
+    query = query.filter(
+        Rebook.returned_at.is_(None),
+        Rebook.due_date < (func.localtimestamp() if as_of is None else as_of),
+    )
+    return paginate(query, [Rebook.due_date, Rebook.id], limit, cursor=cursor)
+
+
+async def get_overdue_rebooks(
+    db: AsyncSession, limit: int = 10, cursor: str | None = None
+) -> list[Rebook]:
+    """
+    Получение страницы просроченных выдач.
+    Возвращает список выдач, отсортированный по сроку возврата.
+    """
+
+    result = await db.execute(overdue_rebooks_query(limit, cursor))
     return result.scalars().all()
+
+
+def overdue_age_bucket(days: int) -> str:
+    """Группа просрочки по числу дней: `7d`, `30d`, `90d` или `>90d`."""
+
+    for bucket in OVERDUE_AGE_BUCKETS:
+        if days <= bucket:
+            return f"{bucket}d"
+    return f">{OVERDUE_AGE_BUCKETS[-1]}d"
+
+
+@dataclass
+class OverdueStats:
+    """Сводка по одному обходу просроченных выдач."""
+
+    as_of: datetime
+    overdue: int = 0
+    batches: int = 0
+    oldest_due_date: datetime | None = None
+    by_age: dict[str, int] = field(default_factory=dict)
+    duration_seconds: float = 0.0
+
+
+async def scan_overdue_loans(
+    session_factory: async_sessionmaker[AsyncSession],
+    batch_size: int = settings.OVERDUE_SCAN_BATCH_SIZE,
+) -> OverdueStats:
+    """
+    Обходит просроченные выдачи пачками по `batch_size` по курсору
+    (срок возврата, ID). Момент просрочки фиксируется в начале обхода,
+    каждая пачка читается отдельной короткой транзакцией по индексу
+    `ix_rebooks_overdue`, поэтому стоимость пачки не зависит от размера
+    таблицы, а обход не удерживает снимок данных.
+    Возвращает сводку по обходу.
+    """
+
+    start = time.perf_counter()
+    async with session_factory() as db:
+        as_of = await db.scalar(select(func.localtimestamp()))
+        stats = OverdueStats(as_of=as_of)
+        ages: Counter[str] = Counter()
+        cursor = None
+
+        while True:
+            result = await db.execute(
+                overdue_rebooks_query(
+                    batch_size,
+                    cursor,
+                    as_of,
+                    columns=(Rebook.due_date, Rebook.id),
+                )
+            )
+            batch = result.all()
+            await db.commit()
+            if not batch:
+                break
+
+            stats.batches += 1
+            stats.overdue += len(batch)
+            if stats.oldest_due_date is None:
+                stats.oldest_due_date = batch[0].due_date
+            for row in batch:
+                ages[overdue_age_bucket((as_of - row.due_date).days)] += 1
+
+            cursor = next_cursor(batch, batch_size, OVERDUE_CURSOR_KEYS)
+            if cursor is None:
+                break
+
+    stats.by_age = dict(ages)
+    stats.duration_seconds = time.perf_counter() - start
+    return stats
+
+
+class OverdueScanner:
+    """
+    Фоновая задача, периодически обходящая просроченные выдачи.
+    Задача запускается в каждом процессе приложения, но обход в каждый
+    момент выполняет только один из них.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        interval: float,
+        batch_size: int,
+    ):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self.runs = 0
+        self.last_stats: OverdueStats | None = None
+        self._task: asyncio.Task | None = None
+
+    async def scan(self) -> OverdueStats | None:
+        """
+        Обходит просроченные выдачи, если обход не выполняется в другом
+        процессе: на время обхода берется рекомендательная блокировка
+        транзакции. Возвращает сводку или None, если обход пропущен.
+        """
+
+        async with self.session_factory() as db:
+            locked = await db.scalar(
+                select(func.pg_try_advisory_xact_lock(OVERDUE_SCAN_LOCK_ID))
+            )
+            if not locked:
+                logger.debug("Overdue loan scan is running elsewhere")
+                return None
+            stats = await scan_overdue_loans(
+                self.session_factory, self.batch_size
+            )
+
+        self.runs += 1
+        self.last_stats = stats
+        logger.info(
+            "Overdue loans: %s in %s batches, oldest due %s, by age %s "
+            "(%.3fs)",
+            stats.overdue,
+            stats.batches,
+            stats.oldest_due_date,
+            stats.by_age,
+            stats.duration_seconds,
+        )
+        return stats
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.scan()
+            except Exception:
+                logger.exception("Overdue loan scan failed")
+            await asyncio.sleep(self.interval)
+
+    async def start(self) -> None:
+        if self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+
+overdue_scanner = OverdueScanner(
+    async_session,
+    settings.OVERDUE_SCAN_INTERVAL,
+    settings.OVERDUE_SCAN_BATCH_SIZE,
+)
@@ -0,0 +1,103 @@
+"""
+Поиск по текстовым колонкам:
+
+- Фильтрация по подстроке. В PostgreSQL условие `ILIKE '%...%'`
+  обслуживается GIN-индексами pg_trgm (`gin_trgm_ops`), если образец
+  содержит не меньше трех символов. Для других СУБД используется `ILIKE`
+  диалекта (`lower(...) LIKE lower(...)`) без триграммного индекса.
+- Фильтрация по началу строки (`LIKE '...%'`), которую обслуживает
+  B-tree индекс с `varchar_pattern_ops`.
+- Полнотекстовый поиск PostgreSQL: разбор запроса, ранжирование
+  и подсветка найденных фрагментов. Фрагмент - безопасный HTML: текст
+  документа экранируется, совпадения выделяются тегами `<b>`.
+"""
+
+from sqlalchemy import ColumnElement, Index, func
+from sqlalchemy.dialects.postgresql import ts_headline, websearch_to_tsquery
+from sqlalchemy.orm import InstrumentedAttribute
+
+SEARCH_CONFIG = "russian"
+HEADLINE_OPTIONS = (
+    "StartSel=<b>, StopSel=</b>, MaxWords=35, MinWords=15, MaxFragments=2"
+)
+
+
+def escape_like(value: str) -> str:
+    """Экранирует служебные символы шаблона LIKE."""
+
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def contains(column: InstrumentedAttribute, value: str) -> ColumnElement[bool]:
+    """
+    Возвращает условие поиска подстроки без учета регистра.
+    Символы `%` и `_` в `value` ищутся буквально.
+    Триграммный индекс используется только для `value` не короче трех
+    символов, поэтому более короткие значения отклоняются при проверке
+    параметров запроса.
+    """
+
+    return column.ilike(f"%{escape_like(value)}%", escape="\\")
+
+
+def starts_with(
+    column: InstrumentedAttribute, value: str
+) -> ColumnElement[bool]:
+    """
+    Возвращает условие поиска по началу строки с учетом регистра.
+    Образец собирается целиком в приложении, чтобы планировщик видел
+    постоянный префикс и мог использовать индекс.
+    Символы `%` и `_` в `value` ищутся буквально.
+    """
+
+    return column.like(f"{escape_like(value)}%", escape="\\")
+
+
+def trigram_index(name: str, column: str) -> Index:
+    """
+    Описывает GIN-индекс pg_trgm для колонки. В других СУБД создается
+    обычный индекс по колонке.
+    """
+
+    return Index(
+        name,
+        column,
+        postgresql_using="gin",
+        postgresql_ops={column: "gin_trgm_ops"},
+    )
+
+
+def search_query(text: str) -> ColumnElement:
+    """Разбирает поисковую строку в `tsquery` (синтаксис веб-поиска)."""
+
+    return websearch_to_tsquery(SEARCH_CONFIG, text)
+
+
+def search_rank(
+    vector: InstrumentedAttribute, tsquery: ColumnElement
+) -> ColumnElement[float]:
+    """Релевантность документа с учетом близости найденных слов."""
+
+    return func.ts_rank_cd(vector, tsquery)
+
+
+def escape_html(document: ColumnElement) -> ColumnElement[str]:
+    """Экранирует символы `&`, `<` и `>` в тексте на стороне базы."""
+
+    for char, entity in (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;")):
+        document = func.replace(document, char, entity)
+    return document
+
+
+def search_snippet(
+    document: ColumnElement, tsquery: ColumnElement
+) -> ColumnElement[str]:
+    """
+    Фрагмент документа с подсвеченными совпадениями в виде HTML.
+    Текст документа экранируется до подсветки, поэтому единственная
+    разметка во фрагменте - теги `<b>` вокруг совпадений.
+    """
+
+    return ts_headline(
+        SEARCH_CONFIG, escape_html(document), tsquery, HEADLINE_OPTIONS
+    )
@@ -0,0 +1,79 @@
+"""
+Быстрая сериализация списков в JSON:
+
+- Ответ строится один раз через `TypeAdapter.dump_json` (pydantic-core)
+  и возвращается готовыми байтами, минуя повторную валидацию
+  `response_model` и `jsonable_encoder` со стандартным модулем `json`.
+- Режим включается настройкой `FAST_JSON_RESPONSES`; при отключении
+  данные возвращаются как есть и сериализуются FastAPI.
+- Ответы с выборочными полями (`fields`) не соответствуют схеме ответа
+  и всегда сериализуются напрямую.
+"""
+
+from functools import lru_cache
+from typing import Any, Sequence
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+from .config import settings
+
+
+class JSONBytesResponse(Response):
+    """Ответ с уже сериализованным JSON."""
+
+    media_type = "application/json"
+
+
+any_adapter = TypeAdapter(Any)
+
+
+def _headers(response: Response | None) -> dict[str, str] | None:
+    return dict(response.headers) if response is not None else None
+
+
+def json_response(
+    content: Any, response: Response | None = None
+) -> JSONBytesResponse:
+    """
+    Сериализует данные без проверки по схеме ответа.
+    Заголовки, установленные обработчиком в `response`, переносятся
+    в итоговый ответ.
+    """
+
+    return JSONBytesResponse(
+        any_adapter.dump_json(content), headers=_headers(response)
+    )
+
+
+@lru_cache
+def list_adapter(schema: type[BaseModel]) -> TypeAdapter:
+    """Адаптер списка объектов схемы (создается один раз на схему)."""
+
+    return TypeAdapter(list[schema])
+
+
+def json_list_response(
+    items: Sequence[Any],
+    schema: type[BaseModel],
+    response: Response | None = None,
+    fields: Sequence[str] | None = None,
+) -> Any:
+    """
+    Сериализует список объектов по схеме ответа. Если заданы
+    выборочные поля, список словарей сериализуется как есть.
+    Заголовки, установленные обработчиком в `response`, переносятся
+    в итоговый ответ.
+    """
+
+    if fields is not None:
+        return json_response(items, response)
+
+    if not settings.FAST_JSON_RESPONSES:
+        return items
+
+    adapter = list_adapter(schema)
+    content = adapter.dump_json(
+        adapter.validate_python(items, from_attributes=True)
+    )
+    return JSONBytesResponse(content, headers=_headers(response))
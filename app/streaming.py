@@ -0,0 +1,267 @@
+"""
+Потоковая обработка данных в форматах NDJSON и CSV:
+
+- Построчное чтение тела запроса без загрузки его в память целиком.
+- Разбор строк NDJSON и CSV в записи с номерами строк и ошибками разбора,
+  в том числе многострочных значений CSV и строк не в UTF-8.
+- Потоковая выгрузка записей в NDJSON или CSV с буферизацией по строкам.
+"""
+
+import codecs
+import csv
+import io
+import json
+from collections import deque
+from enum import Enum
+from typing import Any, AsyncIterator, Iterator
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+Record = tuple[int, dict[str, Any] | None, str | None]
+
+INVALID_ENCODING = "Invalid UTF-8"
+
+
+class DataFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+MEDIA_TYPES = {
+    DataFormat.NDJSON: "application/x-ndjson",
+    DataFormat.CSV: "text/csv",
+}
+
+
+def detect_format(content_type: str | None) -> DataFormat:
+    """Определяет формат данных по заголовку `Content-Type`."""
+
+    if content_type and "csv" in content_type.lower():
+        return DataFormat.CSV
+    return DataFormat.NDJSON
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes],
+) -> AsyncIterator[str | None]:
+    """
+    Разбивает поток байтов на строки в кодировке UTF-8. Строки
+    возвращаются вместе с символами конца строки, метка порядка байтов
+    в начале потока отбрасывается. Вместо строки, которую не удалось
+    декодировать, возвращается None.
+    """
+
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+
+    def decode(line: bytes, final: bool = False) -> str | None:
+        try:
+            return decoder.decode(line, final)
+        except UnicodeDecodeError:
+            return None
+
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield decode(line + b"\n")
+
+    if buffer:
+        yield decode(buffer, final=True)
+
+
+async def ndjson_records(
+    lines: AsyncIterator[str | None],
+) -> AsyncIterator[Record]:
+    """
+    Разбирает строки NDJSON.
+    Возвращает номер строки, запись или описание ошибки разбора.
+    Пустые строки пропускаются.
+    """
+
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if line is None:
+            yield line_number, None, INVALID_ENCODING
+            continue
+        if not line.strip():
+            continue
+
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_number, None, "Invalid JSON"
+            continue
+
+        if not isinstance(record, dict):
+            yield line_number, None, "Record must be a JSON object"
+            continue
+
+        yield line_number, record, None
+
+
+class _LineFeed:
+    """
+    Источник строк для `csv.reader`, пополняемый по мере чтения потока.
+    Пустой источник завершает текущий вызов `next()` у читателя,
+    но сам читатель остается пригодным для следующих записей.
+    """
+
+    def __init__(self):
+        self.lines: deque[str] = deque()
+
+    def __iter__(self) -> "_LineFeed":
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def csv_records(
+    lines: AsyncIterator[str | None],
+) -> AsyncIterator[Record]:
+    """
+    Разбирает строки CSV. Первая запись содержит имена колонок,
+    каждая следующая непустая - одну запись. Значение в кавычках может
+    занимать несколько строк: строки накапливаются, пока кавычки
+    не закрыты, и передаются одному общему читателю CSV.
+    Возвращает номер первой строки записи, запись или описание ошибки.
+    """
+
+    feed = _LineFeed()
+    reader = csv.reader(feed)
+    header: list[str] | None = None
+    # Строки, не переданные читателю: пустые и недекодируемые.
+    skipped = 0
+    pending: list[str] = []
+    quotes = 0
+
+    def parse() -> Iterator[Record]:
+        nonlocal header
+        feed.lines.extend(pending)
+        pending.clear()
+        while feed.lines:
+            line_number = reader.line_num + skipped + 1
+            try:
+                values = next(reader)
+            except StopIteration:
+                break
+            except csv.Error as e:
+                yield line_number, None, f"Invalid CSV: {e}"
+                continue
+
+            if not values:
+                continue
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            if len(values) != len(header):
+                yield line_number, None, "Column count does not match header"
+                continue
+            yield line_number, dict(zip(header, values)), None
+
+    async for line in lines:
+        if line is None:
+            # Незавершенная запись с недекодируемой строкой отбрасывается.
+            skipped += len(pending) + 1
+            yield reader.line_num + skipped, None, INVALID_ENCODING
+            pending.clear()
+            quotes = 0
+            continue
+        if not pending and not line.strip():
+            skipped += 1
+            continue
+
+        pending.append(line)
+        quotes += line.count('"')
+        if quotes % 2 == 0:
+            quotes = 0
+            for record in parse():
+                yield record
+
+    if pending:
+        # Поток закончился внутри значения в кавычках.
+        yield reader.line_num + skipped + 1, None, (
+            "Invalid CSV: unexpected end of data"
+        )
+
+
+def parse_records(
+    chunks: AsyncIterator[bytes], data_format: DataFormat
+) -> AsyncIterator[Record]:
+    """Разбирает поток байтов в записи указанного формата."""
+
+    lines = iter_lines(chunks)
+    if data_format == DataFormat.CSV:
+        return csv_records(lines)
+    return ndjson_records(lines)
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return ";".join(str(item) for item in value)
+    return value
+
+
+async def encode_records(
+    items: AsyncIterator[BaseModel],
+    data_format: DataFormat,
+    fields: list[str],
+    buffer_size: int,
+) -> AsyncIterator[str]:
+    """
+    Сериализует записи в NDJSON или CSV.
+    Записи накапливаются в буфере и отдаются блоками по `buffer_size` строк.
+    """
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if data_format == DataFormat.CSV:
+        writer.writerow(fields)
+
+    rows = 0
+    async for item in items:
+        if data_format == DataFormat.CSV:
+            data = item.model_dump(mode="json", include=set(fields))
+            writer.writerow([_csv_value(data.get(field)) for field in fields])
+        else:
+            buffer.write(item.model_dump_json())
+            buffer.write("\n")
+
+        rows += 1
+        if rows >= buffer_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_response(
+    items: AsyncIterator[BaseModel],
+    data_format: DataFormat,
+    schema: type[BaseModel],
+    filename: str,
+    buffer_size: int,
+) -> StreamingResponse:
+    """Формирует потоковый ответ с выгрузкой записей в виде файла."""
+
+    return StreamingResponse(
+        encode_records(
+            items, data_format, list(schema.model_fields), buffer_size
+        ),
+        media_type=MEDIA_TYPES[data_format],
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="{filename}.{data_format.value}"'
+            )
+        },
+    )
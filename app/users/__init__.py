@@ -2,6 +2,7 @@ from .enums import UserRole
 from .exceptions import CustomException
 from .models import BaseModel, User
 from .routes import users_router
+from .security import password_hasher
 from .services import get_current_user, require_role
 
 __all__ = [
@@ -10,6 +11,7 @@ __all__ = [
     "User",
     "UserRole",
     "get_current_user",
+    "password_hasher",
     "require_role",
     "users_router",
 ]
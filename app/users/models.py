@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, String
+from sqlalchemy import Boolean, Index, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 
@@ -30,6 +30,15 @@ class User(BaseModel):
     """Модель пользователя."""
 
     __tablename__ = "users"
+    __table_args__ = (
+        Index(
+            "ix_users_email_pattern",
+            "email",
+            postgresql_ops={"email": "varchar_pattern_ops"},
+        ),
+        Index("ix_users_role_id", "role", "id"),
+        Index("ix_users_is_active_id", "is_active", "id"),
+    )
 
     username: Mapped[str] = mapped_column(
         String(20), nullable=False, doc="Имя пользователя"
@@ -52,3 +61,10 @@ class User(BaseModel):
         default=UserRole.READER.value,
         doc="Роль пользователя (по умолчанию - 'reader')",
     )
+    active_loans: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        server_default="0",
+        nullable=False,
+        doc="Количество книг, находящихся у пользователя",
+    )
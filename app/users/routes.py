@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database import get_async_session
+from ..config import settings
+from ..database import get_async_session, get_session_factory
+from ..etag import etag_matches, not_modified
+from ..pagination import set_next_cursor
+from ..serialization import json_list_response
+from ..streaming import DataFormat, export_response
 from .enums import UserRole
-from .models import User
 from .schemas import (
     LoginRequest,
     RoleUpdate,
@@ -15,9 +20,11 @@ from .schemas import (
 )
 from .services import (
     create_user,
+    export_users,
     get_all_users,
     get_current_user,
     get_user_by_id,
+    get_user_etag,
     login_user,
     require_role,
     update_current_user,
@@ -74,18 +81,94 @@ async def login(
     response_model=list[UserResponse],
     summary="Список пользователей",
     description="""
-    Получение списка всех пользователей (только для администратора).
+    Получение списка пользователей (только для администратора).
+    - Можно задать `limit` (количество пользователей) и `offset`
+    (начало выборки).
+    - Для постраничного обхода без `offset` передайте `cursor` из заголовка
+    `X-Next-Cursor` предыдущего ответа.
+    - Можно фильтровать по началу `email`, роли `role` и статусу
+    `is_active`.
     """,
     responses={
         200: {"description": "Список пользователей успешно получен."},
+        400: {"description": "Некорректные параметры запроса."},
         403: {"description": "Недостаточно прав для выполнения операции."},
     },
 )
 async def list_users(
+    response: Response,
+    limit: int = Query(10, ge=1, le=100, description="Количество записей."),
+    offset: int = Query(0, ge=0, description="Смещение от начала выборки."),
+    cursor: str | None = Query(
+        None, description="Курсор следующей страницы (`X-Next-Cursor`)."
+    ),
+    email: str | None = Query(
+        None, max_length=50, description="Фильтр по началу email."
+    ),
+    role: UserRole | None = Query(None, description="Фильтр по роли."),
+    is_active: bool | None = Query(
+        None, description="Фильтр по статусу активности."
+    ),
     db: AsyncSession = Depends(get_async_session),
     current_user=Depends(require_role(UserRole.ADMIN)),
 ):
-    return await get_all_users(db)
+    users = await get_all_users(
+        db=db,
+        limit=limit,
+        offset=offset,
+        cursor=cursor,
+        email=email,
+        role=role,
+        is_active=is_active,
+    )
+    set_next_cursor(response, users, limit)
+    return json_list_response(users, UserResponse, response)
+
+
+@users_router.get(
+    "/export/",
+    response_class=StreamingResponse,
+    summary="Выгрузка пользователей",
+    description="""
+    Потоковая выгрузка пользователей в NDJSON или CSV (только для
+    администратора). Поддерживает те же фильтры, что и список
+    пользователей. Ответ начинает передаваться сразу, расход памяти
+    не зависит от числа пользователей.
+    """,
+    responses={
+        200: {"description": "Выгрузка пользователей."},
+        403: {"description": "Недостаточно прав для выполнения операции."},
+    },
+)
+async def export(
+    data_format: DataFormat = Query(
+        DataFormat.NDJSON,
+        alias="format",
+        description="Формат данных (`ndjson` или `csv`).",
+    ),
+    email: str | None = Query(
+        None, max_length=50, description="Фильтр по началу email."
+    ),
+    role: UserRole | None = Query(None, description="Фильтр по роли."),
+    is_active: bool | None = Query(
+        None, description="Фильтр по статусу активности."
+    ),
+    session_factory=Depends(get_session_factory),
+    current_user=Depends(require_role(UserRole.ADMIN)),
+):
+    return export_response(
+        export_users(
+            session_factory,
+            settings.EXPORT_BATCH_SIZE,
+            email=email,
+            role=role,
+            is_active=is_active,
+        ),
+        data_format,
+        UserResponse,
+        "users",
+        settings.EXPORT_BATCH_SIZE,
+    )
 
 
 @users_router.get(
@@ -95,16 +178,26 @@ async def list_users(
     description="""
     Получение информации о текущем пользователе.
     Возвращает данные о текущем пользователе и выданных ему книгах.
+    Ответ содержит заголовок `ETag`; при совпадении `If-None-Match`
+    возвращается `304 Not Modified` без тела.
     """,
     responses={
         200: {"description": "Данные текущего пользователя успешно получены."},
+        304: {"description": "Данные пользователя не изменились."},
         401: {"description": "Необходима авторизация."},
     },
 )
 async def get_me(
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_async_session),
-    current_user: UserRebookResponse = Depends(get_current_user),
+    current_user: UserResponse = Depends(get_current_user),
 ):
+    etag = await get_user_etag(current_user.id, db)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    response.headers["ETag"] = etag
     return await get_user_by_id(current_user.id, db)
 
 
@@ -125,7 +218,7 @@ async def get_me(
 async def update_me(
     user_update: UserUpdate,
     db: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user),
+    current_user: UserResponse = Depends(get_current_user),
 ):
     return await update_current_user(user_update, db, current_user)
 
@@ -137,18 +230,28 @@ async def update_me(
     description="""
     Получение информации о пользователе по ID (только для администратора).
     Возвращает данные о пользователе  и выданных ему книгах.
+    Ответ содержит заголовок `ETag`; при совпадении `If-None-Match`
+    возвращается `304 Not Modified` без тела.
     """,
     responses={
         200: {"description": "Данные пользователя успешно получены."},
+        304: {"description": "Данные пользователя не изменились."},
         404: {"description": "Пользователь с указанным ID не найден."},
         403: {"description": "Недостаточно прав для выполнения операции."},
     },
 )
 async def get_user(
     user_id: int,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_async_session),
     current_user=Depends(require_role(UserRole.ADMIN)),
 ):
+    etag = await get_user_etag(user_id, db)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    response.headers["ETag"] = etag
     return await get_user_by_id(user_id, db)
 
 
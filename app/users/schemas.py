@@ -104,7 +104,10 @@ class UserRebookResponse(UserResponse):
     rebooks: Optional[list] = Field(
         None,
         title="Книги пользователя",
-        description="Список книг, взятых пользователем.",
+        description=(
+            "Книги, которые сейчас находятся у пользователя. Полная история "
+            "выдач доступна в `/users/{user_id}/rebooks/`."
+        ),
         json_schema_extra={
             "example": [{"id": 1, "title": "Book", "author": "Author Name"}]
         },
@@ -4,28 +4,127 @@
 - Хеширование паролей с использованием bcrypt.
 - Проверка паролей.
 - Создание токенов доступа с использованием JWT.
+
+Хеширование и проверка паролей выполняются в ограниченном пуле потоков
+или процессов, чтобы не блокировать цикл событий.
 """
 
+import asyncio
+import time
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
 from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
 
 from jose import jwt
 from passlib.context import CryptContext
 
-from ..config import settings
+from ..config import PasswordHashExecutor, settings
 
 ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.PASSWORD_HASH_ROUNDS,
+)
+
+
+def _timed_call(func: Callable, *args: Any) -> tuple[float, Any]:
+    return time.time(), func(*args)
 
 
-def get_password_hash(password: str) -> str:
+def _hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+def _verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+class PasswordHasher:
+    """
+    Ограниченный пул для вычислений bcrypt.
+    Собирает статистику: глубину очереди и время ожидания в ней.
+    """
+
+    def __init__(
+        self, workers: int, executor: PasswordHashExecutor = "thread"
+    ):
+        self.workers = workers
+        self.executor = executor
+        self.in_flight = 0
+        self.completed = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._executor: Executor | None = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor == "process":
+                self._executor = ProcessPoolExecutor(self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    self.workers, thread_name_prefix="bcrypt"
+                )
+        return self._executor
+
+    async def run(self, func: Callable, *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        submitted_at = time.time()
+        self.in_flight += 1
+        try:
+            started_at, result = await loop.run_in_executor(
+                self._get_executor(), _timed_call, func, *args
+            )
+        finally:
+            self.in_flight -= 1
+
+        wait = max(started_at - submitted_at, 0.0)
+        self.completed += 1
+        self.wait_seconds_total += wait
+        self.wait_seconds_max = max(self.wait_seconds_max, wait)
+        return result
+
+    @property
+    def queue_depth(self) -> int:
+        return max(self.in_flight - self.workers, 0)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "wait_seconds_total": self.wait_seconds_total,
+            "wait_seconds_max": self.wait_seconds_max,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    executor=settings.PASSWORD_HASH_EXECUTOR,
+)
+
+
+async def get_password_hash(password: str) -> str:
+    return await password_hasher.run(_hash_password, password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.run(
+        _verify_password, plain_password, hashed_password
+    )
+
+
 def create_access_token(
     data: dict, expires_delta: timedelta | None = None
 ) -> str:
@@ -4,20 +4,28 @@
 - Регистрация пользователей.
 - Аутентификация пользователей.
 - Управление ролями пользователей.
-- Получение данных о пользователях.
+- Получение данных о пользователях, постраничный список с фильтрами
+  и потоковая выгрузка.
+- Кэширование аутентифицированных пользователей по субъекту токена
+  с рассылкой инвалидации другим процессам.
 """
 
-from typing import Annotated
+from typing import Annotated, AsyncIterator
 
 from fastapi import Depends
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy import asc
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.future import select
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import selectinload
 
+from ..cache import TTLCache
 from ..database import get_async_session, settings
+from ..etag import make_etag
+from ..invalidation import invalidation_bus
+from ..pagination import paginate
+from ..search import starts_with
 from .enums import UserRole
 from .exceptions import (
     CredentialsException,
@@ -43,6 +51,31 @@ oauth2_scheme = OAuth2PasswordBearer(
     description="JWT токен передаётся в формате: `Bearer <token>`",
 )
 
+user_cache = TTLCache(
+    maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL
+)
+
+
+async def evict_users(emails: list[str] | None) -> None:
+    """Обработчик шины: удаляет пользователей из кэша (None - всех)."""
+
+    if emails is None:
+        user_cache.clear()
+        return
+
+    for email in emails:
+        user_cache.delete(email)
+
+
+async def invalidate_user(email: str) -> None:
+    """Удаляет пользователя из кэша во всех процессах приложения."""
+
+    await evict_users([email])
+    await invalidation_bus.publish("users", [email])
+
+
+invalidation_bus.register("users", evict_users)
+
 
 async def get_user_by_email(db: AsyncSession, email: str) -> User | None:
     """
@@ -66,7 +99,7 @@ async def create_user(user: UserCreate, db: AsyncSession) -> UserResponse:
     if await get_user_by_email(db, user.email):
         raise UserExistsException()
 
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash(user.password)
     role = (
         UserRole.ADMIN.value
         if not (await db.scalar(select(User.id).limit(1)))
@@ -95,7 +128,7 @@ async def authenticate_user(
 
     user = await get_user_by_email(db, email)
 
-    if user and verify_password(password, user.hashed_password):
+    if user and await verify_password(password, user.hashed_password):
         return user
 
     return None
@@ -113,92 +146,196 @@ async def login_user(data: LoginRequest, db: AsyncSession) -> Token:
     if not user:
         raise LoginException()
 
-    access_token = create_access_token(data={"sub": user.email})
+    access_token = create_access_token(
+        data={"sub": user.email, "uid": user.id, "role": user.role}
+    )
     return Token(access_token=access_token)
 
 
 async def get_user_by_id(user_id: int, db: AsyncSession) -> UserRebookResponse:
     """
     Получение пользователя по ID.
-    Возвращает информация о пользователе и выданных ему книгах.
+    Возвращает информацию о пользователе и книгах, которые сейчас у него
+    на руках. Невозвращенные выдачи загружаются отдельным запросом
+    по частичному индексу `ix_rebooks_active_user_book`, поэтому размер
+    ответа не зависит от длины истории выдач.
     Выбрасывает исключение, если пользователь не найден.
     """
 
-    query = (
+    user = await db.scalar(
         select(User)
-        .options(joinedload(User.rebooks))
+        .options(selectinload(User.active_rebooks))
         .filter(User.id == user_id)
     )
-    result = await db.execute(query)
-    user = result.unique().scalar_one_or_none()
 
     if not user:
         raise UserNotFoundException()
 
-    user_response = UserRebookResponse.model_validate(user)
-    user_response.set_rebooks(user.rebooks)
+    # Полная история `User.rebooks` не загружается: ответ строится
+    # из колонок пользователя и списка невозвращенных выдач.
+    user_response = UserRebookResponse.model_validate(
+        UserResponse.model_validate(user).model_dump()
+    )
+    user_response.set_rebooks(user.active_rebooks)
     return user_response
 
 
-async def get_all_users(db: AsyncSession) -> list[UserResponse]:
+async def get_user_etag(user_id: int, db: AsyncSession) -> str:
+    """
+    Получение ETag пользователя без загрузки его данных.
+    Время изменения пользователя обновляется и при выдаче или возврате
+    книги вместе со счетчиком книг на руках.
+    Выбрасывает исключение, если пользователь не найден.
+    """
+
+    updated_at = await db.scalar(
+        select(User.updated_at).filter(User.id == user_id)
+    )
+
+    if not updated_at:
+        raise UserNotFoundException()
+
+    return make_etag("user", user_id, updated_at)
+
+
+def filter_users(
+    query: Select,
+    email: str | None = None,
+    role: UserRole | None = None,
+    is_active: bool | None = None,
+) -> Select:
     """
-    Получение списка всех пользователей.
+    Добавляет к запросу фильтры пользователей. Поиск по началу email
+    обслуживается индексом `ix_users_email_pattern`, фильтры по роли
+    и статусу с сортировкой по ID - индексами `ix_users_role_id`
+    и `ix_users_is_active_id`.
+    """
+
+    if email:
+        query = query.filter(starts_with(User.email, email))
+    if role is not None:
+        query = query.filter(User.role == role.value)
+    if is_active is not None:
+        query = query.filter(User.is_active == is_active)
+    return query
+
+
+async def get_all_users(
+    db: AsyncSession,
+    limit: int = 10,
+    offset: int = 0,
+    cursor: str | None = None,
+    email: str | None = None,
+    role: UserRole | None = None,
+    is_active: bool | None = None,
+) -> list[User]:
+    """
+    Получение списка пользователей с фильтрацией и пагинацией.
+    При наличии курсора выборка продолжается после него, `offset`
+    игнорируется.
     Возвращает список пользователей.
     """
 
-    result = await db.execute(select(User).order_by(asc(User.id)))
+    query = filter_users(select(User), email, role, is_active)
+    query = paginate(query, [User.id], limit, offset, cursor)
+    result = await db.execute(query)
     return result.scalars().all()
 
 
-async def get_current_user(
+async def export_users(
+    session_factory: async_sessionmaker[AsyncSession],
+    batch_size: int = settings.EXPORT_BATCH_SIZE,
+    email: str | None = None,
+    role: UserRole | None = None,
+    is_active: bool | None = None,
+) -> AsyncIterator[UserResponse]:
+    """
+    Потоковая выгрузка пользователей в порядке ID с теми же фильтрами,
+    что и у списка. Записи читаются через серверный курсор пачками
+    по `batch_size`.
+    """
+
+    query = filter_users(select(User), email, role, is_active)
+    async with session_factory() as db:
+        result = await db.stream(
+            query.order_by(User.id).execution_options(yield_per=batch_size)
+        )
+        async for user in result.scalars():
+            yield UserResponse.model_validate(user)
+
+
+async def get_token_payload(
     token: Annotated[str, Depends(oauth2_scheme)],
-    db: AsyncSession = Depends(get_async_session),
-) -> User:
+) -> dict:
     """
-    Получает текущего аутентифицированного пользователя по токену.
-    Возвращает аутентифицированного пользователя.
-    Выбрасывает исключение, если токен недействителен или пользователь
-    не найден.
+    Проверяет токен доступа.
+    Возвращает содержимое токена.
+    Выбрасывает исключение, если токен недействителен.
     """
 
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
-        email: str = payload.get("sub")
-
-        if not email:
-            raise CredentialsException()
-
     except JWTError:
         raise CredentialsException()
 
-    user = await get_user_by_email(db, email)
+    if not payload.get("sub"):
+        raise CredentialsException()
 
-    if not user:
-        raise UserNotFoundException()
+    return payload
+
+
+async def get_current_user(
+    payload: dict = Depends(get_token_payload),
+    db: AsyncSession = Depends(get_async_session),
+) -> UserResponse:
+    """
+    Получает текущего аутентифицированного пользователя по токену.
+    Пользователь берется из кэша, при промахе загружается из базы данных.
+    Возвращает аутентифицированного пользователя.
+    Выбрасывает исключение, если пользователь не найден.
+    """
+
+    email = payload["sub"]
+    user = user_cache.get(email)
+
+    if user is None:
+        db_user = await get_user_by_email(db, email)
+
+        if not db_user:
+            raise UserNotFoundException()
+
+        user = UserResponse.model_validate(db_user)
+        user_cache.set(email, user)
 
     return user
 
 
 async def update_current_user(
-    user_update: UserUpdate, db: AsyncSession, current_user: User
+    user_update: UserUpdate, db: AsyncSession, current_user: UserResponse
 ) -> UserResponse:
     """
     Обновляет данные текущего пользователя.
     Возвращает обновленную информация о пользователе.
     """
 
+    user = await db.get(User, current_user.id)
+
+    if not user:
+        raise UserNotFoundException()
+
     if user_update.username:
-        current_user.username = user_update.username
+        user.username = user_update.username
 
     if user_update.password:
-        current_user.hashed_password = get_password_hash(user_update.password)
+        user.hashed_password = await get_password_hash(user_update.password)
 
-    db.add(current_user)
+    db.add(user)
     await db.commit()
-    await db.refresh(current_user)
-    return current_user
+    await db.refresh(user)
+    await invalidate_user(user.email)
+    return user
 
 
 async def update_user_role(
@@ -219,17 +356,30 @@ async def update_user_role(
     db.add(user)
     await db.commit()
     await db.refresh(user)
+    await invalidate_user(user.email)
     return {"message": f"Role updated to {role_update.new_role}"}
 
 
 def require_role(role: str):
     """
     Декоратор для проверки роли пользователя.
+    Доступ разрешается, только если требуемой роли соответствуют и роль
+    в токене, и актуальная роль пользователя из кэша или базы данных.
+    Несовпадающая роль в токене отклоняет запрос без обращения к базе
+    данных, поэтому после смены роли нужен повторный вход.
     Возвращает текущего пользователя, если роль совпадает.
     Выбрасывает исключение, если роль пользователя не совпадает с требуемой.
     """
 
-    def check_role(current_user=Depends(get_current_user)):
+    async def check_role(
+        payload: dict = Depends(get_token_payload),
+        db: AsyncSession = Depends(get_async_session),
+    ):
+        claimed_role = payload.get("role")
+        if claimed_role is not None and claimed_role != role:
+            raise PermissionException()
+
+        current_user = await get_current_user(payload, db)
         if current_user.role != role:
             raise PermissionException()
         return current_user
@@ -0,0 +1,7 @@
+"""
+Нагрузочное тестирование API.
+
+Использование:
+    python -m benchmarks --duration 10 --concurrency 20
+    python -m benchmarks --url http://localhost:8000 --scenarios search
+"""
@@ -0,0 +1,114 @@
+"""
+Командная строка нагрузочного тестирования.
+
+Без `--url` приложение запускается в том же процессе (ASGI), иначе
+запросы отправляются на работающий сервер. Набор данных создается
+в базе данных из настроек приложения, поэтому при `--url` сервер должен
+использовать ту же базу. Для подсчета SQL-запросов сервер должен быть
+запущен с `DB_TIMING_HEADERS=True`.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import sys
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+from httpx import ASGITransport, AsyncClient, Limits
+
+from app.config import settings
+from app.database import async_session, engine
+
+from .dataset import DatasetConfig, seed
+from .runner import login_users, run_scenario
+from .scenarios import SCENARIOS
+
+
+@asynccontextmanager
+async def create_client(url: str | None, concurrency: int):
+    if url is None:
+        from main import app
+
+        settings.DB_TIMING_HEADERS = True
+        async with app.router.lifespan_context(app):
+            async with AsyncClient(
+                transport=ASGITransport(app=app), base_url="http://benchmark"
+            ) as client:
+                yield client
+        return
+
+    limits = Limits(max_connections=concurrency)
+    async with AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        yield client
+
+
+async def run(args: argparse.Namespace) -> dict:
+    config = DatasetConfig(
+        authors=args.authors,
+        books=args.books,
+        readers=max(args.readers, args.concurrency),
+        hot_books=args.hot_books,
+        hot_copies=args.hot_copies,
+        seed=args.seed,
+    )
+    dataset = await seed(async_session, config)
+
+    report = {
+        "target": args.url or "in-process",
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {
+            "duration": args.duration,
+            "concurrency": args.concurrency,
+            "dataset": config.__dict__,
+        },
+        "scenarios": {},
+    }
+
+    async with create_client(args.url, args.concurrency) as client:
+        users = await login_users(client, dataset, args.concurrency, args.seed)
+        for scenario in args.scenarios:
+            report["scenarios"][scenario] = await run_scenario(
+                client, dataset, scenario, users, args.duration
+            )
+
+    await engine.dispose()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Library API benchmarks")
+    parser.add_argument("--url", help="Адрес работающего сервера")
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        choices=list(SCENARIOS),
+        default=list(SCENARIOS),
+    )
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--authors", type=int, default=100)
+    parser.add_argument("--books", type=int, default=1000)
+    parser.add_argument("--readers", type=int, default=50)
+    parser.add_argument("--hot-books", type=int, default=5)
+    parser.add_argument("--hot-copies", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Файл для отчета в формате JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    report = asyncio.run(run(args))
+
+    content = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(content + "\n")
+    else:
+        sys.stdout.write(content + "\n")
+
+
+if __name__ == "__main__":
+    main()
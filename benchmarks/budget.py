@@ -0,0 +1,190 @@
+"""
+Проверка бюджетов SQL-запросов на заполненной базе данных.
+
+Основные маршруты вызываются в том же процессе при пустых кэшах,
+число SQL-запросов берется из заголовка `X-DB-Queries` и сравнивается
+с бюджетом из `app.query_budget`. Измеренные значения можно вывести
+в виде `QUERY_BUDGETS` для переноса в `app/query_budget.py`.
+"""
+
+from dataclasses import dataclass
+
+from httpx import ASGITransport, AsyncClient
+
+from app.config import settings
+from app.database import async_session
+from app.instrumentation import DB_QUERIES_HEADER
+from app.invalidation import invalidation_bus
+from app.query_budget import QUERY_BUDGETS
+
+from .dataset import Dataset, DatasetConfig, seed
+
+
+@dataclass
+class BudgetResult:
+    method: str
+    route: str
+    status: int
+    queries: int
+    budget: int | None
+
+    @property
+    def exceeded(self) -> bool:
+        return self.budget is not None and self.queries > self.budget
+
+    def __str__(self) -> str:
+        mark = "FAIL" if self.exceeded else "ok"
+        return (
+            f"{mark:<5}{self.method:<7}{self.route:<28}"
+            f"{self.status:<5}{self.queries:>3} / {self.budget}"
+        )
+
+
+class BudgetClient:
+    """Клиент, который сбрасывает кэши перед каждым запросом."""
+
+    def __init__(self, client: AsyncClient):
+        self.client = client
+        self.results: list[BudgetResult] = []
+
+    async def login(self, email: str, password: str) -> dict[str, str]:
+        response = await self.client.post(
+            "/users/login/", json={"email": email, "password": password}
+        )
+        response.raise_for_status()
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def call(self, method: str, route: str, headers=None, **kwargs):
+        await invalidation_bus.flush()
+        path = route.format(**kwargs.pop("path_params", {}))
+        response = await self.client.request(
+            method, path, headers=headers, **kwargs
+        )
+        self.results.append(
+            BudgetResult(
+                method=method,
+                route=route,
+                status=response.status_code,
+                queries=int(response.headers.get(DB_QUERIES_HEADER, 0)),
+                budget=QUERY_BUDGETS[(method, route)],
+            )
+        )
+        return response
+
+
+async def _run(client: BudgetClient, dataset: Dataset) -> None:
+    reader_email = dataset.reader_emails[0]
+    admin = await client.login(dataset.admin_email, dataset.password)
+    reader = await client.login(reader_email, dataset.password)
+    book_id = dataset.book_ids[0]
+    hot_book_id = dataset.hot_book_ids[0]
+
+    await client.call(
+        "POST",
+        "/users/login/",
+        json={"email": reader_email, "password": dataset.password},
+    )
+    me = await client.call("GET", "/users/me/", reader)
+    await client.call("GET", "/users/", admin)
+    await client.call(
+        "GET", "/users/", admin, params={"role": "reader", "is_active": True}
+    )
+    await client.call("GET", "/users/export/", admin)
+    await client.call(
+        "GET",
+        "/users/{user_id}/",
+        admin,
+        path_params={"user_id": me.json()["id"]},
+    )
+
+    authors = await client.call("GET", "/authors/", reader)
+    await client.call(
+        "GET",
+        "/authors/{author_id}/",
+        reader,
+        path_params={"author_id": authors.json()[0]["id"]},
+    )
+
+    await client.call("GET", "/books/", reader, params={"limit": 100})
+    await client.call(
+        "GET", "/books/", reader, params={"fields": "title,authors"}
+    )
+    await client.call(
+        "GET", "/books/search/", reader, params={"q": dataset.words[0]}
+    )
+    await client.call(
+        "GET", "/books/{book_id}/", reader, path_params={"book_id": book_id}
+    )
+    await client.call("GET", "/books/export/", admin)
+
+    rebook = await client.call(
+        "POST", "/rebooks/", reader, json={"book_id": hot_book_id}
+    )
+    if rebook.status_code == 201:
+        await client.call(
+            "GET",
+            "/rebooks/{rebook_id}/",
+            admin,
+            path_params={"rebook_id": rebook.json()["id"]},
+        )
+        await client.call("GET", "/users/me/", reader)
+        await client.call("GET", "/users/me/rebooks/", reader)
+        await client.call(
+            "GET",
+            "/users/{user_id}/rebooks/",
+            admin,
+            path_params={"user_id": me.json()["id"]},
+        )
+        await client.call(
+            "POST", "/rebooks/return/", reader, json={"book_id": hot_book_id}
+        )
+    batch = {"book_ids": [hot_book_id, *dataset.book_ids[1:4]]}
+    rebooks = await client.call("POST", "/rebooks/batch/", reader, json=batch)
+    if rebooks.status_code == 200:
+        await client.call("POST", "/rebooks/return/batch/", reader, json=batch)
+    await client.call("GET", "/rebooks/", admin, params={"limit": 100})
+    await client.call("GET", "/rebooks/overdue/", admin)
+    await client.call("GET", "/rebooks/export/", admin)
+
+
+async def check_budgets(config: DatasetConfig) -> list[BudgetResult]:
+    """Вызывает основные маршруты и возвращает число SQL-запросов."""
+
+    from main import app
+
+    settings.DB_TIMING_HEADERS = True
+    dataset = await seed(async_session, config)
+
+    async with app.router.lifespan_context(app):
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://budget"
+        ) as http:
+            client = BudgetClient(http)
+            await _run(client, dataset)
+    return client.results
+
+
+def format_budgets(results: list[BudgetResult]) -> str:
+    """
+    Формирует `QUERY_BUDGETS` из измеренных значений: для каждого
+    маршрута берется наибольшее число запросов. Маршруты без бюджета
+    и маршруты, которые проверка не вызывает, сохраняют текущее значение,
+    непроверенные - с пометкой.
+    """
+
+    measured: dict[tuple[str, str], int] = {}
+    for result in results:
+        key = (result.method, result.route)
+        measured[key] = max(measured.get(key, 0), result.queries)
+
+    lines = ["QUERY_BUDGETS: dict[tuple[str, str], int | None] = {"]
+    for (method, route), budget in QUERY_BUDGETS.items():
+        line = f'    ("{method}", "{route}"): '
+        if budget is None:
+            lines.append(f"{line}None,")
+        elif (method, route) in measured:
+            lines.append(f"{line}{measured[(method, route)]},")
+        else:
+            lines.append(f"{line}{budget},  # не измерено")
+    lines.append("}")
+    return "\n".join(lines)
@@ -0,0 +1,167 @@
+"""
+Синтетические данные для нагрузочного тестирования:
+
+- Авторы, книги с описаниями из общего словаря (для поиска) и читатели.
+- Несколько «горячих» книг с малым числом экземпляров, за которые
+  конкурируют читатели в сценарии выдачи и возврата.
+- Повторный запуск не создает данные заново, а читает уже созданные.
+"""
+
+import random
+from dataclasses import dataclass, field
+from datetime import date
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.authors import Author
+from app.books import Book
+from app.books.models import book_author
+from app.users import User, UserRole
+from app.users.security import pwd_context
+
+ADMIN_EMAIL = "bench-admin@example.com"
+READER_EMAIL = "bench-reader-{}@example.com"
+PASSWORD = "benchpassword"
+BOOK_TITLE = "Benchmark book {}"
+HOT_BOOK_TITLE = "Benchmark hot book {}"
+
+WORDS = tuple(
+    "война мир любовь история море город дорога память время дом "
+    "сад зима лето ночь звезда река лес огонь ветер судьба".split()
+)
+GENRES = ("Роман", "Поэзия", "Драма", "Повесть", "Фантастика", "Детектив")
+
+
+@dataclass
+class DatasetConfig:
+    authors: int = 100
+    books: int = 1000
+    readers: int = 50
+    hot_books: int = 5
+    hot_copies: int = 3
+    seed: int = 42
+
+
+@dataclass
+class Dataset:
+    admin_email: str
+    reader_emails: list[str]
+    password: str
+    book_ids: list[int] = field(default_factory=list)
+    hot_book_ids: list[int] = field(default_factory=list)
+    words: tuple[str, ...] = WORDS
+
+
+def _description(rng: random.Random) -> str:
+    return " ".join(rng.choices(WORDS, k=rng.randint(10, 40)))
+
+
+async def _create_users(db: AsyncSession, config: DatasetConfig) -> None:
+    hashed_password = pwd_context.hash(PASSWORD)
+    users = [
+        {
+            "username": "bench-admin",
+            "email": ADMIN_EMAIL,
+            "hashed_password": hashed_password,
+            "role": UserRole.ADMIN.value,
+        }
+    ]
+    users += [
+        {
+            "username": f"bench-reader-{i}",
+            "email": READER_EMAIL.format(i),
+            "hashed_password": hashed_password,
+            "role": UserRole.READER.value,
+        }
+        for i in range(config.readers)
+    ]
+    await db.execute(insert(User), users)
+
+
+async def _create_catalog(
+    db: AsyncSession, config: DatasetConfig, rng: random.Random
+) -> None:
+    author_ids = await db.scalars(
+        insert(Author).returning(Author.id, sort_by_parameter_order=True),
+        [
+            {
+                "name": f"Benchmark author {i}",
+                "birth_date": date(1800 + i % 200, 1, 1),
+                "biography": _description(rng),
+            }
+            for i in range(config.authors)
+        ],
+    )
+    author_ids = list(author_ids)
+
+    books = [
+        {
+            "title": HOT_BOOK_TITLE.format(i),
+            "description": _description(rng),
+            "publication_date": date(2000, 1, 1),
+            "genre": rng.choice(GENRES),
+            "available_copies": config.hot_copies,
+        }
+        for i in range(config.hot_books)
+    ]
+    books += [
+        {
+            "title": BOOK_TITLE.format(i),
+            "description": _description(rng),
+            "publication_date": date(1900 + i % 120, 1, 1),
+            "genre": rng.choice(GENRES),
+            "available_copies": rng.randint(1, 10),
+        }
+        for i in range(config.books)
+    ]
+    book_ids = await db.scalars(
+        insert(Book).returning(Book.id, sort_by_parameter_order=True), books
+    )
+    await db.execute(
+        insert(book_author),
+        [
+            {"book_id": book_id, "author_id": rng.choice(author_ids)}
+            for book_id in book_ids
+        ],
+    )
+
+
+async def seed(
+    session_factory: async_sessionmaker[AsyncSession], config: DatasetConfig
+) -> Dataset:
+    """Создает набор данных, если его еще нет, и возвращает его описание."""
+
+    rng = random.Random(config.seed)
+    async with session_factory() as db:
+        exists = await db.scalar(
+            select(func.count()).filter(User.email == ADMIN_EMAIL)
+        )
+        if not exists:
+            await _create_users(db, config)
+            await _create_catalog(db, config, rng)
+            await db.commit()
+
+        hot_book_ids = await db.scalars(
+            select(Book.id)
+            .filter(Book.title.like(HOT_BOOK_TITLE.format("%")))
+            .order_by(Book.id)
+        )
+        book_ids = await db.scalars(
+            select(Book.id)
+            .filter(Book.title.like(BOOK_TITLE.format("%")))
+            .order_by(Book.id)
+        )
+        reader_emails = await db.scalars(
+            select(User.email)
+            .filter(User.email.like(READER_EMAIL.format("%")))
+            .order_by(User.id)
+        )
+
+        return Dataset(
+            admin_email=ADMIN_EMAIL,
+            reader_emails=list(reader_emails),
+            password=PASSWORD,
+            book_ids=list(book_ids),
+            hot_book_ids=list(hot_book_ids),
+        )
@@ -0,0 +1,147 @@
+"""
+Запуск сценариев и расчет показателей:
+
+- Виртуальные пользователи выполняют шаги сценария параллельно
+  в течение заданного времени.
+- Для каждого сценария считаются RPS, перцентили задержки
+  и число SQL-запросов на запрос (по заголовку `X-DB-Queries`).
+"""
+
+import asyncio
+import math
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from httpx import AsyncClient
+
+from app.instrumentation import DB_QUERIES_HEADER
+
+from .dataset import Dataset
+from .scenarios import EXPECTED_STATUSES, SCENARIOS, VirtualUser
+
+
+@dataclass
+class Sample:
+    latency: float
+    status: int
+    db_queries: int | None
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Перцентиль (0 < q <= 100) методом ближайшего ранга."""
+
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(q / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+def summarize(
+    scenario: str, samples: list[Sample], elapsed: float, concurrency: int
+) -> dict:
+    """Сводка по сценарию для отчета."""
+
+    latencies = [sample.latency * 1000 for sample in samples]
+    statuses = Counter(sample.status for sample in samples)
+    expected = EXPECTED_STATUSES.get(scenario, set())
+    errors = sum(
+        count
+        for status, count in statuses.items()
+        if status >= 400 and status not in expected
+    )
+    queries = [s.db_queries for s in samples if s.db_queries is not None]
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "errors": errors,
+        "duration_seconds": round(elapsed, 3),
+        "rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "max": round(max(latencies, default=0.0), 2),
+        },
+        "db_queries_per_request": (
+            round(sum(queries) / len(queries), 2) if queries else None
+        ),
+        "statuses": {str(status): n for status, n in sorted(statuses.items())},
+    }
+
+
+async def login_users(
+    client: AsyncClient, dataset: Dataset, count: int, seed: int
+) -> list[VirtualUser]:
+    """Создает виртуальных пользователей и получает для них токены."""
+
+    users = []
+    for index in range(count):
+        email = dataset.reader_emails[index % len(dataset.reader_emails)]
+        response = await client.post(
+            "/users/login/",
+            json={"email": email, "password": dataset.password},
+        )
+        response.raise_for_status()
+        token = response.json()["access_token"]
+        users.append(
+            VirtualUser(
+                email=email,
+                headers={"Authorization": f"Bearer {token}"},
+                rng=random.Random(seed + index),
+            )
+        )
+    return users
+
+
+async def run_scenario(
+    client: AsyncClient,
+    dataset: Dataset,
+    scenario: str,
+    users: list[VirtualUser],
+    duration: float,
+) -> dict:
+    """Выполняет сценарий всеми виртуальными пользователями."""
+
+    step = SCENARIOS[scenario]
+    samples: list[Sample] = []
+    deadline = time.perf_counter() + duration
+
+    async def worker(user: VirtualUser) -> None:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await step(client, dataset, user)
+            queries = response.headers.get(DB_QUERIES_HEADER)
+            samples.append(
+                Sample(
+                    latency=time.perf_counter() - start,
+                    status=response.status_code,
+                    db_queries=int(queries) if queries else None,
+                )
+            )
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(user) for user in users))
+    elapsed = time.perf_counter() - start
+
+    if scenario == "storm":
+        await _return_borrowed(client, users)
+
+    return summarize(scenario, samples, elapsed, len(users))
+
+
+async def _return_borrowed(
+    client: AsyncClient, users: list[VirtualUser]
+) -> None:
+    """Возвращает книги, оставшиеся на руках после сценария."""
+
+    for user in users:
+        while user.borrowed:
+            await client.post(
+                "/rebooks/return/",
+                json={"book_id": user.borrowed.pop()},
+                headers=user.headers,
+            )
@@ -0,0 +1,96 @@
+"""
+Сценарии нагрузки. Каждый шаг сценария выполняет один HTTP-запрос
+от имени виртуального пользователя и возвращает ответ.
+
+- `browse`: постраничный обход каталога по курсору и просмотр книг.
+- `search`: полнотекстовый поиск по словам из описаний книг.
+- `login`: серия входов читателей (хеширование паролей).
+- `storm`: выдача и возврат нескольких «горячих» книг.
+"""
+
+import random
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from httpx import AsyncClient, Response
+
+from .dataset import Dataset
+
+
+@dataclass
+class VirtualUser:
+    """Состояние виртуального пользователя в ходе сценария."""
+
+    email: str
+    headers: dict[str, str]
+    rng: random.Random
+    cursor: str | None = None
+    borrowed: list[int] = field(default_factory=list)
+
+
+Step = Callable[[AsyncClient, Dataset, VirtualUser], Awaitable[Response]]
+
+
+async def browse(
+    client: AsyncClient, dataset: Dataset, user: VirtualUser
+) -> Response:
+    if user.rng.random() < 0.3:
+        book_id = user.rng.choice(dataset.book_ids)
+        return await client.get(f"/books/{book_id}/", headers=user.headers)
+
+    params = {"limit": 20}
+    if user.cursor:
+        params["cursor"] = user.cursor
+    response = await client.get("/books/", params=params, headers=user.headers)
+    user.cursor = response.headers.get("x-next-cursor")
+    return response
+
+
+async def search(
+    client: AsyncClient, dataset: Dataset, user: VirtualUser
+) -> Response:
+    query = " ".join(user.rng.sample(dataset.words, k=user.rng.randint(1, 2)))
+    return await client.get(
+        "/books/search/", params={"q": query}, headers=user.headers
+    )
+
+
+async def login(
+    client: AsyncClient, dataset: Dataset, user: VirtualUser
+) -> Response:
+    return await client.post(
+        "/users/login/",
+        json={"email": user.email, "password": dataset.password},
+    )
+
+
+async def storm(
+    client: AsyncClient, dataset: Dataset, user: VirtualUser
+) -> Response:
+    if user.borrowed:
+        book_id = user.borrowed.pop()
+        return await client.post(
+            "/rebooks/return/", json={"book_id": book_id}, headers=user.headers
+        )
+
+    book_id = user.rng.choice(dataset.hot_book_ids)
+    response = await client.post(
+        "/rebooks/", json={"book_id": book_id}, headers=user.headers
+    )
+    if response.status_code == 201:
+        user.borrowed.append(book_id)
+    return response
+
+
+SCENARIOS: dict[str, Step] = {
+    "browse": browse,
+    "search": search,
+    "login": login,
+    "storm": storm,
+}
+
+# Ответы, которые ожидаемы для сценария и не считаются ошибками:
+# в «шторме» часть попыток взять книгу отклоняется из-за нехватки копий.
+EXPECTED_STATUSES: dict[str, set[int]] = {
+    "storm": {400},
+}
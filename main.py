@@ -1,4 +1,5 @@
 import logging
+from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI
@@ -8,16 +9,35 @@ from sqlalchemy.exc import IntegrityError
 from app.authors import authors_router
 from app.books import books_router
 from app.config import settings
+from app.database import engine, log_pool_status
 from app.exceptions import (
     integrity_error_handler,
     validation_exception_handler,
 )
-from app.rebooks import rebooks_router
-from app.users import users_router
+from app.idempotency import idempotency_sweeper
+from app.invalidation import invalidation_bus
+from app.metrics import MetricsMiddleware, metrics_router
+from app.rebooks import overdue_scanner, rebooks_router, user_rebooks_router
+from app.users import password_hasher, users_router
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("library_api")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_pool_status()
+    await invalidation_bus.start()
+    await idempotency_sweeper.start()
+    await overdue_scanner.start()
+    yield
+    await overdue_scanner.stop()
+    await idempotency_sweeper.stop()
+    await invalidation_bus.stop()
+    password_hasher.shutdown()
+    await engine.dispose()
+
+
 app = FastAPI(
     title="Library Management API",
     description="""
@@ -34,12 +54,17 @@ app = FastAPI(
         "name": "MIT License",
         "url": "https://opensource.org/licenses/MIT",
     },
+    lifespan=lifespan,
 )
 
 app.include_router(users_router)
 app.include_router(authors_router)
 app.include_router(books_router)
 app.include_router(rebooks_router)
+app.include_router(user_rebooks_router)
+app.include_router(metrics_router)
+
+app.add_middleware(MetricsMiddleware)
 
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
 app.add_exception_handler(IntegrityError, integrity_error_handler)
@@ -0,0 +1,115 @@
+"""
+Служебные команды приложения.
+
+Использование:
+    python manage.py reconcile-loans
+    python manage.py query-budget [--print-budgets]
+    python manage.py sweep-idempotency-keys
+    python manage.py scan-overdue
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+
+from app.config import settings
+from app.database import async_session, engine
+from app.idempotency import sweep_idempotency_keys
+from app.rebooks.services import OverdueScanner, reconcile_active_loans
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("library_api")
+
+
+async def reconcile_loans(args: argparse.Namespace) -> None:
+    """Пересчитывает счетчики книг на руках у пользователей."""
+
+    async with async_session() as session:
+        updated = await reconcile_active_loans(session)
+    logger.info("Active loan counters fixed for %s users", updated)
+
+
+async def sweep_idempotency(args: argparse.Namespace) -> None:
+    """Удаляет просроченные ключи идемпотентности."""
+
+    async with async_session() as session:
+        deleted = await sweep_idempotency_keys(session)
+    logger.info("Expired idempotency keys removed: %s", deleted)
+
+
+async def scan_overdue(args: argparse.Namespace) -> None:
+    """Обходит просроченные выдачи и записывает сводку в лог."""
+
+    scanner = OverdueScanner(async_session, 0, args.batch_size)
+    if await scanner.scan() is None:
+        logger.info("Overdue loan scan is already running, skipped")
+
+
+async def query_budget(args: argparse.Namespace) -> None:
+    """
+    Проверяет бюджеты SQL-запросов на синтетическом наборе данных или
+    выводит измеренные значения для `app/query_budget.py`.
+    """
+
+    from benchmarks.budget import check_budgets, format_budgets
+    from benchmarks.dataset import DatasetConfig
+
+    results = await check_budgets(
+        DatasetConfig(books=args.books, authors=args.authors)
+    )
+    await engine.dispose()
+
+    if args.print_budgets:
+        print(format_budgets(results))
+        return
+
+    for result in results:
+        print(result)
+    exceeded = [result for result in results if result.exceeded]
+    if exceeded:
+        logger.error("Query budget exceeded for %s routes", len(exceeded))
+        sys.exit(1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Library API commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    reconcile = subparsers.add_parser(
+        "reconcile-loans", help="Пересчитать счетчики книг на руках"
+    )
+    reconcile.set_defaults(handler=reconcile_loans)
+
+    sweep = subparsers.add_parser(
+        "sweep-idempotency-keys",
+        help="Удалить просроченные ключи идемпотентности",
+    )
+    sweep.set_defaults(handler=sweep_idempotency)
+
+    overdue = subparsers.add_parser(
+        "scan-overdue", help="Обойти просроченные выдачи"
+    )
+    overdue.add_argument(
+        "--batch-size", type=int, default=settings.OVERDUE_SCAN_BATCH_SIZE
+    )
+    overdue.set_defaults(handler=scan_overdue)
+
+    budget = subparsers.add_parser(
+        "query-budget", help="Проверить бюджеты SQL-запросов маршрутов"
+    )
+    budget.add_argument("--authors", type=int, default=100)
+    budget.add_argument("--books", type=int, default=1000)
+    budget.add_argument(
+        "--print-budgets",
+        action="store_true",
+        help="Вывести измеренные значения в виде QUERY_BUDGETS",
+    )
+    budget.set_defaults(handler=query_budget)
+
+    args = parser.parse_args()
+    asyncio.run(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
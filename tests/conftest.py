@@ -9,7 +9,8 @@ from sqlalchemy.ext.asyncio import (
 )
 from sqlalchemy.pool import NullPool
 
-from app import Base, get_async_session, settings
+from app import Base, get_async_session, get_session_factory, settings
+from app.query_budget import violations
 from main import app
 
 engine = create_async_engine(settings.async_database_url, poolclass=NullPool)
@@ -25,6 +26,7 @@ async def override_get_async_session() -> AsyncGenerator[AsyncSession, None]:
 
 
 app.dependency_overrides[get_async_session] = override_get_async_session
+app.dependency_overrides[get_session_factory] = lambda: async_session
 
 
 @pytest.fixture(autouse=True, scope="session")
@@ -39,6 +41,15 @@ async def prepare_database():
         await conn.run_sync(Base.metadata.drop_all)
 
 
+@pytest.fixture(autouse=True)
+def query_budget_guard():
+    violations.clear()
+    yield
+    assert not violations, "Query budget exceeded: " + "; ".join(
+        str(violation) for violation in violations
+    )
+
+
 @pytest.fixture(scope="session")
 async def ac() -> AsyncGenerator[AsyncClient, None]:
     async with AsyncClient(
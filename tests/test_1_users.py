@@ -1,5 +1,12 @@
+import asyncio
+import json
+import threading
+
 from httpx import AsyncClient
 
+from app.users.security import PasswordHasher
+from app.users.services import user_cache
+
 
 async def register_user(
     ac: AsyncClient, email: str, password: str, username: str
@@ -33,6 +40,12 @@ async def get_reader_token(ac: AsyncClient) -> str:
     return await login_user(ac, "reader@example.com", "readerpassword")
 
 
+async def create_reader(ac: AsyncClient, username: str) -> dict:
+    email = f"{username}@example.com"
+    await register_user(ac, email, "readerpassword", username)
+    return get_headers(await login_user(ac, email, "readerpassword"))
+
+
 async def test_register(ac: AsyncClient):
     await register_user(ac, "admin@example.com", "adminpassword", "adminuser")
 
@@ -61,6 +74,63 @@ async def test_get_users_list(ac: AsyncClient):
     assert response.json()["detail"] == "Permission denied"
 
 
+async def test_get_users_filters(ac: AsyncClient):
+    headers = get_headers(await get_admin_token(ac))
+
+    response = await ac.get("/users/?limit=1", headers=headers)
+    assert response.status_code == 200
+    assert [user["id"] for user in response.json()] == [1]
+    cursor = response.headers["x-next-cursor"]
+
+    response = await ac.get(
+        "/users/", headers=headers, params={"limit": 1, "cursor": cursor}
+    )
+    assert [user["id"] for user in response.json()] == [2]
+
+    response = await ac.get(
+        "/users/", headers=headers, params={"email": "reader@"}
+    )
+    assert [user["email"] for user in response.json()] == [
+        "reader@example.com"
+    ]
+
+    response = await ac.get(
+        "/users/", headers=headers, params={"role": "admin"}
+    )
+    assert [user["id"] for user in response.json()] == [1]
+
+    response = await ac.get(
+        "/users/", headers=headers, params={"is_active": False}
+    )
+    assert response.json() == []
+
+    response = await ac.get(
+        "/users/", headers=headers, params={"role": "unknown"}
+    )
+    assert response.status_code == 422
+
+
+async def test_export_users(ac: AsyncClient):
+    response = await ac.get(
+        "/users/export/", headers=get_headers(await get_reader_token(ac))
+    )
+    assert response.status_code == 403
+
+    headers = get_headers(await get_admin_token(ac))
+    response = await ac.get("/users/export/", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    users = [json.loads(line) for line in response.text.splitlines()]
+    assert [user["id"] for user in users] == [1, 2]
+    assert "hashed_password" not in users[0]
+
+    response = await ac.get(
+        "/users/export/", headers=headers, params={"role": "reader"}
+    )
+    users = [json.loads(line) for line in response.text.splitlines()]
+    assert [user["email"] for user in users] == ["reader@example.com"]
+
+
 async def test_get_user(ac: AsyncClient):
     admin_token = await get_admin_token(ac)
     reader_token = await get_reader_token(ac)
@@ -134,3 +204,99 @@ async def test_update_role(ac: AsyncClient):
     )
     assert response.status_code == 403
     assert response.json()["detail"] == "Permission denied"
+
+
+async def test_role_change_revokes_access(ac: AsyncClient):
+    admin_headers = get_headers(await get_admin_token(ac))
+
+    response = await ac.put(
+        "/users/2/role/", headers=admin_headers, json={"new_role": "admin"}
+    )
+    assert response.status_code == 200
+
+    promoted_headers = get_headers(await get_reader_token(ac))
+    response = await ac.get("/users/", headers=promoted_headers)
+    assert response.status_code == 200
+
+    response = await ac.put(
+        "/users/2/role/", headers=admin_headers, json={"new_role": "reader"}
+    )
+    assert response.status_code == 200
+
+    response = await ac.get("/users/", headers=promoted_headers)
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Permission denied"
+
+
+async def test_role_change_requires_new_login(ac: AsyncClient):
+    admin_headers = get_headers(await get_admin_token(ac))
+    old_headers = get_headers(await get_reader_token(ac))
+
+    response = await ac.put(
+        "/users/2/role/", headers=admin_headers, json={"new_role": "admin"}
+    )
+    assert response.status_code == 200
+
+    # Результат не зависит от того, есть ли пользователь в кэше воркера.
+    response = await ac.get("/users/me/", headers=old_headers)
+    assert response.status_code == 200
+    assert response.json()["role"] == "admin"
+    response = await ac.get("/users/", headers=old_headers)
+    assert response.status_code == 403
+
+    user_cache.delete("reader@example.com")
+    response = await ac.get("/users/", headers=old_headers)
+    assert response.status_code == 403
+
+    new_headers = get_headers(await get_reader_token(ac))
+    response = await ac.get("/users/", headers=new_headers)
+    assert response.status_code == 200
+
+    response = await ac.put(
+        "/users/2/role/", headers=admin_headers, json={"new_role": "reader"}
+    )
+    assert response.status_code == 200
+
+    response = await ac.get("/users/", headers=new_headers)
+    assert response.status_code == 403
+    user_cache.delete("reader@example.com")
+    response = await ac.get("/users/", headers=new_headers)
+    assert response.status_code == 403
+
+
+async def test_password_hasher_limits_concurrency():
+    hasher = PasswordHasher(workers=2)
+    release = threading.Event()
+    lock = threading.Lock()
+    active = {"now": 0, "max": 0}
+
+    def blocking_call():
+        with lock:
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+        release.wait(5)
+        with lock:
+            active["now"] -= 1
+
+    tasks = [asyncio.create_task(hasher.run(blocking_call)) for _ in range(5)]
+    try:
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if active["now"] == 2:
+                break
+
+        stats = hasher.stats()
+        assert stats["in_flight"] == 5
+        assert stats["queue_depth"] == 3
+        assert active["now"] == 2
+    finally:
+        release.set()
+        await asyncio.gather(*tasks)
+        hasher.shutdown()
+
+    stats = hasher.stats()
+    assert active["max"] == 2
+    assert stats["in_flight"] == 0
+    assert stats["queue_depth"] == 0
+    assert stats["completed"] == 5
+    assert stats["wait_seconds_max"] > 0
@@ -54,6 +54,37 @@ async def test_get_authors_list(ac: AsyncClient):
     assert isinstance(response.json(), list)
 
 
+async def test_get_authors_name_filter(ac: AsyncClient):
+    headers = get_headers(await get_reader_token(ac))
+
+    response = await ac.get(
+        "/authors/", headers=headers, params={"name": "ург"}
+    )
+    assert response.status_code == 200
+    assert [a["name"] for a in response.json()] == ["Тургенев"]
+
+    response = await ac.get(
+        "/authors/", headers=headers, params={"name": "ур"}
+    )
+    assert response.status_code == 422
+
+
+async def test_get_authors_cursor(ac: AsyncClient):
+    headers = get_headers(await get_reader_token(ac))
+
+    response = await ac.get("/authors/?limit=2", headers=headers)
+    assert response.status_code == 200
+    assert [a["id"] for a in response.json()] == [1, 2]
+    cursor = response.headers["x-next-cursor"]
+
+    response = await ac.get(
+        "/authors/", headers=headers, params={"limit": 2, "cursor": cursor}
+    )
+    assert response.status_code == 200
+    assert [a["id"] for a in response.json()] == [3]
+    assert "x-next-cursor" not in response.headers
+
+
 async def test_get_author(ac: AsyncClient):
     admin_token = await get_admin_token(ac)
     reader_token = await get_reader_token(ac)
@@ -65,6 +96,29 @@ async def test_get_author(ac: AsyncClient):
     assert response.status_code == 200
 
 
+async def test_get_author_not_modified(ac: AsyncClient):
+    admin_headers = get_headers(await get_admin_token(ac))
+
+    response = await ac.get("/authors/2/", headers=admin_headers)
+    etag = response.headers["etag"]
+
+    response = await ac.get(
+        "/authors/2/", headers={**admin_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+
+    response = await ac.put(
+        "/authors/2/", headers=admin_headers, json={"biography": "Граф"}
+    )
+    assert response.status_code == 200
+
+    response = await ac.get(
+        "/authors/2/", headers={**admin_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
 async def test_update_author(ac: AsyncClient):
     admin_token = await get_admin_token(ac)
     reader_token = await get_reader_token(ac)
@@ -1,5 +1,11 @@
+import csv
+import io
+import json
+
 from httpx import AsyncClient
+from sqlalchemy import text
 
+from .conftest import engine
 from .test_1_users import get_admin_token, get_headers, get_reader_token
 
 
@@ -61,6 +67,99 @@ async def test_get_books_list(ac: AsyncClient):
     assert isinstance(response.json(), list)
 
 
+async def test_get_books_cursor(ac: AsyncClient):
+    headers = get_headers(await get_reader_token(ac))
+
+    response = await ac.get("/books/?limit=1", headers=headers)
+    assert response.status_code == 200
+    assert response.json()[0]["id"] == 1
+    cursor = response.headers["x-next-cursor"]
+
+    response = await ac.get(
+        "/books/", headers=headers, params={"limit": 1, "cursor": cursor}
+    )
+    assert response.status_code == 200
+    assert response.json()[0]["id"] == 2
+
+    response = await ac.get(
+        "/books/", headers=headers, params={"cursor": "not-a-cursor"}
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid pagination cursor"
+
+
+async def test_get_books_genre_filter(ac: AsyncClient):
+    headers = get_headers(await get_reader_token(ac))
+
+    response = await ac.get(
+        "/books/", headers=headers, params={"genre": "эзи"}
+    )
+    assert response.status_code == 200
+    assert [b["title"] for b in response.json()] == ["Борис Годунов"]
+
+    response = await ac.get(
+        "/books/", headers=headers, params={"genre": "%%%"}
+    )
+    assert response.status_code == 200
+    assert response.json() == []
+
+    response = await ac.get("/books/", headers=headers, params={"genre": "эз"})
+    assert response.status_code == 422
+
+
+async def test_search_books(ac: AsyncClient):
+    headers = get_headers(await get_reader_token(ac))
+    admin_headers = get_headers(await get_admin_token(ac))
+
+    book_ids = []
+    for title, description in (
+        ("Сказка о рыбаке и рыбке", "<рыбка> & невод"),
+        ("Сказка о золотом петушке", "Шамаханская царица"),
+    ):
+        response = await ac.post(
+            "/books/",
+            headers=admin_headers,
+            json={
+                "title": title,
+                "description": description,
+                "publication_date": "1835-01-01",
+                "genre": "Сказка",
+                "available_copies": 1,
+                "author_ids": [1],
+            },
+        )
+        assert response.status_code == 201
+        book_ids.append(response.json()["id"])
+    fisherman, cockerel = book_ids
+
+    response = await ac.get(
+        "/books/search/", headers=headers, params={"q": "петушка"}
+    )
+    assert response.status_code == 200
+    assert [b["id"] for b in response.json()] == [cockerel]
+    assert response.json()[0]["rank"] > 0
+    assert "<b>петушке</b>" in response.json()[0]["snippet"]
+
+    response = await ac.get(
+        "/books/search/", headers=headers, params={"q": "рыбка"}
+    )
+    assert [b["id"] for b in response.json()] == [fisherman]
+    snippet = response.json()[0]["snippet"]
+    assert "<b>" in snippet
+    assert "&lt;" in snippet
+    assert "<" not in snippet.replace("<b>", "").replace("</b>", "")
+
+    response = await ac.get(
+        "/books/search/", headers=headers, params={"q": "гамлет"}
+    )
+    assert response.status_code == 200
+    assert response.json() == []
+
+    for book_id in book_ids:
+        response = await ac.delete(f"/books/{book_id}/", headers=admin_headers)
+        assert response.status_code == 204
+
+
 async def test_get_book(ac: AsyncClient):
     admin_token = await get_admin_token(ac)
     reader_token = await get_reader_token(ac)
@@ -72,6 +171,63 @@ async def test_get_book(ac: AsyncClient):
     assert response.status_code == 200
 
 
+async def test_get_book_not_modified(ac: AsyncClient):
+    headers = get_headers(await get_reader_token(ac))
+
+    response = await ac.get("/books/1/", headers=headers)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    response = await ac.get(
+        "/books/1/", headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+    response = await ac.get(
+        "/books/1/", headers={**headers, "If-None-Match": '"stale"'}
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] == etag
+
+
+async def test_get_books_fields(ac: AsyncClient):
+    headers = get_headers(await get_reader_token(ac))
+
+    response = await ac.get(
+        "/books/",
+        headers=headers,
+        params={"limit": 1, "fields": "title,available_copies"},
+    )
+    assert response.status_code == 200
+    assert response.json() == [
+        {"title": "Онегин", "available_copies": 5, "id": 1}
+    ]
+    assert "x-next-cursor" in response.headers
+
+    response = await ac.get(
+        "/books/1/", headers=headers, params={"fields": "authors"}
+    )
+    assert response.status_code == 200
+    assert set(response.json()) == {"id", "authors"}
+    assert len(response.json()["authors"]) == 2
+    etag = response.headers["etag"]
+
+    response = await ac.get(
+        "/books/1/",
+        headers={**headers, "If-None-Match": etag},
+        params={"fields": "authors"},
+    )
+    assert response.status_code == 304
+
+    response = await ac.get(
+        "/books/", headers=headers, params={"fields": "title,isbn"}
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown fields requested"
+
+
 async def test_update_book(ac: AsyncClient):
     admin_token = await get_admin_token(ac)
     reader_token = await get_reader_token(ac)
@@ -112,6 +268,47 @@ async def test_update_book(ac: AsyncClient):
     assert response.json()["authors"] == ["Пушкин А.С."]
 
 
+async def test_update_book_authors_etag(ac: AsyncClient):
+    admin_headers = get_headers(await get_admin_token(ac))
+
+    response = await ac.get("/books/1/", headers=admin_headers)
+    etag = response.headers["etag"]
+    response = await ac.get(
+        "/books/1/", headers=admin_headers, params={"fields": "authors"}
+    )
+    fields_etag = response.headers["etag"]
+
+    response = await ac.put(
+        "/books/1/",
+        headers=admin_headers,
+        json={
+            "title": "Евгений Онегин",
+            "description": "Текст",
+            "publication_date": "1833-01-01",
+            "genre": "Поэзия",
+            "available_copies": 1,
+            "author_ids": [1, 2],
+        },
+    )
+    assert response.status_code == 200
+    assert len(response.json()["authors"]) == 2
+
+    response = await ac.get(
+        "/books/1/", headers={**admin_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert len(response.json()["authors"]) == 2
+
+    response = await ac.get(
+        "/books/1/",
+        headers={**admin_headers, "If-None-Match": fields_etag},
+        params={"fields": "authors"},
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != fields_etag
+
+
 async def test_delete_book(ac: AsyncClient):
     admin_token = await get_admin_token(ac)
     reader_token = await get_reader_token(ac)
@@ -122,3 +319,129 @@ async def test_delete_book(ac: AsyncClient):
 
     response = await ac.delete("/books/2/", headers=get_headers(admin_token))
     assert response.status_code == 204
+
+
+async def test_bulk_import_books(ac: AsyncClient):
+    admin_token = await get_admin_token(ac)
+    reader_token = await get_reader_token(ac)
+    ndjson = "\n".join(
+        [
+            '{"title": "Дубровский", "publication_date": "1841-01-01", '
+            '"genre": "Роман", "available_copies": 2, "author_ids": [1]}',
+            '{"title": "Пиковая дама", "publication_date": "1834-01-01", '
+            '"genre": "Повесть", "available_copies": 2, "author_ids": [99]}',
+            "not json",
+            '{"title": "Ас", "publication_date": "1834-01-01"}',
+        ]
+    )
+
+    response = await ac.post(
+        "/books/bulk/",
+        headers=get_headers(reader_token),
+        content=ndjson,
+    )
+    assert response.status_code == 403
+
+    response = await ac.post(
+        "/books/bulk/",
+        headers={
+            **get_headers(admin_token),
+            "Content-Type": "application/x-ndjson",
+        },
+        content=ndjson,
+    )
+    assert response.status_code == 200
+    assert response.json()["created"] == 1
+    assert response.json()["failed"] == 3
+    errors = {
+        error["line"]: error["errors"] for error in response.json()["errors"]
+    }
+    assert errors[2] == ["Authors not found: 99"]
+    assert errors[3] == ["Invalid JSON"]
+    assert 4 in errors
+
+    data = (
+        "title,description,publication_date,genre,available_copies,"
+        "author_ids\n"
+        'Медный всадник,"Поэма, 1833",1837-01-01,Поэзия,3,1;2\n'
+        'Анчар,"Строфа первая\nстрофа вторая",1832-01-01,Поэзия,1,1\n'
+    ).encode() + "Бесы,,1830-01-01,Поэзия,1,1\n".encode("cp1251")
+    response = await ac.post(
+        "/books/bulk/",
+        headers={**get_headers(admin_token), "Content-Type": "text/csv"},
+        content=data,
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "created": 2,
+        "failed": 1,
+        "errors": [{"line": 5, "errors": ["Invalid UTF-8"]}],
+    }
+
+
+async def test_bulk_import_integrity_error(ac: AsyncClient):
+    headers = {
+        **get_headers(await get_admin_token(ac)),
+        "Content-Type": "application/x-ndjson",
+    }
+    records = "\n".join(
+        json.dumps(
+            {
+                "title": title,
+                "publication_date": "1830-01-01",
+                "genre": "Поэзия",
+                "available_copies": 1,
+                "author_ids": [1],
+            }
+        )
+        for title in ("Бесы", "Запретная", "Туча")
+    )
+
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "ALTER TABLE books ADD CONSTRAINT ck_books_test "
+                "CHECK (title <> 'Запретная')"
+            )
+        )
+    try:
+        response = await ac.post(
+            "/books/bulk/", headers=headers, content=records
+        )
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(
+                text("ALTER TABLE books DROP CONSTRAINT ck_books_test")
+            )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "created": 2,
+        "failed": 1,
+        "errors": [{"line": 2, "errors": ["Database integrity error."]}],
+    }
+
+
+async def test_export_books(ac: AsyncClient):
+    admin_token = await get_admin_token(ac)
+    reader_token = await get_reader_token(ac)
+
+    response = await ac.get(
+        "/books/export/", headers=get_headers(reader_token)
+    )
+    assert response.status_code == 403
+
+    response = await ac.get("/books/export/", headers=get_headers(admin_token))
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    books = [json.loads(line) for line in response.text.splitlines()]
+    assert [book["id"] for book in books] == sorted(b["id"] for b in books)
+    assert books[0]["title"] == "Евгений Онегин"
+
+    response = await ac.get(
+        "/books/export/?format=csv", headers=get_headers(admin_token)
+    )
+    assert response.status_code == 200
+    lines = list(csv.reader(io.StringIO(response.text)))
+    assert lines[0][:3] == ["title", "description", "publication_date"]
+    assert len(lines) == len(books) + 1
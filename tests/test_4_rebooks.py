@@ -1,6 +1,24 @@
+import asyncio
+
+import pytest
 from httpx import AsyncClient
+from sqlalchemy import text
+
+from app.database import DEFERRED_COMMIT, after_commit, defer_commit
+from app.idempotency import Idempotency
+from app.rebooks.services import (
+    OVERDUE_SCAN_LOCK_ID,
+    OverdueScanner,
+    overdue_age_bucket,
+)
 
-from .test_1_users import get_admin_token, get_headers, get_reader_token
+from .conftest import async_session, engine
+from .test_1_users import (
+    create_reader,
+    get_admin_token,
+    get_headers,
+    get_reader_token,
+)
 
 
 async def test_borrow_book(ac: AsyncClient):
@@ -69,3 +87,460 @@ async def test_get_rebooks_list(ac: AsyncClient):
     response = await ac.get("/rebooks/", headers=get_headers(reader_token))
     assert response.status_code == 403
     assert response.json()["detail"] == "Permission denied"
+
+
+async def test_concurrent_borrow_of_last_copy(ac: AsyncClient):
+    admin_headers = get_headers(await get_admin_token(ac))
+    reader_headers = get_headers(await get_reader_token(ac))
+
+    response = await ac.post(
+        "/books/",
+        headers=admin_headers,
+        json={
+            "title": "Капитанская дочка",
+            "publication_date": "1836-01-01",
+            "genre": "Роман",
+            "available_copies": 1,
+            "author_ids": [1],
+        },
+    )
+    assert response.status_code == 201
+    book_id = response.json()["id"]
+
+    responses = await asyncio.gather(
+        *[
+            ac.post("/rebooks/", headers=headers, json={"book_id": book_id})
+            for headers in (admin_headers, reader_headers)
+        ]
+    )
+    assert sorted(r.status_code for r in responses) == [201, 400]
+
+    response = await ac.get(f"/books/{book_id}/", headers=admin_headers)
+    assert response.json()["available_copies"] == 0
+
+    admin_won = responses[0].status_code == 201
+    winner = admin_headers if admin_won else reader_headers
+    response = await ac.post(
+        "/rebooks/return/", headers=winner, json={"book_id": book_id}
+    )
+    assert response.status_code == 200
+
+    response = await ac.get(f"/books/{book_id}/", headers=admin_headers)
+    assert response.json()["available_copies"] == 1
+
+
+async def test_borrow_limit(ac: AsyncClient):
+    admin_headers = get_headers(await get_admin_token(ac))
+    reader_headers = get_headers(await get_reader_token(ac))
+
+    response = await ac.post(
+        "/books/",
+        headers=admin_headers,
+        json={
+            "title": "Повести Белкина",
+            "publication_date": "1831-01-01",
+            "genre": "Повесть",
+            "available_copies": 6,
+            "author_ids": [1],
+        },
+    )
+    assert response.status_code == 201
+    book_id = response.json()["id"]
+
+    for _ in range(5):
+        response = await ac.post(
+            "/rebooks/", headers=reader_headers, json={"book_id": book_id}
+        )
+        assert response.status_code == 201
+
+    response = await ac.post(
+        "/rebooks/", headers=reader_headers, json={"book_id": book_id}
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "User has reached the borrowing limit"
+
+    for _ in range(5):
+        response = await ac.post(
+            "/rebooks/return/",
+            headers=reader_headers,
+            json={"book_id": book_id},
+        )
+        assert response.status_code == 200
+
+    response = await ac.get(f"/books/{book_id}/", headers=reader_headers)
+    assert response.json()["available_copies"] == 6
+
+
+async def test_export_rebooks(ac: AsyncClient):
+    admin_token = await get_admin_token(ac)
+    reader_token = await get_reader_token(ac)
+
+    response = await ac.get(
+        "/rebooks/export/", headers=get_headers(reader_token)
+    )
+    assert response.status_code == 403
+
+    response = await ac.get(
+        "/rebooks/export/?format=csv", headers=get_headers(admin_token)
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.text.splitlines()
+    assert lines[0] == "book_id,id,borrowed_at,due_date,returned_at,user_id"
+    assert lines[1].startswith("1,1,")
+
+
+async def test_user_rebooks_history(ac: AsyncClient):
+    admin_headers = get_headers(await get_admin_token(ac))
+    reader_headers = get_headers(await get_reader_token(ac))
+
+    response = await ac.post(
+        "/rebooks/", headers=reader_headers, json={"book_id": 1}
+    )
+    assert response.status_code == 201
+    active_id = response.json()["id"]
+
+    response = await ac.get("/users/me/", headers=reader_headers)
+    assert [rebook["id"] for rebook in response.json()["rebooks"]] == [
+        active_id
+    ]
+
+    response = await ac.get(
+        "/users/me/rebooks/", headers=reader_headers, params={"limit": 2}
+    )
+    assert response.status_code == 200
+    first_page = [rebook["id"] for rebook in response.json()]
+    assert first_page == sorted(first_page)
+    assert len(first_page) == 2
+
+    response = await ac.get(
+        "/users/me/rebooks/",
+        headers=reader_headers,
+        params={"limit": 100, "cursor": response.headers["x-next-cursor"]},
+    )
+    history = first_page + [rebook["id"] for rebook in response.json()]
+    assert history[-1] == active_id
+    assert all(rebook["user_id"] == 2 for rebook in response.json())
+
+    response = await ac.get("/users/2/rebooks/", headers=reader_headers)
+    assert response.status_code == 403
+
+    response = await ac.get(
+        "/users/2/rebooks/",
+        headers=admin_headers,
+        params={"limit": 100, "fields": "book_id"},
+    )
+    assert response.status_code == 200
+    assert [rebook["id"] for rebook in response.json()] == history
+    assert set(response.json()[0]) == {"id", "book_id"}
+
+    response = await ac.get("/users/999/rebooks/", headers=admin_headers)
+    assert response.status_code == 404
+
+    response = await ac.post(
+        "/rebooks/return/", headers=reader_headers, json={"book_id": 1}
+    )
+    assert response.status_code == 200
+
+
+async def test_batch_borrow_and_return(ac: AsyncClient):
+    admin_headers = get_headers(await get_admin_token(ac))
+    reader_headers = await create_reader(ac, "batchreader")
+
+    book_ids = []
+    for title, copies in (("Пиковая дама", 2), ("Дубровский", 6)):
+        response = await ac.post(
+            "/books/",
+            headers=admin_headers,
+            json={
+                "title": title,
+                "publication_date": "1834-01-01",
+                "genre": "Повесть",
+                "available_copies": copies,
+                "author_ids": [1],
+            },
+        )
+        assert response.status_code == 201
+        book_ids.append(response.json()["id"])
+    scarce, plenty = book_ids
+
+    response = await ac.post(
+        "/rebooks/batch/",
+        headers=reader_headers,
+        json={"book_ids": [scarce, scarce, scarce, plenty, 999]},
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["succeeded"], result["failed"]) == (3, 2)
+    assert [item["status_code"] for item in result["items"]] == [
+        201,
+        201,
+        400,
+        201,
+        404,
+    ]
+    assert result["items"][2]["detail"] == "No copies available"
+    response = await ac.get("/users/me/", headers=reader_headers)
+    assert result["items"][0]["rebook"]["user_id"] == response.json()["id"]
+
+    response = await ac.get(f"/books/{scarce}/", headers=reader_headers)
+    assert response.json()["available_copies"] == 0
+
+    response = await ac.post(
+        "/rebooks/batch/",
+        headers=reader_headers,
+        json={"book_ids": [plenty, plenty, plenty, 999]},
+    )
+    assert [item["status_code"] for item in response.json()["items"]] == [
+        201,
+        201,
+        400,
+        400,
+    ]
+    assert {item["detail"] for item in response.json()["items"][2:]} == {
+        "User has reached the borrowing limit"
+    }
+
+    response = await ac.post(
+        "/rebooks/return/batch/",
+        headers=reader_headers,
+        json={"book_ids": [scarce, scarce, plenty, plenty, plenty, scarce]},
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["succeeded"], result["failed"]) == (5, 1)
+    assert result["items"][5]["status_code"] == 404
+    assert all(
+        item["rebook"]["returned_at"] is not None
+        for item in result["items"][:5]
+    )
+
+    for book_id, copies in ((scarce, 2), (plenty, 6)):
+        response = await ac.get(f"/books/{book_id}/", headers=reader_headers)
+        assert response.json()["available_copies"] == copies
+
+    response = await ac.post(
+        "/rebooks/batch/", headers=reader_headers, json={"book_ids": []}
+    )
+    assert response.status_code == 422
+
+
+async def test_idempotent_borrow(ac: AsyncClient):
+    admin_headers = get_headers(await get_admin_token(ac))
+    reader_headers = await create_reader(ac, "idemreader")
+
+    book = {
+        "title": "Медный всадник",
+        "publication_date": "1837-01-01",
+        "genre": "Поэзия",
+        "available_copies": 1,
+        "author_ids": [1],
+    }
+    headers = {**admin_headers, "Idempotency-Key": "book-1"}
+    first = await ac.post("/books/", headers=headers, json=book)
+    retry = await ac.post("/books/", headers=headers, json=book)
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+    book_id = first.json()["id"]
+
+    headers = {**reader_headers, "Idempotency-Key": "borrow-1"}
+    first = await ac.post(
+        "/rebooks/", headers=headers, json={"book_id": book_id}
+    )
+    retry = await ac.post(
+        "/rebooks/", headers=headers, json={"book_id": book_id}
+    )
+    assert first.status_code == retry.status_code == 201
+    assert retry.json()["id"] == first.json()["id"]
+
+    response = await ac.get(f"/books/{book_id}/", headers=reader_headers)
+    assert response.json()["available_copies"] == 0
+
+    response = await ac.post("/rebooks/", headers=headers, json={"book_id": 1})
+    assert response.status_code == 422
+
+    headers = {**admin_headers, "Idempotency-Key": "borrow-1"}
+    response = await ac.post(
+        "/rebooks/", headers=headers, json={"book_id": book_id}
+    )
+    assert response.status_code == 400
+    assert "idempotent-replayed" not in response.headers
+
+    response = await ac.post(
+        "/rebooks/return/", headers=reader_headers, json={"book_id": book_id}
+    )
+    assert response.status_code == 200
+
+    response = await ac.post(
+        "/rebooks/", headers=headers, json={"book_id": book_id}
+    )
+    assert response.status_code == 201
+    assert response.json()["user_id"] == 1
+
+    response = await ac.post(
+        "/rebooks/return/", headers=admin_headers, json={"book_id": book_id}
+    )
+    assert response.status_code == 200
+
+
+async def test_idempotent_borrow_failure(ac: AsyncClient, monkeypatch):
+    admin_headers = get_headers(await get_admin_token(ac))
+
+    response = await ac.post(
+        "/books/",
+        headers=admin_headers,
+        json={
+            "title": "Полтава",
+            "publication_date": "1829-01-01",
+            "genre": "Поэзия",
+            "available_copies": 2,
+            "author_ids": [1],
+        },
+    )
+    book_id = response.json()["id"]
+
+    def lose_response(self, result):
+        raise RuntimeError("Response serialization failed")
+
+    headers = {**admin_headers, "Idempotency-Key": "borrow-2"}
+    monkeypatch.setattr(Idempotency, "_dump", lose_response)
+    with pytest.raises(RuntimeError):
+        await ac.post("/rebooks/", headers=headers, json={"book_id": book_id})
+    monkeypatch.undo()
+
+    response = await ac.get(f"/books/{book_id}/", headers=admin_headers)
+    assert response.json()["available_copies"] == 2
+
+    response = await ac.post(
+        "/rebooks/", headers=headers, json={"book_id": book_id}
+    )
+    assert response.status_code == 201
+    assert "idempotent-replayed" not in response.headers
+
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "INSERT INTO idempotency_keys "
+                "(user_id, key, fingerprint, locked_until, expires_at) "
+                "VALUES (1, 'borrow-3', '', now() - interval '1 minute', "
+                "now() + interval '1 day')"
+            )
+        )
+    headers = {**admin_headers, "Idempotency-Key": "borrow-3"}
+    response = await ac.post(
+        "/rebooks/", headers=headers, json={"book_id": book_id}
+    )
+    assert response.status_code == 201
+
+    response = await ac.get(f"/books/{book_id}/", headers=admin_headers)
+    assert response.json()["available_copies"] == 0
+
+    response = await ac.post(
+        "/rebooks/return/batch/",
+        headers=admin_headers,
+        json={"book_ids": [book_id, book_id]},
+    )
+    assert response.status_code == 200
+    assert response.json()["succeeded"] == 2
+
+
+def test_overdue_age_bucket():
+    assert overdue_age_bucket(0) == "7d"
+    assert overdue_age_bucket(8) == "30d"
+    assert overdue_age_bucket(90) == "90d"
+    assert overdue_age_bucket(91) == ">90d"
+
+
+async def test_nested_defer_commit():
+    done = []
+
+    async def action(name):
+        done.append(name)
+
+    async with async_session() as db:
+        with defer_commit(db) as outer:
+            with defer_commit(db) as inner:
+                await after_commit(db, action, "inner")
+            assert db.info[DEFERRED_COMMIT] is outer
+            await after_commit(db, action, "outer")
+        assert DEFERRED_COMMIT not in db.info
+
+    assert inner == [(action, ("inner",))]
+    assert outer == [(action, ("outer",))]
+    assert done == []
+
+
+async def test_overdue_rebooks(ac: AsyncClient):
+    admin_headers = get_headers(await get_admin_token(ac))
+    reader_headers = await create_reader(ac, "overduereader")
+
+    response = await ac.post(
+        "/books/",
+        headers=admin_headers,
+        json={
+            "title": "Цыганы",
+            "publication_date": "1827-01-01",
+            "genre": "Поэзия",
+            "available_copies": 2,
+            "author_ids": [1],
+        },
+    )
+    book_id = response.json()["id"]
+
+    rebook_ids = []
+    for days in (40, 3):
+        response = await ac.post(
+            "/rebooks/", headers=reader_headers, json={"book_id": book_id}
+        )
+        assert response.status_code == 201
+        rebook_ids.append(response.json()["id"])
+        async with engine.begin() as conn:
+            await conn.execute(
+                text(
+                    "UPDATE rebooks SET due_date = now() - make_interval("
+                    "days => :days) WHERE id = :id"
+                ),
+                {"days": days, "id": rebook_ids[-1]},
+            )
+
+    response = await ac.get("/rebooks/overdue/", headers=reader_headers)
+    assert response.status_code == 403
+
+    response = await ac.get(
+        "/rebooks/overdue/", headers=admin_headers, params={"limit": 1}
+    )
+    assert response.status_code == 200
+    assert [rebook["id"] for rebook in response.json()] == rebook_ids[:1]
+
+    response = await ac.get(
+        "/rebooks/overdue/",
+        headers=admin_headers,
+        params={"limit": 1, "cursor": response.headers["x-next-cursor"]},
+    )
+    assert [rebook["id"] for rebook in response.json()] == rebook_ids[1:]
+
+    scanner = OverdueScanner(async_session, 0, batch_size=1)
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("SELECT pg_advisory_xact_lock(:id)"),
+            {"id": OVERDUE_SCAN_LOCK_ID},
+        )
+        assert await scanner.scan() is None
+
+    stats = await scanner.scan()
+    assert scanner.runs == 1
+    assert stats.overdue == 2
+    assert stats.batches == 2
+    assert stats.by_age == {"7d": 1, "90d": 1}
+
+    for _ in rebook_ids:
+        response = await ac.post(
+            "/rebooks/return/",
+            headers=reader_headers,
+            json={"book_id": book_id},
+        )
+        assert response.status_code == 200
+
+    response = await ac.get("/rebooks/overdue/", headers=admin_headers)
+    assert response.json() == []
@@ -0,0 +1,35 @@
+from sqlalchemy import Select
+from sqlalchemy.dialects import postgresql
+
+from app.rebooks.services import (
+    active_rebook_query,
+    overdue_rebooks_query,
+    rebooks_list_query,
+)
+
+from .conftest import engine
+
+
+async def explain(query: Select) -> str:
+    compiled = query.compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    )
+    async with engine.connect() as conn:
+        await conn.exec_driver_sql("SET enable_seqscan = off")
+        result = await conn.exec_driver_sql(f"EXPLAIN {compiled}")
+        return "\n".join(row[0] for row in result)
+
+
+async def test_active_rebook_uses_partial_index():
+    plan = await explain(active_rebook_query(user_id=2, book_id=1))
+    assert "ix_rebooks_active_user_book" in plan
+
+
+async def test_rebooks_list_by_user_uses_composite_index():
+    plan = await explain(rebooks_list_query(limit=10, user_id=2))
+    assert "ix_rebooks_user_id_id" in plan
+
+
+async def test_overdue_rebooks_use_partial_index():
+    plan = await explain(overdue_rebooks_query(limit=10))
+    assert "ix_rebooks_overdue" in plan
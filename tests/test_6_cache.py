@@ -0,0 +1,94 @@
+from fakeredis.aioredis import FakeRedis
+from httpx import AsyncClient
+from pydantic import TypeAdapter
+
+from app.cache import MemoryBackend, RedisBackend, ResponseCache, catalog_cache
+from app.invalidation import MemoryBus
+
+from .test_1_users import get_admin_token, get_headers
+
+adapter = TypeAdapter(list[int])
+
+
+async def test_memory_backend_invalidates_by_tag():
+    cache = ResponseCache("numbers", MemoryBackend(maxsize=10, ttl=60), ttl=60)
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return [1, 2, 3]
+
+    key = cache.make_key("numbers", limit=3)
+    for _ in range(2):
+        result = await cache.get_or_load(key, ("numbers",), load, adapter)
+        assert result == [1, 2, 3]
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+
+    await cache.invalidate("numbers")
+    await cache.get_or_load(key, ("numbers",), load, adapter)
+    assert len(calls) == 2
+    assert cache.stats()["misses"] == 2
+
+
+async def test_redis_backend_invalidates_by_tag():
+    backend = RedisBackend(FakeRedis())
+    await backend.set("a", b"[1]", ttl=60, tags=("list", "item:1"))
+    await backend.set("b", b"[2]", ttl=60, tags=("list",))
+    assert await backend.get("a") == b"[1]"
+
+    await backend.invalidate("item:1")
+    assert await backend.get("a") is None
+    assert await backend.get("b") == b"[2]"
+
+    await backend.invalidate("list")
+    assert await backend.get("b") is None
+
+
+async def test_memory_bus_evicts_on_other_workers():
+    peers = []
+    workers = [MemoryBus(peers) for _ in range(3)]
+    backends = [MemoryBackend(maxsize=10, ttl=60) for _ in workers]
+    for bus, backend in zip(workers, backends):
+        bus.register("catalog", ResponseCache("catalog", backend, 60).evict)
+        await backend.set("key", b"[1]", ttl=60, tags=("books:list",))
+
+    await backends[0].invalidate("books:list")
+    await workers[0].publish("catalog", ["books:list"])
+
+    for backend in backends:
+        assert await backend.get("key") is None
+    assert workers[0].stats() == {"published": 1, "received": 0}
+    assert workers[1].stats() == {"published": 0, "received": 1}
+
+
+async def test_book_update_invalidates_cached_list(ac: AsyncClient):
+    headers = get_headers(await get_admin_token(ac))
+    author_id = (await ac.get("/authors/", headers=headers)).json()[0]["id"]
+    book = {
+        "title": "Кэш",
+        "publication_date": "2000-01-01",
+        "genre": "Справочник",
+        "available_copies": 1,
+        "author_ids": [author_id],
+    }
+    response = await ac.post("/books/", headers=headers, json=book)
+    book_id = response.json()["id"]
+    params = {"genre": "Справочник"}
+
+    response = await ac.get("/books/", headers=headers, params=params)
+    assert [item["title"] for item in response.json()] == ["Кэш"]
+    hits = catalog_cache.hits
+
+    response = await ac.get("/books/", headers=headers, params=params)
+    assert catalog_cache.hits == hits + 1
+    assert [item["title"] for item in response.json()] == ["Кэш"]
+
+    book["title"] = "Кэш обновлен"
+    await ac.put(f"/books/{book_id}/", headers=headers, json=book)
+
+    response = await ac.get("/books/", headers=headers, params=params)
+    assert [item["title"] for item in response.json()] == ["Кэш обновлен"]
+
+    response = await ac.get(f"/books/{book_id}/", headers=headers)
+    assert response.json()["title"] == "Кэш обновлен"
@@ -0,0 +1,82 @@
+from httpx import AsyncClient
+
+from app.config import settings
+from app.instrumentation import parameters_shape
+from app.metrics import Histogram
+from app.query_budget import QUERY_BUDGETS, check_query_budget, violations
+from main import app
+
+from .test_1_users import get_headers, get_reader_token
+
+
+def test_histogram_render():
+    histogram = Histogram("latency", "Latency.", ("route",), buckets=(1, 2))
+    histogram.observe(0.5, route="/a")
+    histogram.observe(1.5, route="/a")
+
+    assert histogram.render() == [
+        "# HELP latency Latency.",
+        "# TYPE latency histogram",
+        'latency_bucket{route="/a",le="1"} 1',
+        'latency_bucket{route="/a",le="2"} 2',
+        'latency_bucket{route="/a",le="+Inf"} 2',
+        'latency_sum{route="/a"} 2',
+        'latency_count{route="/a"} 2',
+    ]
+
+
+async def test_metrics_endpoint(ac: AsyncClient):
+    headers = get_headers(await get_reader_token(ac))
+    await ac.get("/books/1/", headers=headers)
+
+    response = await ac.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+
+    text = response.text
+    assert (
+        'http_request_duration_seconds_count{method="GET",'
+        'route="/books/{book_id}/",status="200"}'
+    ) in text
+    assert (
+        'http_request_db_queries_count{method="GET",route="/books/{book_id}/"}'
+        in text
+    )
+    assert 'db_pool_connections{state="checked_out"}' in text
+    assert "password_hash_wait_seconds_count" in text
+    assert 'cache_requests_total{result="hit"}' in text
+
+
+def test_parameters_shape():
+    assert parameters_shape({"id": 1, "q": "x"}) == "{id: int, q: str}"
+    assert parameters_shape((1, None)) == "(int, NoneType)"
+    assert parameters_shape([(1,), (2,)], executemany=True) == "2 x (int)"
+
+
+async def test_db_timing_headers(ac: AsyncClient, monkeypatch):
+    headers = get_headers(await get_reader_token(ac))
+    monkeypatch.setattr(settings, "DB_TIMING_HEADERS", True)
+
+    response = await ac.get(
+        "/books/search/", headers=headers, params={"q": "онегин"}
+    )
+    assert response.status_code == 200
+    assert int(response.headers["x-db-queries"]) >= 1
+    assert response.headers["server-timing"].startswith("db;dur=")
+
+
+def test_every_route_has_query_budget():
+    routes = {
+        (method, route.path)
+        for route in app.routes
+        if getattr(route, "include_in_schema", False)
+        for method in route.methods
+    }
+    assert routes - set(QUERY_BUDGETS) == set()
+
+
+def test_query_budget_violation():
+    assert check_query_budget("GET", "/books/", 3) is None
+    violation = check_query_budget("GET", "/books/", 25)
+    assert str(violation) == "GET /books/: 25 queries (budget 3)"
+    violations.clear()
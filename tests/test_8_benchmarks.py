@@ -0,0 +1,25 @@
+from benchmarks.runner import Sample, percentile, summarize
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([], 99) == 0.0
+
+
+def test_summarize_counts_expected_rejections():
+    samples = [
+        Sample(latency=0.010, status=201, db_queries=4),
+        Sample(latency=0.020, status=400, db_queries=3),
+        Sample(latency=0.030, status=500, db_queries=None),
+    ]
+
+    report = summarize("storm", samples, elapsed=1.5, concurrency=2)
+    assert report["requests"] == 3
+    assert report["errors"] == 1
+    assert report["rps"] == 2.0
+    assert report["latency_ms"]["p50"] == 20.0
+    assert report["db_queries_per_request"] == 3.5
+    assert report["statuses"] == {"201": 1, "400": 1, "500": 1}